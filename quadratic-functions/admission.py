@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+リクエストの受付制御
+軽いグラフ更新と重い AI 呼び出しを別々のレーン（専用のスレッドプールと待ち行列）で
+処理し、クライアントごとのトークンバケットで流量を制限する。
+待ち行列があふれたときは待たせずにすぐ断る
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class Overloaded(Exception):
+    """受け付けられない（混雑・流量超過）。retry_after は再試行までの秒数の目安"""
+
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """トークンバケット：毎秒 rate 個補充、最大 burst 個まで貯まる"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, now=None):
+        """1トークン消費できれば 0、できなければ次のトークンまでの秒数を返す"""
+        now = time.monotonic() if now is None else now
+        # バケットが now を測ったあとに作られた場合も、補充が負にならないようにする
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(now, self.updated)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """クライアントごとのトークンバケット
+
+    バケットは最終利用順に持ち、idle_seconds 使われていないもの（満タンに戻ったもの）と、
+    max_clients を超えた分の最も長く使われていないものを捨てる。
+    """
+
+    def __init__(self, rate, burst, idle_seconds=600, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.idle_seconds = idle_seconds
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def check(self, client):
+        """流量を超えていれば Overloaded を送出"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            wait = bucket.take(now)
+        if wait:
+            raise Overloaded('リクエストが多すぎます。少し待ってから再試行してください', wait)
+
+    def _evict(self, now):
+        """しばらく使われていない（満タンに戻った）バケットを古い順に捨てる"""
+        while self._buckets:
+            oldest = next(iter(self._buckets.values()))
+            if now - oldest.updated < self.idle_seconds:
+                break
+            self._buckets.popitem(last=False)
+
+
+class Lane:
+    """1種類の処理専用のスレッドプールと、長さに上限のある待ち行列
+
+    実行中＋待機中が workers + queue_size に達したら、新しい処理はすぐに断る。
+    rate / burst はクライアントごとの流量、address_rate / address_burst は接続元アドレスごとの
+    流量（NAT の内側のクライアント全員の合計。クライアントの識別子を変えて流量制限を
+    すり抜けられないよう、その外側にかける）。
+    executor を渡すとスレッドプールの代わりにそれ（プロセスプールなど）で実行する。
+    """
+
+    def __init__(self, name, workers, queue_size, timeout, rate=None, burst=None,
+                 address_rate=None, address_burst=None, executor=None):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate, burst) if rate else None
+        self.address_limiter = RateLimiter(address_rate, address_burst) if address_rate else None
+        self._executor = executor or ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'lane-{name}')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {'accepted': 0, 'rejected': 0, 'timed_out': 0}
+
+    @property
+    def pending(self):
+        """実行中＋待機中の処理の数"""
+        return self._pending
+
+    def _admit(self, limit):
+        with self._lock:
+            if self._pending >= limit:
+                self.stats['rejected'] += 1
+                raise Overloaded(f'{self.name} の処理が混雑しています')
+            self._pending += 1
+            self.stats['accepted'] += 1
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def call(self, fn, *args, client=None, address=None, queue=True, timeout=None, **kwargs):
+        """レーンで fn を実行して結果を返す
+
+        client・address を渡すと、それぞれの流量制限をかける。
+        queue=False のときは空いているワーカーがある場合だけ受け付ける（待ち行列に並ばない）。
+        timeout 秒以内に終わらなければ Overloaded（処理自体はバックグラウンドで完了させる）。
+        """
+        if self.limiter is not None and client is not None:
+            self.limiter.check(client)
+        if self.address_limiter is not None and address is not None:
+            self.address_limiter.check(address)
+        self._admit(self.workers + self.queue_size if queue else self.workers)
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self.stats['timed_out'] += 1
+            raise Overloaded(f'{self.name} の処理が時間内に終わりませんでした') from None
+
+    def status(self):
+        """監視用の状態"""
+        return {'workers': self.workers, 'queue_size': self.queue_size,
+                'pending': self._pending, **self.stats}
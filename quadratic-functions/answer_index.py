@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+厳選コンテンツに対する質問応答の検索索引
+自由記述の質問を、厳選の解説・固定の物理問題・クイズの解説と
+BM25 で照合し、十分に一致すれば AI を呼ばずにその回答を返す
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from curated_content import CURATED_GUIDES, GEMINI_PROMPTS, PHYSICS_PROBLEMS, QUIZ_QUESTIONS
+
+
+# 漢字・カタカナ・ひらがなそれぞれの連続と、英数字の連続
+_KANJI_RUN = re.compile(r'[㐀-䶿一-鿿々]+')
+_KATAKANA_RUN = re.compile(r'[ァ-ヿ]+')
+_HIRAGANA_RUN = re.compile(r'[ぁ-ゟ]+')
+_WORD = re.compile(r'[a-z0-9]+(?:\.[0-9]+)?')
+
+# 質問文によく出るが内容を表さない語（2文字組）
+_STOP_BIGRAMS = frozenset([
+    'です', 'ます', 'すか', 'して', 'した', 'この', 'その', 'ある', 'いる', 'する', 'れる',
+    'とは', 'なに', 'ので', 'につ', 'つい', 'いて', 'てく', 'くだ', 'ださ', 'さい',
+    '教え', 'えて', 'おし', 'しえ', 'どう', 'うし',
+])
+
+
+def tokenize(text):
+    """日本語向けのトークン化
+
+    NFKC 正規化（全角英数→半角、x² → x2）と小文字化のあと、英数字は語単位、
+    漢字・カタカナ・ひらがなはそれぞれの連続ごとに文字の2文字組（1文字だけなら1文字）に分ける。
+    分かち書き辞書を使わず、文字種の切れ目を語の境界の目安にする。
+    2文字以下のひらがなの連続（助詞・送り仮名）は捨てる。
+    """
+    text = unicodedata.normalize('NFKC', text).lower()
+    tokens = _WORD.findall(text)
+    runs = _KANJI_RUN.findall(text) + _KATAKANA_RUN.findall(text)
+    runs += [run for run in _HIRAGANA_RUN.findall(text) if len(run) > 2]
+    for run in runs:
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(bigram for bigram in (run[i:i + 2] for i in range(len(run) - 1))
+                          if bigram not in _STOP_BIGRAMS)
+    return tokens
+
+
+def curated_documents():
+    """索引に載せる文書（id, title, 検索対象の文, 回答）のリスト"""
+    documents = []
+    for key, (title, body) in CURATED_GUIDES.items():
+        # AI の回答ではないので、デモモードの見出しではなく教材の解説として見出しを付ける
+        documents.append({
+            'id': f'guide-{key}',
+            'title': key,
+            'text': GEMINI_PROMPTS.get(key, ''),
+            'answer': f'📚 教材の{title}:\n\n{body.strip()}',
+        })
+    for i, problem in enumerate(PHYSICS_PROBLEMS):
+        documents.append({
+            'id': f'problem-{i}',
+            'title': problem['title'],
+            'text': f"{problem['title']} {problem['description']} {problem['function']}",
+            'answer': f"{problem['description']}\n答え：{problem['answer']}\n解説：{problem['explanation']}",
+        })
+    for i, quiz in enumerate(QUIZ_QUESTIONS):
+        correct = quiz['options'][quiz['correct']]
+        documents.append({
+            'id': f'quiz-{i}',
+            'title': quiz['question'],
+            'text': quiz['question'],
+            'answer': f"{quiz['question']}\n答え：{correct}\n解説：{quiz['explanation']}",
+        })
+    return documents
+
+
+class AnswerIndex:
+    """BM25 の転置索引
+
+    文書の検索対象の文（text）は回答（answer）より重みを大きくして索引する。
+    検索対象の文の語は、回答するかどうかの判定用に文書ごとにも持つ。
+    """
+
+    def __init__(self, documents, k1=1.2, b=0.75, text_weight=2):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)   # 語 -> [(文書番号, 出現回数)]
+        self.lengths = []
+        self.text_terms = [set(tokenize(document['text'])) for document in documents]
+
+        for doc_id, document in enumerate(documents):
+            counts = Counter(tokenize(document['text']) * text_weight + tokenize(document['answer']))
+            self.lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                self.postings[term].append((doc_id, count))
+
+        self.average_length = sum(self.lengths) / max(len(self.lengths), 1)
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+                    for term, p in self.postings.items()}
+        # 索引にない語の idf（最も珍しい語と同じ扱い）
+        self.unknown_idf = math.log(1 + (n + 0.5) / 0.5)
+
+    def search(self, query, limit=3):
+        """質問に近い文書を (文書, スコア, 一致度) のリストで返す
+
+        一致度は、質問の語の idf の合計のうち文書に含まれる語の割合（0〜1）。
+        """
+        return [(self.documents[doc_id], score, coverage)
+                for doc_id, score, coverage in self._ranked(Counter(tokenize(query)), limit)]
+
+    def _ranked(self, terms, limit):
+        """(文書番号, スコア, 一致度) を スコアの高い順に limit 件"""
+        if not terms:
+            return []
+
+        scores = defaultdict(float)
+        matched = defaultdict(float)
+        for term in terms:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, count in self.postings[term]:
+                norm = 1 - self.b + self.b * self.lengths[doc_id] / self.average_length
+                scores[doc_id] += idf * count * (self.k1 + 1) / (count + self.k1 * norm)
+                matched[doc_id] += idf
+
+        total = self._idf_total(terms)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+        return [(doc_id, scores[doc_id], matched[doc_id] / total) for doc_id in ranked]
+
+    def _idf_total(self, terms):
+        return sum(self.idf.get(term, self.unknown_idf) for term in terms)
+
+    def text_coverage(self, doc_id, terms):
+        """質問の語の idf の合計のうち、文書の検索対象の文（text）に含まれる語の割合（0〜1）"""
+        total = self._idf_total(terms)
+        return sum(self.idf[term] for term in terms if term in self.text_terms[doc_id]) / total if total else 0.0
+
+    def answer(self, query, min_score=6.0, min_coverage=0.5, min_text_coverage=0.5, min_margin=1.3):
+        """十分に確かな一致があれば文書を返す（無ければ None）
+
+        スコアが min_score 以上、一致度が min_coverage 以上、検索対象の文だけでの
+        一致度が min_text_coverage 以上で、2位とのスコア比が min_margin 以上のときだけ答える。
+        回答の本文に「グラフ」「曲線」などのよくある語が出てくるだけの文書は、
+        その文書が答える問い（text）と質問が重ならないので返さない。
+        既定値は厳選コンテンツの索引に合わせたもの。間違った回答をすぐ返すより、AI に回す。
+        """
+        terms = Counter(tokenize(query))
+        results = self._ranked(terms, limit=2)
+        if not results:
+            return None
+        doc_id, score, coverage = results[0]
+        if score < min_score or coverage < min_coverage:
+            return None
+        if self.text_coverage(doc_id, terms) < min_text_coverage:
+            return None
+        if len(results) > 1 and score < results[1][1] * min_margin:
+            return None
+        return self.documents[doc_id]
+
+
+_default_index = None
+
+
+def default_index():
+    """厳選コンテンツの索引（初回に作成）"""
+    global _default_index
+    if _default_index is None:
+        _default_index = AnswerIndex(curated_documents())
+    return _default_index
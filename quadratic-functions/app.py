@@ -4,7 +4,9 @@
 Gemini AI統合バージョン
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, g, make_response
+from itsdangerous import BadSignature, URLSafeSerializer
+from werkzeug.serving import is_running_from_reloader
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # バックエンド設定
@@ -16,11 +18,41 @@ import plotly.utils
 import json
 import io
 import base64
+import csv
+import math
+import time
+import uuid
+import secrets
+import atexit
 from datetime import datetime
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+from comparison_plot import (LAB_FIT_COLORS, create_comparison_plot, generate_comparison_data,
+                             generate_linear_data, generate_quadratic_data)
+from quadratic_analysis import analyze_quadratics, columns_to_json
+from problem_generator import PROBLEM_KINDS, ParametricProblemGenerator, ProblemSetStore
+from grading import grade_submissions, progress_records
+from learning_progress import ProgressStore
+from lab_fitting import StreamingPolynomialFit
+from measurements import MeasurementStore
+from broadcast import BroadcastHub
+from admission import Lane, Overloaded
+from explanation_templates import compose_explanation
+from answer_index import default_index
+from conversation import ConversationStore, estimate_tokens
+from figure_pool import WarmProcessPool, render_plot_literal, update_plot_body
+from plot_images import IMAGE_FORMATS, ImageCache, image_resources, render_cached_image
+from trace_replay import TraceRecorder
+from memory_profile import MemoryProfiler
+from figure_encoding import parse_encoding
+
 # 環境変数読み込み
 load_dotenv()
 
@@ -34,75 +66,142 @@ else:
     print("⚠️  GEMINI_API_KEY が設定されていません。AI機能は無効化されます。")
 
 app = Flask(__name__)
+# クライアント ID の署名に使う鍵（複数プロセスで動かすときは SECRET_KEY で共通にする）
+app.secret_key = os.getenv('SECRET_KEY') or secrets.token_hex(32)
 
-def generate_linear_data(a, x_max=6):
-    """一次関数 y = ax のデータを生成"""
-    x = np.linspace(0, x_max, 100)
-    y = a * x
-    return x, y
-
-def generate_quadratic_data(a, x_max=6):
-    """二次関数 y = ax² のデータを生成"""
-    x = np.linspace(0, x_max, 100)
-    y = a * x**2
-    return x, y
-
-def create_comparison_plot(linear_a=2, quadratic_a=2):
-    """一次関数と二次関数の比較グラフを作成"""
-    fig = go.Figure()
-    
-    # 一次関数のプロット
-    x_linear, y_linear = generate_linear_data(linear_a)
-    fig.add_trace(go.Scatter(
-        x=x_linear, 
-        y=y_linear,
-        mode='lines',
-        name=f'一次関数: y = {linear_a}x (等速運動)',
-        line=dict(color='blue', width=3)
-    ))
-    
-    # 二次関数のプロット
-    x_quad, y_quad = generate_quadratic_data(quadratic_a)
-    fig.add_trace(go.Scatter(
-        x=x_quad, 
-        y=y_quad,
-        mode='lines',
-        name=f'二次関数: y = {quadratic_a}x² (等加速度運動)',
-        line=dict(color='red', width=3)
-    ))
-    
-    # データポイントを追加（教材の表から）
-    linear_points_x = [0, 1, 2, 3, 4, 5, 6]
-    linear_points_y = [0, 2, 4, 6, 8, 10, 12]
-    quad_points_x = [0, 1, 2, 3, 4, 5, 6]
-    quad_points_y = [0, 2, 8, 18, 32, 50, 72]
-    
-    fig.add_trace(go.Scatter(
-        x=linear_points_x,
-        y=linear_points_y,
-        mode='markers',
-        name='一次関数データ点',
-        marker=dict(color='blue', size=8)
-    ))
-    
-    fig.add_trace(go.Scatter(
-        x=quad_points_x,
-        y=quad_points_y,
-        mode='markers',
-        name='二次関数データ点',
-        marker=dict(color='red', size=8)
-    ))
-    
-    fig.update_layout(
-        title='一次関数 vs 二次関数：鉄球の運動比較',
-        xaxis_title='時間 (秒)',
-        yaxis_title='距離 (m)',
-        hovermode='x unified',
-        template='plotly_white',
-        height=500
-    )
-    
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+# 受付制御：軽いグラフ更新と重い AI 呼び出しを別のレーンで処理する
+# （AI の待ちがグラフ更新のスレッドを占有しないよう、AI レーンの待ち行列は短くする）
+# PLOT_PROCESSES=N のときはグラフ作成を N 個のワーカープロセスで行う（コア数に応じて伸びる）
+# 流量はクライアントごとにかけ、その外側に接続元アドレスごと（1クラス分）の上限をかける
+CLIENTS_PER_ADDRESS = 40
+PLOT_PROCESSES = int(os.getenv('PLOT_PROCESSES', '0'))
+if PLOT_PROCESSES:
+    plot_pool = WarmProcessPool(PLOT_PROCESSES)
+    plot_lane = Lane('plot', workers=PLOT_PROCESSES, queue_size=16 * PLOT_PROCESSES, timeout=5.0,
+                     rate=20, burst=40, address_rate=20 * CLIENTS_PER_ADDRESS,
+                     address_burst=40 * CLIENTS_PER_ADDRESS, executor=plot_pool)
+else:
+    plot_lane = Lane('plot', workers=4, queue_size=64, timeout=5.0, rate=20, burst=40,
+                     address_rate=20 * CLIENTS_PER_ADDRESS, address_burst=40 * CLIENTS_PER_ADDRESS)
+llm_lane = Lane('llm', workers=4, queue_size=8, timeout=30.0, rate=0.2, burst=3,
+                address_rate=0.2 * CLIENTS_PER_ADDRESS, address_burst=3 * CLIENTS_PER_ADDRESS)
+EXPLANATION_TIMEOUT = 10.0
+
+# メインページのグラフの配列の符号化（x は 0.001 秒、y は 0.01 m 刻みの整数。表示上の誤差は1px未満）
+PAGE_PLOT_ENCODING = {'dtype': 'f4', 'precision': {'x': 0.001, 'y': 0.01}}
+
+# WebSocket（flask-sock が無い場合は HTTP の /update_plot のみ）
+sock = Sock(app) if Sock else None
+
+# 生成済み問題セット（メモリ上に LRU で保持）と、先生ごとの出題済み索引。1セットはクラス1回分まで
+MAX_PROBLEMS_PER_SET = 500
+problem_sets = ProblemSetStore()
+
+# アップロードされた測定データの保存先
+measurement_store = MeasurementStore(
+    os.getenv('MEASUREMENT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'measurements'))
+)
+
+# 静止画のグラフ（古い端末向け）：使い回す Figure とパラメータごとのディスクキャッシュ
+plot_figures, image_cache = image_resources(
+    os.getenv('PLOT_IMAGE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plot_cache')),
+    figures=plot_lane.workers
+)
+
+# 厳選コンテンツの検索索引（よくある質問は AI を呼ばずに答える）
+answer_index = default_index()
+
+# 生徒ごとの会話の文脈（トークン数の上限つき、使われない会話は LRU で破棄）
+conversations = ConversationStore(max_conversations=2000, idle_seconds=60 * 60, token_budget=1500)
+MAX_QUESTION_CHARS = 1000
+
+# 授業のブロードキャスト（先生の操作を生徒全員に配信）
+broadcast_hub = BroadcastHub()
+
+# リクエストの記録（TRACE_FILE を設定して python app.py で起動したときだけ。trace_replay.py で再生できる）
+# app を読み込むだけのスクリプト（一括出力・負荷試験など）が同じファイルを開き直して
+# 壊さないよう、記録はサーバーのプロセスで start_trace_recording を呼んだときに始める
+TRACE_FILE = os.getenv('TRACE_FILE')
+trace_recorder = None
+
+def start_trace_recording(path):
+    """リクエストの記録を始める（既にあるファイルには書かずに終了する）"""
+    global trace_recorder
+    try:
+        trace_recorder = TraceRecorder(path)
+    except FileExistsError:
+        raise SystemExit(f"⚠️  記録ファイル {path} は既にあります。別のファイル名を指定してください。") from None
+    atexit.register(trace_recorder.close)
+
+# メインページが発行するクライアント ID（学校の NAT の内側の生徒が1つの流量制限を共有しないように）
+# 署名付きなので、クライアントが勝手に作った ID は使われない
+CLIENT_ID_COOKIE = 'client_id'
+CLIENT_ID_MAX_AGE = 30 * 24 * 60 * 60
+client_id_signer = URLSafeSerializer(app.secret_key, salt='client-id')
+
+def verified_client_id():
+    """Cookie の署名付きクライアント ID（無い・署名が正しくなければ None）"""
+    token = request.cookies.get(CLIENT_ID_COOKIE)
+    if not token:
+        return None
+    try:
+        return client_id_signer.loads(token)
+    except BadSignature:
+        return None
+
+def client_key():
+    """流量制限・記録でのクライアントの識別子
+
+    メインページが Cookie で発行した署名付きの ID を使い、無いときだけ接続元のアドレスを使う。
+    """
+    client_id = verified_client_id()
+    return f'id:{client_id}' if client_id else request.remote_addr
+
+def rate_limit_keys():
+    """Lane.call に渡す流量制限のキー（クライアントと接続元アドレス）"""
+    return {'client': client_key(), 'address': request.remote_addr}
+
+@app.before_request
+def start_trace():
+    if trace_recorder:
+        g.trace_started = time.monotonic()
+
+@app.after_request
+def record_trace(response):
+    started = g.get('trace_started')
+    if started is not None:
+        params = request.args.to_dict() if request.method == 'GET' else request.get_json(silent=True)
+        trace_recorder.record(started, client_key(), request.method, request.path,
+                              response.status_code, time.monotonic() - started, params)
+    return response
+
+# メモリ割り当ての計測（MEMORY_PROFILE=1 のときだけ。ルートごと・図の作成関数ごとに /memory で確認）
+memory_profiler = MemoryProfiler() if os.getenv('MEMORY_PROFILE') == '1' else None
+
+# 接続のあいだずっと続くルート（WebSocket・SSE）は1つずつ計測すると、ほかのリクエストが
+# 接続が終わるまで待たされるので計測しない（中で作る図は図の作成関数ごとに計測される）
+UNMEASURED_ENDPOINTS = {'memory_status', 'plot_socket', 'broadcast_events'}
+
+if memory_profiler:
+    memory_profiler.start()
+
+    @app.before_request
+    def start_memory_measurement():
+        if request.endpoint not in UNMEASURED_ENDPOINTS:
+            g.memory_measurement = memory_profiler.measure(
+                request.url_rule.rule if request.url_rule else request.path, exclusive=True)
+            g.memory_measurement.__enter__()
+
+    @app.teardown_request
+    def finish_memory_measurement(_error=None):
+        measurement = g.pop('memory_measurement', None)
+        if measurement is not None:
+            measurement.__exit__(None, None, None)
+
+# 採点結果の保存先（ノートブックの QuadraticFunctionLearning と同じ形式の進捗を1行ずつ追記）
+progress_store = ProgressStore(
+    os.getenv('PROGRESS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'learning_progress.jsonl'))
+)
 
 def get_gemini_explanation(linear_a, quadratic_a, question_type="basic"):
     """Gemini AIを使って説明を生成"""
@@ -121,74 +220,551 @@ def get_gemini_explanation(linear_a, quadratic_a, question_type="basic"):
         """
         
         response = ask_gemini_ai(prompt)
+        # キー未設定・接続エラーは例外ではなく文字列で返るので、そのときもテンプレートの解説にする
+        if gemini_failed(response):
+            return compose_explanation(linear_a, quadratic_a)
         return response
     except Exception as e:
-        return f"Gemini AIが利用できません。デモモードで実行中です。\n\n一次関数 y = {linear_a}x は等速運動を表し、時間に対して距離が一定の割合で増加します（直線のグラフ）。一方、二次関数 y = {quadratic_a}x² は等加速度運動を表し、時間が経つにつれて距離の増加率が大きくなります（曲線のグラフ）。自動車の加速や落下する物体などが二次関数の例です。"
+        return compose_explanation(linear_a, quadratic_a)
+
+# Gemini に付けるシステムプロンプトと、失敗したときの応答（会話の文脈には残さない）
+GEMINI_SYSTEM_PROMPT = """
+        あなたは数学教師です。一次関数と二次関数について、
+        中学生にも分かりやすく説明してください。
+        日本語で回答し、具体例を交えて説明してください。
+        """
+GEMINI_NOT_CONFIGURED = "Gemini APIキーが設定されていません。"
+GEMINI_ERROR_PREFIX = "Gemini AI接続エラー: "
 
 def ask_gemini_ai(question):
     """Gemini AI に質問"""
     if not model:
-        return "Gemini APIキーが設定されていません。"
+        return GEMINI_NOT_CONFIGURED
     
     try:
         # プロンプト構成
-        system_prompt = """
-        あなたは数学教師です。一次関数と二次関数について、
-        中学生にも分かりやすく説明してください。
-        日本語で回答し、具体例を交えて説明してください。
-        """
-        
-        full_prompt = f"{system_prompt}\n\n質問: {question}"
+        full_prompt = f"{GEMINI_SYSTEM_PROMPT}\n\n質問: {question}"
         
         # Gemini AIに質問
         response = model.generate_content(full_prompt)
         return response.text
         
     except Exception as e:
-        return f"Gemini AI接続エラー: {str(e)}"
+        return f"{GEMINI_ERROR_PREFIX}{str(e)}"
+
+def gemini_failed(answer):
+    """ask_gemini_ai の応答が失敗のメッセージか"""
+    return answer == GEMINI_NOT_CONFIGURED or answer.startswith(GEMINI_ERROR_PREFIX)
+
+def explain_parameters(linear_a, quadratic_a, use_ai=False):
+    """グラフ更新用の解説
+    
+    通常はテンプレートから即座に作る（explanation_templates）。
+    use_ai=True のときだけ AI に頼むが、AI レーンに空いているワーカーがなければ
+    並ばずにテンプレートの解説を返し、AI の混雑がグラフ更新に響かないようにする。
+    """
+    if not use_ai:
+        return compose_explanation(linear_a, quadratic_a)
+    try:
+        return llm_lane.call(get_gemini_explanation, linear_a, quadratic_a,
+                             queue=False, timeout=EXPLANATION_TIMEOUT)
+    except Overloaded:
+        return compose_explanation(linear_a, quadratic_a)
+
+def overloaded_response(error, **extra):
+    """混雑時の 429 応答（Retry-After 付き）"""
+    response = jsonify({'error': str(error), **extra})
+    response.headers['Retry-After'] = str(max(1, math.ceil(error.retry_after)))
+    return response, 429
 
 @app.route('/')
 def index():
-    """メインページ"""
-    initial_plot = create_comparison_plot()
-    initial_explanation = get_gemini_explanation(2, 2)
-    return render_template('index.html', 
+    """メインページ（?lite=1 で plotly.js を使わず静止画のグラフを表示する）"""
+    lite = request.args.get('lite') == '1'
+    initial_plot = 'null' if lite else create_comparison_plot(encoding=PAGE_PLOT_ENCODING)
+    initial_explanation = explain_parameters(2, 2)
+    response = make_response(render_template('index.html', 
                          plot_json=initial_plot,
-                         explanation=initial_explanation)
+                         explanation=initial_explanation,
+                         plot_encoding=PAGE_PLOT_ENCODING,
+                         lite=lite))
+    # 流量制限用のクライアント ID を発行（画像・fetch にも Cookie で付く）
+    if verified_client_id() is None:
+        response.set_cookie(CLIENT_ID_COOKIE, client_id_signer.dumps(uuid.uuid4().hex), max_age=CLIENT_ID_MAX_AGE,
+                            httponly=True, samesite='Lax')
+    return response
 
 @app.route('/update_plot', methods=['POST'])
 def update_plot():
-    """パラメータ更新時のグラフ更新"""
+    """パラメータ更新時のグラフ更新（"ai_explanation": true で解説を AI に頼む）
+    
+    "plot": false のときは解説だけを返す（静止画のグラフを使う軽量表示向け）。
+    "encoding" を指定すると配列を型付き配列で返す（例: {"precision": {"x": 0.001, "y": 0.01}}、
+    形式は figure_encoding を参照）。
+    """
     data = request.json
     linear_a = float(data.get('linear_a', 2))
     quadratic_a = float(data.get('quadratic_a', 2))
+    use_ai = bool(data.get('ai_explanation', False))
+    try:
+        encoding = parse_encoding(data.get('encoding'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    plot_json = create_comparison_plot(linear_a, quadratic_a)
-    explanation = get_gemini_explanation(linear_a, quadratic_a)
+    if not data.get('plot', True):
+        return jsonify({'explanation': explain_parameters(linear_a, quadratic_a, use_ai)})
+    
+    try:
+        if PLOT_PROCESSES:
+            plot_literal = plot_lane.call(render_plot_literal, linear_a, quadratic_a, encoding,
+                                          **rate_limit_keys())
+        else:
+            plot_json = plot_lane.call(create_comparison_plot, linear_a, quadratic_a, encoding=encoding,
+                                       **rate_limit_keys())
+    except Overloaded as e:
+        return overloaded_response(e)
+    explanation = explain_parameters(linear_a, quadratic_a, use_ai)
+    
+    if PLOT_PROCESSES:
+        # ワーカーが JSON 化済みの図をそのまま送る
+        return Response(update_plot_body(plot_literal, explanation), mimetype='application/json')
     
     return jsonify({
         'plot_json': plot_json,
         'explanation': explanation
     })
 
+@app.route('/plot.<image_format>')
+def plot_image(image_format):
+    """比較グラフの静止画（/plot.png・/plot.svg?linear_a=2&quadratic_a=2&width=640）
+    
+    パラメータは 0.01 刻み、幅は 80px 刻みに丸めてキャッシュを効かせる。
+    """
+    if image_format not in IMAGE_FORMATS:
+        return jsonify({'error': '対応している形式は png と svg です'}), 404
+    try:
+        linear_a = round(float(request.args.get('linear_a', 2)), 2)
+        quadratic_a = round(float(request.args.get('quadratic_a', 2)), 2)
+        width = int(request.args.get('width', 640))
+    except ValueError:
+        return jsonify({'error': 'パラメータは数値で指定してください'}), 400
+    if not (math.isfinite(linear_a) and math.isfinite(quadratic_a)):
+        return jsonify({'error': 'パラメータは有限の数値で指定してください'}), 400
+    width = min(max(round(width / 80) * 80, 320), 1600)
+    
+    key = ImageCache.key(linear_a, quadratic_a, width)
+    data = image_cache.get(key, image_format)
+    if data is None:
+        try:
+            # PLOT_PROCESSES のときはワーカープロセスで描く（同じディレクトリのキャッシュに保存）
+            data = plot_lane.call(render_cached_image, image_cache.directory, key, linear_a, quadratic_a,
+                                  image_format, width, **rate_limit_keys())
+        except Overloaded as e:
+            return overloaded_response(e)
+    
+    response = Response(data, mimetype=IMAGE_FORMATS[image_format])
+    response.set_etag(f'{key}-{image_format}')
+    response.cache_control.public = True
+    response.cache_control.max_age = 24 * 60 * 60
+    return response.make_conditional(request)
+
+def create_curve_frame(linear_a, quadratic_a, seq=0):
+    """スライダー更新用の小さなフレーム（曲線の座標・凡例名・解説）を作成
+    
+    グラフ全体ではなく、変化する2本の曲線のデータだけを送る。
+    """
+    x, y_linear, y_quad = generate_comparison_data(linear_a, quadratic_a)
+    return {
+        'seq': seq,
+        'x': np.round(x, 6).tolist(),
+        'y': [np.round(y_linear, 6).tolist(), np.round(y_quad, 6).tolist()],
+        'names': [f'一次関数: y = {linear_a}x (等速運動)', f'二次関数: y = {quadratic_a}x² (等加速度運動)'],
+        'explanation': explain_parameters(linear_a, quadratic_a)
+    }
+
+if sock:
+    @sock.route('/ws/plot')
+    def plot_socket(ws):
+        """スライダー更新用の常設チャンネル
+        
+        受信: {"seq": 番号, "linear_a": 2, "quadratic_a": 2}
+        送信: create_curve_frame のフレーム（同じ seq 付き）
+        処理中に届いた古い要求は読み飛ばし、最新の要求だけに応答する。
+        """
+        while True:
+            message = ws.receive()
+            while (newer := ws.receive(timeout=0)) is not None:
+                message = newer
+            
+            try:
+                data = json.loads(message)
+                if not isinstance(data, dict):
+                    raise TypeError('JSON のオブジェクトで送ってください')
+                frame = create_curve_frame(
+                    float(data.get('linear_a', 2)),
+                    float(data.get('quadratic_a', 2)),
+                    int(data.get('seq', 0))
+                )
+            except (TypeError, ValueError) as e:
+                frame = {'error': f'パラメータの形式が正しくありません: {e}'}
+            ws.send(json.dumps(frame, ensure_ascii=False))
+
+@app.route('/broadcast', methods=['POST'])
+def create_broadcast():
+    """授業を開始し、生徒用の購読先と先生用のトークンを返す"""
+    session = broadcast_hub.create()
+    return jsonify({
+        'session_id': session.session_id,
+        'teacher_token': session.teacher_token,
+        'events_url': f'/broadcast/{session.session_id}/events'
+    })
+
+@app.route('/broadcast/<session_id>', methods=['POST', 'DELETE'])
+def update_broadcast(session_id):
+    """先生のパラメータ変更：グラフと解説を一度だけ作って全員に配信
+    
+    リクエスト: {"linear_a": 2, "quadratic_a": 2}
+    ヘッダー X-Teacher-Token に授業作成時のトークンが必要。
+    DELETE で授業を終了する。
+    """
+    try:
+        session = broadcast_hub.get(session_id)
+    except KeyError:
+        return jsonify({'error': '授業が見つかりません'}), 404
+    if request.headers.get('X-Teacher-Token') != session.teacher_token:
+        return jsonify({'error': '先生用のトークンが正しくありません'}), 403
+    
+    if request.method == 'DELETE':
+        broadcast_hub.close(session_id)
+        return jsonify({'closed': session_id})
+    
+    data = request.json or {}
+    try:
+        linear_a = float(data.get('linear_a', 2))
+        quadratic_a = float(data.get('quadratic_a', 2))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'パラメータの形式が正しくありません: {e}'}), 400
+    
+    version = session.publish({
+        'linear_a': linear_a,
+        'quadratic_a': quadratic_a,
+        'plot_json': create_comparison_plot(linear_a, quadratic_a, encoding=PAGE_PLOT_ENCODING),
+        'explanation': explain_parameters(linear_a, quadratic_a)
+    })
+    return jsonify({'version': version, 'subscribers': session.subscribers})
+
+@app.route('/broadcast/<session_id>/events')
+def broadcast_events(session_id):
+    """生徒の購読（Server-Sent Events）。接続直後に最新の状態を受け取る"""
+    try:
+        session = broadcast_hub.get(session_id)
+    except KeyError:
+        return jsonify({'error': '授業が見つかりません'}), 404
+    
+    # 再接続時は受信済みの版より新しいものだけを送る
+    last_version = request.headers.get('Last-Event-ID', '0')
+    last_version = int(last_version) if last_version.isdigit() else 0
+    return Response(session.stream(last_version), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/ask_gemini', methods=['POST'])
 def ask_gemini():
-    """Gemini AIに質問を送信"""
+    """Gemini AIに質問を送信（厳選コンテンツで答えられる質問はその場で回答）
+    
+    リクエスト: {"question": "...", "conversation_id": "前回の応答の conversation_id（省略可）"}
+    同じ conversation_id で続けて質問すると、前の会話（古い部分は要約）を添えて AI に送る。
+    """
     data = request.json
-    question = data.get('question', '')
+    question = data.get('question', '')[:MAX_QUESTION_CHARS]
+    conversation = conversations.get(data.get('conversation_id'))
+    
+    match = answer_index.answer(question)
+    if match:
+        conversation.add_turn(question, match['answer'])
+        return jsonify({'answer': match['answer'], 'source': match['id'],
+                        'conversation_id': conversation.conversation_id})
     
     try:
-        prompt = f"""
+        # 前の会話は、システムプロンプト・質問と合わせてトークン数の上限に収まる分だけ添える
+        prompt = conversation.prompt(f"""
         一次関数と二次関数の教材に関する質問です：
         {question}
         
         鉄球の運動を例に、分かりやすく答えてください。
-        """
+        """, reserved_tokens=estimate_tokens(f"{GEMINI_SYSTEM_PROMPT}\n\n質問: "))
         
-        response = ask_gemini_ai(prompt)
-        return jsonify({'answer': response})
+        response = llm_lane.call(ask_gemini_ai, prompt, **rate_limit_keys())
+        if not gemini_failed(response):
+            conversation.add_turn(question, response)
+        return jsonify({'answer': response, 'conversation_id': conversation.conversation_id})
+    except Overloaded as e:
+        return overloaded_response(e, answer=f"ただいま質問が混み合っています。{max(1, math.ceil(e.retry_after))}秒ほど待ってからもう一度質問してください。",
+                                   conversation_id=conversation.conversation_id)
     except Exception as e:
-        return jsonify({'answer': f"Gemini AIが利用できません。デモモードで実行中です。\n\n'{question}' について：\n一次関数と二次関数の違いを理解するには、グラフの形（直線vs曲線）と変化率（一定vs増加）に注目してください。実際の運動で考えると、一次関数は一定速度での移動、二次関数は加速しながらの移動を表します。"})
+        return jsonify({'answer': f"Gemini AIが利用できません。デモモードで実行中です。\n\n'{question}' について：\n一次関数と二次関数の違いを理解するには、グラフの形（直線vs曲線）と変化率（一定vs増加）に注目してください。実際の運動で考えると、一次関数は一定速度での移動、二次関数は加速しながらの移動を表します。",
+                        'conversation_id': conversation.conversation_id})
+
+@app.route('/admission')
+def admission_status():
+    """各レーンの混雑状況"""
+    return jsonify({'plot': plot_lane.status(), 'llm': llm_lane.status()})
+
+@app.route('/memory')
+def memory_status():
+    """ルート・図の作成関数ごとのメモリ割り当て（MEMORY_PROFILE=1 のときのみ）"""
+    if not memory_profiler:
+        return jsonify({'error': 'メモリ計測は無効です（MEMORY_PROFILE=1 で有効）'}), 404
+    return jsonify(memory_profiler.report())
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    """二次関数の係数の配列をまとめて解析（頂点・判別式・解・切片・増減）
+    
+    リクエスト: {"a": [...], "b": [...], "c": [...], "exact": false}
+    または {"coefficients": [[a, b, c], ...], "exact": false}
+    """
+    data = request.json or {}
+    
+    try:
+        if 'coefficients' in data:
+            coefficients = np.asarray(data['coefficients'], dtype=float).reshape(-1, 3)
+            a, b, c = coefficients.T
+        else:
+            a, b, c = (np.asarray(data[key], dtype=float) for key in ('a', 'b', 'c'))
+        result = analyze_quadratics(a, b, c, exact=bool(data.get('exact', False)))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'係数の形式が正しくありません: {e}'}), 400
+    
+    return jsonify({'count': len(result['vertex_x']), **columns_to_json(result)})
+
+@app.route('/fit_lab_data', methods=['POST'])
+def fit_lab_data():
+    """生徒の実験データ（時間, 距離）に一次・二次モデルを当てはめ、比較グラフに重ねる
+    
+    リクエスト: {"t": [...], "distance": [...], "linear_a": 2, "quadratic_a": 2}
+    """
+    data = request.json or {}
+    
+    try:
+        fitter = StreamingPolynomialFit(max_degree=2)
+        fitter.update(data['t'], data['distance'])
+        fits = fitter.fits()
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'実験データの形式が正しくありません: {e}'}), 400
+    
+    linear_a = float(data.get('linear_a', 2))
+    quadratic_a = float(data.get('quadratic_a', 2))
+    
+    return jsonify({
+        'fits': fits,
+        'plot_json': create_comparison_plot(linear_a, quadratic_a, lab_fits=fits)
+    })
+
+@app.route('/measurements', methods=['POST'])
+def upload_measurements():
+    """測定データの CSV をアップロード（multipart の file、または本文そのものが CSV）
+    
+    CSV はチャンク単位で読み込み、ファイル全体をメモリに載せない。
+    """
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    name = request.form.get('name') or (upload.filename if upload else '')
+    
+    try:
+        meta = measurement_store.ingest_csv(
+            stream,
+            t_column=request.args.get('t_column', type=int),
+            value_column=request.args.get('value_column', type=int),
+            name=name
+        )
+    except ValueError as e:
+        return jsonify({'error': f'CSV を読み込めません: {e}'}), 400
+    
+    return jsonify(meta)
+
+@app.route('/measurements/<measurement_id>')
+def get_measurements(measurement_id):
+    """測定データを間引いて取得（?points=1000&t_min=&t_max=&method=lttb|minmax）"""
+    try:
+        t, distance, total = measurement_store.view(
+            measurement_id,
+            points=min(request.args.get('points', 1000, type=int), 20000),
+            t_min=request.args.get('t_min', type=float),
+            t_max=request.args.get('t_max', type=float),
+            method=request.args.get('method', 'lttb')
+        )
+    except KeyError:
+        return jsonify({'error': '測定データが見つかりません'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'id': measurement_id, 'total': total, 't': t.tolist(), 'distance': distance.tolist()})
+
+@app.route('/measurements/<measurement_id>/plot')
+def plot_measurements(measurement_id):
+    """測定データ（間引き済み）と近似曲線を重ねた比較グラフ"""
+    try:
+        meta = measurement_store.meta(measurement_id)
+        t, distance, _ = measurement_store.view(
+            measurement_id,
+            points=min(request.args.get('points', 1000, type=int), 20000),
+            t_min=request.args.get('t_min', type=float),
+            t_max=request.args.get('t_max', type=float),
+            method=request.args.get('method', 'lttb')
+        )
+    except KeyError:
+        return jsonify({'error': '測定データが見つかりません'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    plot_json = create_comparison_plot(
+        request.args.get('linear_a', 2, type=float),
+        request.args.get('quadratic_a', 2, type=float),
+        lab_fits=meta['fits'],
+        measurements=[{'name': meta['name'] or '測定データ', 't': t, 'distance': distance}]
+    )
+    return jsonify({'plot_json': plot_json, 'fits': meta['fits']})
+
+@app.route('/problems', methods=['POST'])
+def create_problem_set():
+    """重複なしの問題セットを生成
+    
+    リクエスト: {"count": 100, "kinds": ["linear", "quadratic", "motion", "profit"], "seed": null,
+                 "teacher_id": "t1"}
+    teacher_id を指定すると、同じ先生のセット同士でも同じ問題を出さない（使い切った種類は重複を許す）
+    """
+    data = request.json or {}
+    
+    try:
+        count = int(data.get('count', 20))
+        if not 0 < count <= MAX_PROBLEMS_PER_SET:
+            raise ValueError(f'count は 1〜{MAX_PROBLEMS_PER_SET} で指定してください')
+        generator = ParametricProblemGenerator(seed=data.get('seed'),
+                                               index=problem_sets.index_for(data.get('teacher_id')))
+        problems = generator.generate(count, data.get('kinds'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    set_id = problem_sets.add(problems)
+    return jsonify({'set_id': set_id, 'count': len(problems), 'kinds': list(data.get('kinds') or PROBLEM_KINDS)})
+
+@app.route('/problems/<set_id>')
+def get_problem_page(set_id):
+    """問題セットをページ単位で取得（?page=1&per_page=50）"""
+    problems = problem_sets.get(set_id)
+    if problems is None:
+        return jsonify({'error': '問題セットが見つかりません'}), 404
+    
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(max(1, request.args.get('per_page', 50, type=int)), 1000)
+    start = (page - 1) * per_page
+    
+    return jsonify({
+        'set_id': set_id,
+        'page': page,
+        'per_page': per_page,
+        'total': len(problems),
+        'pages': -(-len(problems) // per_page),
+        'problems': problems[start:start + per_page]
+    })
+
+@app.route('/problems/<set_id>/export')
+def export_problem_set(set_id):
+    """問題セットを一括ダウンロード（?format=csv|json|txt、txt は印刷用ワークシート）"""
+    problems = problem_sets.get(set_id)
+    if problems is None:
+        return jsonify({'error': '問題セットが見つかりません'}), 404
+    
+    export_format = request.args.get('format', 'csv')
+    headers = {'Content-Disposition': f'attachment; filename=problems_{set_id}.{export_format}'}
+    
+    if export_format == 'json':
+        body = json.dumps(problems, ensure_ascii=False)
+        return Response(body, mimetype='application/json', headers=headers)
+    
+    if export_format == 'txt':
+        return Response(_worksheet_lines(problems), mimetype='text/plain; charset=utf-8', headers=headers)
+    
+    if export_format == 'csv':
+        return Response(_csv_lines(problems), mimetype='text/csv; charset=utf-8', headers=headers)
+    
+    return jsonify({'error': f'未対応の形式です: {export_format}'}), 400
+
+@app.route('/grade', methods=['POST'])
+def grade():
+    """問題セットに対するクラス全員の解答を一括採点
+    
+    リクエスト: {"set_id": "...", "submissions": [{"student_id": "s1", "answers": [12, {"choice": 2}, null]}],
+                 "rel_tol": 0.001, "abs_tol": 0.000001, "topic": "関数基礎", "save_progress": true}
+    """
+    data = request.json or {}
+    problems = problem_sets.get(data.get('set_id'))
+    if problems is None:
+        return jsonify({'error': '問題セットが見つかりません'}), 404
+    
+    try:
+        result = grade_submissions(
+            problems, data.get('submissions', []),
+            rel_tol=float(data.get('rel_tol', 1e-3)),
+            abs_tol=float(data.get('abs_tol', 1e-6))
+        )
+    except (KeyError, TypeError, ValueError, OverflowError) as e:
+        return jsonify({'error': f'提出データの形式が正しくありません: {e}'}), 400
+    
+    if data.get('save_progress', True) and result['students']:
+        progress_store.save_batch(progress_records(result, data.get('topic', '問題セット')))
+    
+    return jsonify(result)
+
+def _csv_lines(problems):
+    """問題を CSV の行として逐次生成"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = ['id', 'kind', 'title', 'description', 'function', 'options', 'correct', 'answer', 'explanation']
+    writer.writerow(columns)
+    for i, problem in enumerate(problems):
+        row = dict(problem, options=' / '.join(problem['options']), correct=problem['correct'] + 1)
+        writer.writerow([row[column] for column in columns])
+        if i % 1000 == 999:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _worksheet_lines(problems):
+    """印刷用ワークシート（問題＋末尾に解答・解説）を逐次生成"""
+    yield '📝 練習問題\n\n'
+    for i, problem in enumerate(problems, 1):
+        options = '  '.join(f'({j}) {option}' for j, option in enumerate(problem['options'], 1))
+        yield f"問題 {i}: {problem['title']}\n{problem['description']}\n{options}\n\n"
+    
+    yield '\n💡 解答と解説\n\n'
+    for i, problem in enumerate(problems, 1):
+        yield f"{i}. ({problem['correct'] + 1}) {problem['answer']}\n   {problem['explanation']}\n"
+
+# 図の作成関数を計測付きにする（呼び出し側はどれもモジュールの名前で参照する）
+if memory_profiler:
+    create_comparison_plot = memory_profiler.wrap(create_comparison_plot)
+    create_curve_frame = memory_profiler.wrap(create_curve_frame)
+    if not PLOT_PROCESSES:  # ワーカープロセスに送る関数は pickle できるよう包まない
+        render_cached_image = memory_profiler.wrap(render_cached_image)
+    explain_parameters = memory_profiler.wrap(explain_parameters)
+
+def main():
+    """開発用サーバーを起動（python app.py、または PLOT_PROCESSES のときは python serve.py）"""
+    # 記録中はリローダーを使わない（再起動のたびに記録を開き直さないように）
+    use_reloader = not TRACE_FILE
+    # リローダーの親プロセスはサーバーを動かさないので、ワーカーと記録はサーバーのプロセスだけで始める
+    if not use_reloader or is_running_from_reloader():
+        if PLOT_PROCESSES:
+            plot_pool.start()
+        if TRACE_FILE:
+            start_trace_recording(TRACE_FILE)
+    app.run(debug=True, use_reloader=use_reloader)
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    if PLOT_PROCESSES and not is_running_from_reloader():
+        # spawn のワーカーは起動スクリプトを読み込み直すので、このファイルの処理がワーカーごとに走る
+        print('⚠️ PLOT_PROCESSES を使うときは python serve.py で起動してください'
+              '（python app.py ではワーカーごとに app.py が読み込み直されます）')
+    main()
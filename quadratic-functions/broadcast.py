@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+授業用のブロードキャスト
+先生がパラメータを変えたときに一度だけグラフと解説を作り、
+同じ内容を購読中の生徒全員に Server-Sent Events で配信する
+"""
+
+import json
+import secrets
+import threading
+import time
+import uuid
+
+
+class BroadcastSession:
+    """1つの授業の配信状態
+
+    最新の配信内容は SSE 形式に整形済みのバイト列で1つだけ保持する。
+    生徒が何人いても、更新1回あたりの計算と整形は1回で済む。
+    """
+
+    def __init__(self, session_id, teacher_token):
+        self.session_id = session_id
+        self.teacher_token = teacher_token
+        self.version = 0
+        self.subscribers = 0
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._event = None
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def publish(self, payload):
+        """配信内容を差し替え、待機中の購読者を起こす"""
+        data = json.dumps(payload, ensure_ascii=False)
+        with self._condition:
+            self.version += 1
+            self._event = f'id: {self.version}\nevent: update\ndata: {data}\n\n'.encode('utf-8')
+            self.updated_at = time.time()
+            self._condition.notify_all()
+        return self.version
+
+    def close(self):
+        """授業を終了し、購読者の接続を閉じさせる"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def wait(self, last_version, timeout):
+        """last_version より新しい配信を待つ
+
+        (version, event) を返す。時間切れなら event は None、終了済みなら (None, None)。
+        途中の更新は飛ばし、常に最新の1件だけを返す。
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._closed or self.version > last_version, timeout)
+            if self._closed:
+                return None, None
+            if self.version > last_version:
+                return self.version, self._event
+            return last_version, None
+
+    def stream(self, last_version=0, keepalive=15.0):
+        """SSE のレスポンス本体となるジェネレーター"""
+        with self._condition:
+            self.subscribers += 1
+        try:
+            yield b'retry: 3000\n\n'
+            while True:
+                version, event = self.wait(last_version, keepalive)
+                if version is None:
+                    yield b'event: end\ndata: {}\n\n'
+                    return
+                # 変化がなければコメント行で接続を維持する
+                yield event if event is not None else b': keepalive\n\n'
+                last_version = version
+        finally:
+            with self._condition:
+                self.subscribers -= 1
+
+
+class BroadcastHub:
+    """授業セッションの一覧"""
+
+    def __init__(self, max_age=6 * 60 * 60):
+        self.max_age = max_age
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self):
+        """新しい授業を作成（先生用のトークンは操作時の確認に使う）"""
+        session = BroadcastSession(uuid.uuid4().hex[:8], secrets.token_urlsafe(16))
+        with self._lock:
+            self._expire()
+            self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id):
+        """授業を取得（無ければ KeyError）"""
+        with self._lock:
+            return self._sessions[session_id]
+
+    def close(self, session_id):
+        """授業を終了して一覧から外す"""
+        with self._lock:
+            session = self._sessions.pop(session_id)
+        session.close()
+
+    def _expire(self):
+        """長時間更新のない授業を片付ける"""
+        now = time.time()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.updated_at > self.max_age:
+                self._sessions.pop(session_id).close()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+オフライン版の静的サイトの作成
+スライダーの取りうる値（0.5〜5 を 0.1 刻み、index.html と同じ）すべての組について
+グラフの曲線とテンプレートの解説を前もって計算し、まとめたデータファイル（data.js）と
+それを引くだけの静的なページを書き出す。サーバー無しで USB メモリからでも開ける
+
+既定の出力先はリポジトリ直下の docs/quadratic-functions（GitHub Pages で公開している docs の
+トップページの「デモを見る」のリンク先）。書き出したファイルをコミットすると Pages に載る
+
+使い方:
+    python build_static_site.py                 # docs/quadratic-functions に出力（Pages で公開）
+    python build_static_site.py -o offline     # USB メモリなどに配る場合は別のディレクトリへ
+
+出力:
+    index.html      スライダーの更新をブラウザ内で data.js から引くページ
+    data.js         曲線と解説のデータ（file:// でも読めるよう JSON ではなくスクリプト）
+    plotly.min.js   plotly.js（CDN に頼らない）
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+
+import numpy as np
+
+# 出力先の既定（実行したディレクトリによらず、リポジトリ直下の GitHub Pages の docs の下）
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'docs', 'quadratic-functions')
+
+# index.html のスライダーの範囲（両方のスライダーで同じ）
+SLIDER_MIN = 0.5
+SLIDER_MAX = 5.0
+SLIDER_STEP = 0.1
+
+_SENTENCE_END = re.compile(r'(?<=。)')
+
+
+def slider_values():
+    """スライダーの取りうる値（表示と同じく小数1桁）"""
+    count = int(round((SLIDER_MAX - SLIDER_MIN) / SLIDER_STEP)) + 1
+    return [round(SLIDER_MIN + i * SLIDER_STEP, 1) for i in range(count)]
+
+
+def _rounded(values, digits=4):
+    return [round(float(v), digits) for v in np.asarray(values)]
+
+
+def pack_explanations(explanations):
+    """解説を文の表と、解説ごとの文番号のリストにまとめる
+
+    解説はほとんどの文がほかの組と共通なので、文単位で重複を除くと大きく縮む。
+    """
+    table = {}
+    packed = []
+    for text in explanations:
+        indices = [table.setdefault(sentence, len(table)) for sentence in _SENTENCE_END.split(text) if sentence]
+        packed.append(indices)
+    return list(table), packed
+
+
+def build_snapshot(app):
+    """全パラメータの組の曲線と解説のデータ
+
+    一次関数の曲線は linear_a だけ、二次関数の曲線は quadratic_a だけで決まるので、
+    曲線はスライダーの値ごとに持ち、解説は組ごとに持つ。
+    """
+    from explanation_templates import compose_explanation
+
+    values = slider_values()
+    linear, quadratic = [], []
+    for a in values:
+        x, y = app.generate_linear_data(a)
+        linear.append({'x': _rounded(x), 'y': _rounded(y), 'name': f'一次関数: y = {a}x (等速運動)'})
+        x, y = app.generate_quadratic_data(a)
+        quadratic.append({'x': _rounded(x), 'y': _rounded(y), 'name': f'二次関数: y = {a}x² (等加速度運動)'})
+
+    pairs = [(linear_a, quadratic_a) for linear_a in values for quadratic_a in values]
+    texts = [compose_explanation(linear_a, quadratic_a) for linear_a, quadratic_a in pairs]
+    sentences, explanations = pack_explanations(texts)
+
+    # 文の表から組み立て直した解説が、サーバー版の解説とそのまま一致するか確かめる
+    for (linear_a, quadratic_a), text, indices in zip(pairs, texts, explanations):
+        rebuilt = ''.join(sentences[i] for i in indices)
+        if rebuilt != text or rebuilt != app.explain_parameters(linear_a, quadratic_a):
+            raise ValueError(f'解説を文の表から復元できません（linear_a={linear_a}, quadratic_a={quadratic_a}）')
+
+    return {
+        'slider': {'min': SLIDER_MIN, 'step': SLIDER_STEP, 'count': len(values)},
+        'linear': linear,
+        'quadratic': quadratic,
+        'sentences': sentences,
+        'explanations': explanations,   # linear の番号 * count + quadratic の番号
+    }
+
+
+def build_site(output_dir):
+    """静的サイトを書き出し、ファイル名と大きさ（バイト）の dict を返す"""
+    from plotly.offline import get_plotlyjs
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+
+    os.makedirs(output_dir, exist_ok=True)
+    snapshot = build_snapshot(app)
+    with app.app.test_request_context('/'):
+        page = app.render_template('index.html',
+                                   plot_json=app.create_comparison_plot(encoding=app.PAGE_PLOT_ENCODING),
+                                   explanation=app.explain_parameters(2, 2),
+                                   plot_encoding=app.PAGE_PLOT_ENCODING,
+                                   lite=False, offline=True)
+
+    files = {
+        'index.html': page,
+        'data.js': 'window.SNAPSHOT = ' + json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')) + ';\n',
+        'plotly.min.js': get_plotlyjs(),
+    }
+    sizes = {}
+    for name, content in files.items():
+        data = content.encode('utf-8')
+        with open(os.path.join(output_dir, name), 'wb') as f:
+            f.write(data)
+        sizes[name] = len(data)
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='オフライン版の静的サイトを作成')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help='出力先のディレクトリ（既定は Pages の docs/quadratic-functions）')
+    args = parser.parse_args()
+
+    sizes = build_site(args.output)
+    count = len(slider_values()) ** 2
+    print(f'{count}通りのパラメータを {args.output} に出力しました')
+    for name, size in sizes.items():
+        print(f'  {name}: {size / 1024:.0f} KB')
+
+
+if __name__ == '__main__':
+    main()
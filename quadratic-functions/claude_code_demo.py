@@ -7,7 +7,6 @@ Gemini Code Interactive Demo
 import numpy as np
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import pandas as pd
 from datetime import datetime
 import json
@@ -16,6 +15,10 @@ import sys
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from curated_content import FALLBACK_RESPONSES, GEMINI_PROMPTS
+from figure_skeleton import subplot_figure
+from function_core import evaluate_family, format_polynomial, sample_family
+
 # 環境変数読み込み
 load_dotenv()
 
@@ -78,35 +81,36 @@ class GeminiCodeInteractiveDemo:
     def create_advanced_visualization(self, linear_a=2, quad_a=2):
         """高度な可視化システム"""
         
-        # データ生成
-        x = np.linspace(0, 6, 1000)
-        y_linear = linear_a * x
-        y_quad = quad_a * x**2
-        
-        # 微分計算
-        v_linear = np.full_like(x, linear_a)
-        v_quad = 2 * quad_a * x
-        
-        # 加速度計算
-        a_linear = np.zeros_like(x)
-        a_quad = np.full_like(x, 2 * quad_a)
+        # データ生成：値・速度（一階微分）・加速度（二階微分）を共通グリッドで一括評価
+        x, (values, first, second) = sample_family([[linear_a, 0], [quad_a, 0, 0]], 0, 6)
+        y_linear, y_quad = values
+        v_linear, v_quad = first
+        a_linear, a_quad = second
         
         # 教材データポイント
         data_x = np.array([0, 1, 2, 3, 4, 5, 6])
         data_y_linear = np.array([0, 2, 4, 6, 8, 10, 12])
         data_y_quad = np.array([0, 2, 8, 18, 32, 50, 72])
         
-        # 4分割プロット作成
-        fig = make_subplots(
+        # 4分割プロット作成（レイアウトと軸ラベルはキャッシュした骨組みから）
+        fig = subplot_figure(
             rows=2, cols=2,
             subplot_titles=(
-                f'📊 関数比較 (線形a={linear_a}, 二次a={quad_a})',
+                '📊 関数比較',
                 '⚡ 速度分析 (一階微分)',
                 '🚀 加速度分析 (二階微分)',
                 '🎯 実データ vs 理論値'
             ),
-            specs=[[{}, {}], [{}, {}]]
+            specs=[[{}, {}], [{}, {}]],
+            axis_titles=[("時間 (秒)", "距離 (m)"), ("時間 (秒)", "速度 (m/s)"),
+                         ("時間 (秒)", "加速度 (m/s²)"), ("時間 (秒)", "距離 (m)")],
+            height=700,
+            title_text="🎯 Gemini Code Interactive: 一次関数 vs 二次関数 完全分析",
+            showlegend=True,
+            template="plotly_white"
         )
+        # パラメータを含む小見出しは呼び出しごとに書き換える
+        fig.layout.annotations[0].text = f'📊 関数比較 (線形a={linear_a}, 二次a={quad_a})'
         
         # 1. 関数比較
         fig.add_trace(
@@ -173,46 +177,60 @@ class GeminiCodeInteractiveDemo:
             row=2, col=2
         )
         
-        # レイアウト設定
-        fig.update_layout(
-            height=700,
-            title_text="🎯 Gemini Code Interactive: 一次関数 vs 二次関数 完全分析",
-            showlegend=True,
-            template="plotly_white"
-        )
+        return fig
+    
+    def calculate_polynomial_insights(self, polynomials, time=6):
+        """任意次数の多項式運動の物理的洞察（位置・速度・加速度）を計算
+        
+        polynomials は係数リスト（高次から順）のリスト。例: [[2, 0], [1, 0, 0], [0.5, 0, 0, 0]]
+        """
         
-        # 軸ラベル設定
-        fig.update_xaxes(title_text="時間 (秒)")
-        fig.update_yaxes(title_text="距離 (m)", row=1, col=1)
-        fig.update_yaxes(title_text="速度 (m/s)", row=1, col=2)
-        fig.update_yaxes(title_text="加速度 (m/s²)", row=2, col=1)
-        fig.update_yaxes(title_text="距離 (m)", row=2, col=2)
+        position, velocity, acceleration = evaluate_family(polynomials, [time])[:, :, 0]
         
-        return fig
+        insights = {
+            'time': time,
+            'functions': [
+                {
+                    'function': format_polynomial(p, 't'),
+                    'degree': len(p) - 1,
+                    'position': float(position[i]),
+                    'velocity': float(velocity[i]),
+                    'acceleration': float(acceleration[i]),
+                }
+                for i, p in enumerate(polynomials)
+            ]
+        }
+        
+        # 比較分析（最後の関数 - 最初の関数）
+        first, last = insights['functions'][0], insights['functions'][-1]
+        insights['comparison'] = {
+            'position_difference': last['position'] - first['position'],
+            'velocity_difference': last['velocity'] - first['velocity'],
+            'acceleration_difference': last['acceleration'] - first['acceleration']
+        }
+        
+        return insights
     
     def calculate_physics_insights(self, linear_a=2, quad_a=2, time=6):
-        """物理的洞察の計算"""
+        """物理的洞察の計算（一次・二次関数を多項式の特別な場合として計算）"""
+        
+        polynomial = self.calculate_polynomial_insights([[linear_a, 0], [quad_a, 0, 0]], time)
+        linear, quadratic = polynomial['functions']
         
         insights = {
             'linear': {
-                'position_6s': linear_a * time,
-                'velocity': linear_a,
-                'acceleration': 0,
-                'distance_traveled': linear_a * time
+                'position_6s': linear['position'],
+                'velocity': linear['velocity'],
+                'acceleration': linear['acceleration'],
+                'distance_traveled': linear['position']
             },
             'quadratic': {
-                'position_6s': quad_a * time**2,
-                'velocity_6s': 2 * quad_a * time,
-                'acceleration': 2 * quad_a,
-                'distance_traveled': quad_a * time**2
-            }
-        }
-        
-        # 比較分析
-        insights['comparison'] = {
-            'position_difference': insights['quadratic']['position_6s'] - insights['linear']['position_6s'],
-            'velocity_difference': insights['quadratic']['velocity_6s'] - insights['linear']['velocity'],
-            'acceleration_difference': insights['quadratic']['acceleration'] - insights['linear']['acceleration']
+                'position_6s': quadratic['position'],
+                'velocity_6s': quadratic['velocity'],
+                'acceleration': quadratic['acceleration'],
+                'distance_traveled': quadratic['position']
+            },
+            'comparison': polynomial['comparison']
         }
         
         return insights
@@ -243,22 +261,7 @@ class GeminiCodeInteractiveDemo:
         
         if model:
             try:
-                prompts = {
-                    "explain_difference": """
-                    一次関数と二次関数の根本的な違いについて、中学生にも分かりやすく説明してください。
-                    物理的な意味（等速運動と等加速度運動）も含めて、具体例を交えて解説してください。
-                    """,
-                    
-                    "real_world_applications": """
-                    一次関数と二次関数の実世界での応用例を教えてください。
-                    日常生活や仕事でどのように使われているか、具体的な例を挙げて説明してください。
-                    """,
-                    
-                    "learning_tips": """
-                    一次関数と二次関数を効果的に学習するためのコツやアドバイスを教えてください。
-                    つまずきやすいポイントと克服方法も含めて説明してください。
-                    """
-                }
+                prompts = GEMINI_PROMPTS
                 
                 if question_type in prompts:
                     response = model.generate_content(prompts[question_type])
@@ -278,68 +281,7 @@ class GeminiCodeInteractiveDemo:
     def _fallback_responses(self, question_type):
         """Gemini APIが利用できない場合のフォールバック"""
         
-        responses = {
-            "explain_difference": """
-🤖 Gemini の詳細解説 (デモモード):
-
-一次関数と二次関数の根本的な違いは「変化の仕方」にあります。
-
-【一次関数 y = ax】
-• 変化率が一定（毎秒同じ距離だけ進む）
-• グラフは直線
-• 物理的には「等速運動」
-• 例：時速60kmで走る車、時給1000円のアルバイト
-
-【二次関数 y = ax²】
-• 変化率が変化する（時間が経つほど早くなる）
-• グラフは放物線
-• 物理的には「等加速度運動」
-• 例：自由落下する物体、車の加速
-
-この違いが現実世界で重要な理由は、多くの自然現象が
-加速的な変化（二次関数的）をするからです。
-            """,
-            
-            "real_world_applications": """
-🤖 Gemini の実世界応用解説 (デモモード):
-
-【一次関数の応用】
-🚗 高速道路の走行距離計算
-💰 従量制料金（電気、ガス、水道）
-📏 単位換算（温度、長さ、重さ）
-
-【二次関数の応用】
-🚗 ブレーキ距離（速度の2乗に比例）
-💸 複利計算（時間の経過で加速的増加）
-🏀 投球軌道（重力による放物線運動）
-📊 最適化問題（利益最大化、コスト最小化）
-
-特に重要なのは、二次関数が「最適化」に使われることです。
-企業の利益計算、建築の強度計算、投資のリスク分析など、
-現代社会の多くの分野で活用されています。
-            """,
-            
-            "learning_tips": """
-🤖 Gemini の学習アドバイス (デモモード):
-
-【効果的な学習方法】
-1. 📊 まずはグラフで視覚的に理解
-2. 🧮 具体的な数値で計算練習
-3. 🌍 実生活の例で応用イメージ
-4. 🔄 比較分析で違いを明確化
-
-【つまずきやすいポイント】
-• 「なぜ二次関数は曲線？」→ 変化率が変化するから
-• 「微分って何？」→ その瞬間の変化率（速度）
-• 「最大値・最小値」→ 頂点の概念
-
-【継続学習のコツ】
-• 毎日5分でも数学に触れる
-• 日常で関数を見つける習慣
-• 「なぜ？」を大切にする
-• 間違いを恐れずに挑戦
-            """
-        }
+        responses = FALLBACK_RESPONSES
         
         print("\n🤖 Gemini AI 統合デモ (デモモード)")
         print("=" * 50)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+一次関数と二次関数の比較グラフ
+app.py のメインページのグラフ。読み込んでも副作用が無いので、グラフ作成の
+ワーカープロセスやワークシートの一括出力からも app を読み込まずに使える
+"""
+
+import json
+
+import plotly.graph_objects as go
+import plotly.utils
+
+from figure_encoding import encode_figure
+from function_core import format_polynomial, sample_family
+
+# 実験データの近似曲線の色（次数ごと）
+LAB_FIT_COLORS = {1: 'green', 2: 'purple'}
+
+
+def generate_linear_data(a, x_max=6):
+    """一次関数 y = ax のデータを生成（直線なので両端の2点）"""
+    x, (values, _, _) = sample_family([[a, 0]], 0, x_max)
+    return x, values[0]
+
+
+def generate_quadratic_data(a, x_max=6):
+    """二次関数 y = ax² のデータを生成（描画誤差0.5px以内の最小点数）"""
+    x, (values, _, _) = sample_family([[a, 0, 0]], 0, x_max)
+    return x, values[0]
+
+
+def generate_comparison_data(linear_a, quadratic_a, x_max=6):
+    """一次関数と二次関数を共通の x グリッドでまとめて生成"""
+    x, (values, _, _) = sample_family([[linear_a, 0], [quadratic_a, 0, 0]], 0, x_max)
+    return x, values[0], values[1]
+
+
+def create_comparison_plot(linear_a=2, quadratic_a=2, lab_fits=None, measurements=None, encoding=None):
+    """一次関数と二次関数の比較グラフを作成し、JSON 文字列で返す
+
+    lab_fits に lab_fitting の当てはめ結果のリストを渡すと、実験データの近似曲線を重ねて描く。
+    measurements に {'name', 't', 'distance'} のリストを渡すと、間引き済みの測定点を描く。
+    encoding（figure_encoding.parse_encoding の結果）を渡すと配列を型付き配列で符号化する。
+    """
+    fig = go.Figure()
+
+    # 一次関数・二次関数を1回の評価でまとめて計算
+    x, y_linear, y_quad = generate_comparison_data(linear_a, quadratic_a)
+
+    # 一次関数のプロット
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=y_linear,
+        mode='lines',
+        name=f'一次関数: y = {linear_a}x (等速運動)',
+        line=dict(color='blue', width=3)
+    ))
+
+    # 二次関数のプロット
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=y_quad,
+        mode='lines',
+        name=f'二次関数: y = {quadratic_a}x² (等加速度運動)',
+        line=dict(color='red', width=3)
+    ))
+
+    # データポイントを追加（教材の表から）
+    linear_points_x = [0, 1, 2, 3, 4, 5, 6]
+    linear_points_y = [0, 2, 4, 6, 8, 10, 12]
+    quad_points_x = [0, 1, 2, 3, 4, 5, 6]
+    quad_points_y = [0, 2, 8, 18, 32, 50, 72]
+
+    fig.add_trace(go.Scatter(
+        x=linear_points_x,
+        y=linear_points_y,
+        mode='markers',
+        name='一次関数データ点',
+        marker=dict(color='blue', size=8)
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=quad_points_x,
+        y=quad_points_y,
+        mode='markers',
+        name='二次関数データ点',
+        marker=dict(color='red', size=8)
+    ))
+
+    # 測定データ（教材のデータ点の隣に描く。点数が多い場合は WebGL）
+    for measurement in measurements or []:
+        trace_type = go.Scattergl if len(measurement['t']) > 1000 else go.Scatter
+        fig.add_trace(trace_type(
+            x=measurement['t'],
+            y=measurement['distance'],
+            mode='markers',
+            name=measurement.get('name') or '測定データ',
+            marker=dict(color='darkorange', size=4, opacity=0.7)
+        ))
+
+    # 実験データの近似曲線
+    for fit in lab_fits or []:
+        t, (values, _, _) = sample_family([fit['coefficients']], fit['t_min'], fit['t_max'])
+        label = '一次' if fit['degree'] == 1 else '二次' if fit['degree'] == 2 else f"{fit['degree']}次"
+        fig.add_trace(go.Scatter(
+            x=t,
+            y=values[0],
+            mode='lines',
+            name=f"実験データの{label}近似: {format_polynomial(fit['coefficients'], 't')} (R²={fit['r_squared']:.4f})",
+            line=dict(color=LAB_FIT_COLORS.get(fit['degree'], 'gray'), width=2, dash='dash')
+        ))
+
+    fig.update_layout(
+        title='一次関数 vs 二次関数：鉄球の運動比較',
+        xaxis_title='時間 (秒)',
+        yaxis_title='距離 (m)',
+        hovermode='x unified',
+        template='plotly_white',
+        height=500
+    )
+
+    if encoding:
+        return encode_figure(fig, **encoding)
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
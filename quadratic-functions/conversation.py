@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+生徒ごとの会話の文脈
+続けての質問に前の会話を添えて AI に送る。文脈にはトークン数の上限があり、
+古いやり取りは要約にまとめる。使われていない会話は LRU で捨てるので、
+1回のプロンプトの大きさもサーバーのメモリも一定の範囲に収まる
+"""
+
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+# 日本語の文字（1文字 ≒ 1トークン）と、それ以外の語（4文字 ≒ 1トークン）
+_CJK = re.compile(r'[぀-ヿ㐀-䶿一-鿿＀-￯]')
+_SENTENCE_END = re.compile(r'(?<=[。！？!?\n])')
+
+
+def estimate_tokens(text):
+    """トークン数の概算（API を呼ばずに数える）"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _first_sentence(text, limit):
+    """最初の1文を limit 文字以内で取り出す"""
+    sentence = next((s.strip() for s in _SENTENCE_END.split(text) if s.strip()), '')
+    return sentence if len(sentence) <= limit else sentence[:limit - 1] + '…'
+
+
+def summarize_turn(question, answer, limit=60):
+    """1往復を要約の1行にする（質問と回答の最初の1文）"""
+    return f"・質問「{_first_sentence(question, limit)}」→ {_first_sentence(answer, limit)}"
+
+
+class Conversation:
+    """1人の生徒との会話
+
+    直近のやり取りはそのまま、それより古いものは要約の行として保持する。
+    直近のやり取り＋要約が token_budget を超えたら、古いやり取りから要約に移し、
+    要約自体も summary_budget を超えたら古い行から捨てる。
+    1つの質問・回答は token_budget の半分の文字数までに切り詰めて保持する。
+    AI に送るプロンプトは prompt() で組み立て、質問を含めた全体を token_budget に収める。
+    """
+
+    def __init__(self, conversation_id, token_budget=1500, summary_budget=400):
+        self.conversation_id = conversation_id
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.turns = deque()          # (質問, 回答, トークン数)
+        self.summary = deque()        # (要約の行, トークン数)
+        self.turn_tokens = 0
+        self.summary_tokens = 0
+        self.updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def add_turn(self, question, answer):
+        """やり取りを1つ追加し、上限を超えた分を要約にまとめる"""
+        with self._lock:
+            self._add_turn(question, answer)
+
+    def _add_turn(self, question, answer):
+        limit = self.token_budget // 2
+        question, answer = question[:limit], answer[:limit]
+        tokens = estimate_tokens(question) + estimate_tokens(answer)
+        self.turns.append((question, answer, tokens))
+        self.turn_tokens += tokens
+        self.updated_at = time.time()
+
+        # 最新のやり取りは残しつつ、上限に収まるまで古いものを要約へ
+        while len(self.turns) > 1 and self.turn_tokens + self.summary_tokens > self.token_budget:
+            old_question, old_answer, old_tokens = self.turns.popleft()
+            self.turn_tokens -= old_tokens
+            line = summarize_turn(old_question, old_answer)
+            line_tokens = estimate_tokens(line)
+            self.summary.append((line, line_tokens))
+            self.summary_tokens += line_tokens
+            while self.summary_tokens > self.summary_budget and len(self.summary) > 1:
+                self.summary_tokens -= self.summary.popleft()[1]
+
+    def context(self, limit=None):
+        """プロンプトに添える会話の文脈（無ければ空文字列）
+
+        limit を指定すると、文脈を limit トークン以内に収める。新しいやり取りから順に入れ、
+        残りに要約の新しい行から入れる（入りきらない古い分は添えない）。
+        """
+        with self._lock:
+            return self._context(limit)
+
+    def prompt(self, body, reserved_tokens=0):
+        """body（質問を含むプロンプト本体）に文脈を添えたプロンプト
+
+        文脈・body・reserved_tokens（別に付けるシステムプロンプトなど）の合計を
+        token_budget 以内に収める。
+        """
+        limit = self.token_budget - reserved_tokens - estimate_tokens(body) - 1
+        context = self.context(max(0, limit))
+        return f"{context}\n\n{body}" if context else body
+
+    def _context(self, limit=None):
+        if limit is None:
+            limit = float('inf')
+        turns, summary = [], []
+        used = 0
+        for section, items, selected in (
+                ('直近の会話:', [f'生徒: {q}\n先生: {a}' for q, a, _ in self.turns], turns),
+                ('これまでの会話の要約:', [line for line, _ in self.summary], summary)):
+            header = estimate_tokens(section) + 2
+            for text in reversed(items):
+                cost = estimate_tokens(text) + 1 + (0 if selected else header)
+                if used + cost > limit:
+                    break
+                selected.insert(0, text)
+                used += cost
+            if len(selected) < len(items):
+                break
+        parts = []
+        if summary:
+            parts.append('これまでの会話の要約:\n' + '\n'.join(summary))
+        if turns:
+            parts.append('直近の会話:\n' + '\n'.join(turns))
+        return '\n\n'.join(parts)
+
+    def tokens(self):
+        """文脈のトークン数の概算"""
+        return self.turn_tokens + self.summary_tokens
+
+
+class ConversationStore:
+    """会話の一覧（LRU）
+
+    max_conversations を超えたら最も長く使われていない会話から捨て、
+    idle_seconds 以上使われていない会話も捨てる。
+    """
+
+    def __init__(self, max_conversations=1000, idle_seconds=60 * 60, token_budget=1500, summary_budget=400):
+        self.max_conversations = max_conversations
+        self.idle_seconds = idle_seconds
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._conversations)
+
+    def get(self, conversation_id=None):
+        """会話を取得（無い・期限切れなら新しく作る）"""
+        with self._lock:
+            self._evict()
+            conversation = self._conversations.get(conversation_id) if conversation_id else None
+            if conversation is None:
+                conversation = Conversation(uuid.uuid4().hex, self.token_budget, self.summary_budget)
+                self._conversations[conversation.conversation_id] = conversation
+            conversation.updated_at = time.time()
+            self._conversations.move_to_end(conversation.conversation_id)
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+            return conversation
+
+    def _evict(self):
+        """期限切れの会話を古い順に捨てる（並びは最終利用順）"""
+        limit = time.time() - self.idle_seconds
+        while self._conversations:
+            oldest = next(iter(self._conversations.values()))
+            if oldest.updated_at >= limit:
+                break
+            self._conversations.popitem(last=False)
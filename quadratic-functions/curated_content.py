@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+教材の厳選コンテンツ
+AI 解説のプロンプトと厳選の解説（デモモードの回答）、固定の物理問題とクイズ。
+デモクラス（claude_code_demo, quadratic_functions_interactive）と
+質問応答の検索索引（answer_index）で共有する
+"""
+
+# Gemini に頼む解説の種類とプロンプト
+GEMINI_PROMPTS = {
+    "explain_difference": """
+    一次関数と二次関数の根本的な違いについて、中学生にも分かりやすく説明してください。
+    物理的な意味（等速運動と等加速度運動）も含めて、具体例を交えて解説してください。
+    """,
+    
+    "real_world_applications": """
+    一次関数と二次関数の実世界での応用例を教えてください。
+    日常生活や仕事でどのように使われているか、具体的な例を挙げて説明してください。
+    """,
+    
+    "learning_tips": """
+    一次関数と二次関数を効果的に学習するためのコツやアドバイスを教えてください。
+    つまずきやすいポイントと克服方法も含めて説明してください。
+    """
+}
+
+# 厳選の解説（GEMINI_PROMPTS と同じキー）：(見出し, 本文)
+CURATED_GUIDES = {
+    "explain_difference": ("詳細解説", """一次関数と二次関数の根本的な違いは「変化の仕方」にあります。
+
+【一次関数 y = ax】
+• 変化率が一定（毎秒同じ距離だけ進む）
+• グラフは直線
+• 物理的には「等速運動」
+• 例：時速60kmで走る車、時給1000円のアルバイト
+
+【二次関数 y = ax²】
+• 変化率が変化する（時間が経つほど早くなる）
+• グラフは放物線
+• 物理的には「等加速度運動」
+• 例：自由落下する物体、車の加速
+
+この違いが現実世界で重要な理由は、多くの自然現象が
+加速的な変化（二次関数的）をするからです。
+    """),
+    
+    "real_world_applications": ("実世界応用解説", """【一次関数の応用】
+🚗 高速道路の走行距離計算
+💰 従量制料金（電気、ガス、水道）
+📏 単位換算（温度、長さ、重さ）
+
+【二次関数の応用】
+🚗 ブレーキ距離（速度の2乗に比例）
+💸 複利計算（時間の経過で加速的増加）
+🏀 投球軌道（重力による放物線運動）
+📊 最適化問題（利益最大化、コスト最小化）
+
+特に重要なのは、二次関数が「最適化」に使われることです。
+企業の利益計算、建築の強度計算、投資のリスク分析など、
+現代社会の多くの分野で活用されています。
+    """),
+    
+    "learning_tips": ("学習アドバイス", """【効果的な学習方法】
+1. 📊 まずはグラフで視覚的に理解
+2. 🧮 具体的な数値で計算練習
+3. 🌍 実生活の例で応用イメージ
+4. 🔄 比較分析で違いを明確化
+
+【つまずきやすいポイント】
+• 「なぜ二次関数は曲線？」→ 変化率が変化するから
+• 「微分って何？」→ その瞬間の変化率（速度）
+• 「最大値・最小値」→ 頂点の概念
+
+【継続学習のコツ】
+• 毎日5分でも数学に触れる
+• 日常で関数を見つける習慣
+• 「なぜ？」を大切にする
+• 間違いを恐れずに挑戦
+    """)
+}
+
+# Gemini が使えない場合の回答（GEMINI_PROMPTS と同じキー。デモモードの見出しを付ける）
+FALLBACK_RESPONSES = {key: f"\n🤖 Gemini の{title} (デモモード):\n\n{body}"
+                      for key, (title, body) in CURATED_GUIDES.items()}
+
+# 教材の固定問題
+PHYSICS_PROBLEMS = [
+    {
+        "title": "🚗 自動車の等速運動",
+        "description": "自動車が時速60kmで走行している。3時間後の移動距離は？",
+        "function": "y = 60x",
+        "answer": "180km",
+        "explanation": "一次関数 y = 60x で、x=3を代入すると y = 180"
+    },
+    {
+        "title": "🏀 ボールの放物運動",
+        "description": "初速度20m/sで上向きに投げたボールの高さ（重力加速度g=10m/s²）",
+        "function": "y = 20t - 5t²",
+        "answer": "最高到達点：20m（t=2秒）",
+        "explanation": "二次関数の頂点公式を使用。頂点のt座標は -b/2a = -20/(-10) = 2"
+    },
+    {
+        "title": "💰 利益最大化問題",
+        "description": "商品価格をx円とすると、利益がy = -2x² + 400x - 10000円。最大利益は？",
+        "function": "y = -2x² + 400x - 10000",
+        "answer": "最大利益：10000円（価格100円）",
+        "explanation": "頂点のx座標：-400/(-4) = 100、y座標：-2(100)² + 400(100) - 10000 = 10000"
+    }
+]
+
+# 教材の固定クイズ
+QUIZ_QUESTIONS = [
+    {
+        "question": "一次関数 y = 3x において、x = 4 のときの y の値は？",
+        "options": ["10", "12", "15", "16"],
+        "correct": 1,
+        "explanation": "y = 3 × 4 = 12"
+    },
+    {
+        "question": "二次関数 y = x² - 4x + 3 の頂点のx座標は？",
+        "options": ["1", "2", "3", "4"],
+        "correct": 1,
+        "explanation": "頂点のx座標は -b/2a = -(-4)/(2×1) = 2"
+    },
+    {
+        "question": "等速運動を表すグラフはどれか？",
+        "options": ["直線", "放物線", "指数曲線", "正弦波"],
+        "correct": 0,
+        "explanation": "等速運動は一定の速度なので、位置-時間グラフは直線になる"
+    }
+]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+テンプレートによる解説の生成
+一次関数 y = ax と二次関数 y = qx² の解説は2つの数で決まるので、
+計算した事実（速さ・加速度・時刻 t での値・増え方の比・追い越す時刻）を
+定型文に当てはめて、AI を呼ばずに即座に作る
+"""
+
+from functools import lru_cache
+
+from function_core import format_polynomial
+
+
+def _fmt(value):
+    """余計な 0 を付けずに表示（1 以上は小数第2位まで、1 未満は有効数字3桁）"""
+    value = float(value)
+    value = round(value, 2) if abs(value) >= 1 else float(f'{value:.3g}')
+    value += 0.0  # -0.0 を 0.0 にそろえる
+    return str(int(value)) if value.is_integer() else f'{value:.10g}'
+
+
+def explanation_facts(linear_a, quadratic_a, time=6):
+    """解説に使う数値をまとめて計算
+
+    - linear_position, quadratic_position: 時刻 time での値
+    - quadratic_velocity: 時刻 time での二次関数の速度 2qt、acceleration: 加速度 2q
+    - crossover: ax = qx² となる正の時刻（無ければ None）
+    """
+    a, q = float(linear_a), float(quadratic_a)
+    return {
+        'time': time,
+        'linear_position': a * time,
+        'quadratic_position': q * time * time,
+        'quadratic_velocity': 2 * q * time,
+        'acceleration': 2 * q,
+        'crossover': a / q if a * q > 0 else None,
+    }
+
+
+def _linear_sentence(a, facts):
+    function = format_polynomial([a, 0])
+    if a == 0:
+        return f"一次関数 {function} は位置が変わらない（静止している）状態を表します。"
+    direction = '増え' if a > 0 else '減り'
+    return (f"一次関数 {function} は等速運動を表し、1秒ごとに距離が {_fmt(abs(a))} ずつ{direction}ます"
+            f"（速度は常に {_fmt(a)}）。{facts['time']}秒後の位置は {_fmt(facts['linear_position'])} です。")
+
+
+def _quadratic_sentence(q, facts):
+    function = format_polynomial([q, 0, 0])
+    if q == 0:
+        return f"二次関数 {function} は係数が 0 なので、位置は変化しません。"
+    shape = '上に開いた' if q > 0 else '下に開いた'
+    velocity = format_polynomial([2 * q, 0], 't')[len('y = '):]
+    return (f"二次関数 {function} は加速度 {_fmt(facts['acceleration'])} の等加速度運動を表し、"
+            f"グラフは{shape}放物線です。速度は {velocity} で、速さは時間に比例して大きくなり、"
+            f"{facts['time']}秒後の速度は {_fmt(facts['quadratic_velocity'])}、"
+            f"位置は {_fmt(facts['quadratic_position'])} です。")
+
+
+def _comparison_sentence(a, q, facts):
+    if a == 0 or q == 0:
+        return ''
+    half = facts['time'] / 2
+    text = (f"時間が{_fmt(half)}秒から{facts['time']}秒へ2倍になると、一次関数の値は2倍、"
+            f"二次関数の値は4倍になります。")
+
+    crossover = facts['crossover']
+    if crossover is None:
+        return text + "2つのグラフは原点以外では交わりません。"
+    text += (f"t = {_fmt(crossover)} 秒で両者の値が {_fmt(a * crossover)} で等しくなり、"
+             f"それまでは一次関数の変化のほうが大きく、それ以降は二次関数が追い越します。")
+    if crossover > facts['time']:
+        text += f"（グラフの範囲 0〜{facts['time']}秒 ではまだ追い越しません）"
+    return text
+
+
+@lru_cache(maxsize=4096)
+def compose_explanation(linear_a, quadratic_a, time=6):
+    """パラメータに応じた日本語の解説を組み立てる"""
+    a, q = float(linear_a), float(quadratic_a)
+    facts = explanation_facts(a, q, time)
+    sentences = [
+        _linear_sentence(a, facts),
+        _quadratic_sentence(q, facts),
+        _comparison_sentence(a, q, facts),
+    ]
+    if q > 0:
+        sentences.append("自動車の加速や落下する物体などが二次関数の例です。")
+    return '\n\n'.join(sentence for sentence in sentences if sentence)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+図のデータのコンパクトな符号化
+トレースの数値配列（x, y, z）を10進数の JSON の代わりに base64 の型付き配列で送る。
+軸ごとに精度（量子化の刻み）を指定すると、刻みの整数に丸めて範囲に収まる最小の
+整数型（int8/16/32）にし、指定しなければ float32 にする
+
+符号化した配列の形式（plotly.js の型付き配列の指定に scale / offset を加えたもの）:
+    {"dtype": "i2", "bdata": "...", "scale": 0.01, "offset": 36.0}
+    値 = 整数 * scale + offset。scale の無いものは plotly.js 2.28 以降ならそのまま読めるが、
+    ブラウザ側では templates/index.html の decodeFigure で通常の配列に戻す
+"""
+
+import base64
+import json
+
+import numpy as np
+import plotly.utils
+
+ENCODED_KEYS = ('x', 'y', 'z')
+FLOAT_DTYPES = {'f4': '<f4', 'f8': '<f8'}
+_INT_DTYPES = [('i1', '<i1', 127), ('i2', '<i2', 32767), ('i4', '<i4', 2 ** 31 - 1)]
+_PLOTLY_DTYPES = {'f4': '<f4', 'f8': '<f8', 'i1': '<i1', 'i2': '<i2', 'i4': '<i4',
+                  'u1': '<u1', 'u2': '<u2', 'u4': '<u4', 'i8': '<i8', 'u8': '<u8'}
+
+
+def parse_encoding(value):
+    """リクエストなどで指定された符号化を encode_figure の引数の dict にする
+
+    None / False は符号化なし、'f4' / 'f8' は全軸をその浮動小数点型で、
+    dict は {'dtype': 'f4', 'precision': {'x': 0.001, 'y': 0.01}}。不正なら ValueError。
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        value = 'f4'
+    if isinstance(value, str):
+        value = {'dtype': value}
+    if not isinstance(value, dict):
+        raise ValueError('encoding は "f4"・"f8" または dict で指定してください')
+    unknown = set(value) - {'dtype', 'precision'}
+    if unknown:
+        raise ValueError(f'encoding の未対応の項目です: {sorted(unknown)}')
+    dtype = value.get('dtype', 'f4')
+    if dtype not in FLOAT_DTYPES:
+        raise ValueError(f'dtype は {sorted(FLOAT_DTYPES)} のいずれかです')
+    precision = {}
+    for axis, step in (value.get('precision') or {}).items():
+        if axis not in ENCODED_KEYS:
+            raise ValueError(f'precision の軸は {ENCODED_KEYS} のいずれかです')
+        if step is not None:
+            step = float(step)
+            if not step > 0 or not np.isfinite(step):
+                raise ValueError('precision は正の数で指定してください')
+            precision[axis] = step
+    return {'dtype': dtype, 'precision': precision}
+
+
+def _as_array(value):
+    """数値の配列として扱えるなら float64 の ndarray、そうでなければ None"""
+    if isinstance(value, dict) and 'bdata' in value:
+        array = np.frombuffer(base64.b64decode(value['bdata']), dtype=_PLOTLY_DTYPES[value['dtype']])
+        if 'shape' in value:
+            array = array.reshape([int(n) for n in str(value['shape']).split(',')])
+        return array.astype(float)
+    if isinstance(value, (list, tuple, np.ndarray)) and len(value):
+        array = np.asarray(value)
+        if array.dtype.kind in 'iuf':
+            return array.astype(float)
+    return None
+
+
+def _spec(array, dtype):
+    spec = {'dtype': dtype, 'bdata': base64.b64encode(np.ascontiguousarray(array).tobytes()).decode('ascii')}
+    if array.ndim > 1:
+        spec['shape'] = ','.join(str(n) for n in array.shape)
+    return spec
+
+
+def encode_array(values, precision=None, dtype='f4'):
+    """1つの配列を型付き配列の指定にする（数値でなければそのまま返す）
+
+    precision を指定すると、値を precision 刻みの整数に丸めて最小の整数型にする。
+    範囲の中央を offset にして、なるべく小さい型に収める。NaN を含む配列は浮動小数点のまま。
+    """
+    array = _as_array(values)
+    if array is None:
+        return values
+    if precision and np.isfinite(array).all():
+        steps = np.round(array / precision)
+        middle = np.round((steps.max() + steps.min()) / 2)
+        span = max(steps.max() - middle, middle - steps.min())
+        for name, numpy_dtype, limit in _INT_DTYPES:
+            if span <= limit:
+                spec = _spec((steps - middle).astype(numpy_dtype), name)
+                spec['scale'] = precision
+                spec['offset'] = float(middle * precision)
+                return spec
+    return _spec(array.astype(FLOAT_DTYPES[dtype]), dtype)
+
+
+def encode_figure(figure, dtype='f4', precision=None):
+    """図（go.Figure または dict）をトレースの配列を符号化した JSON 文字列にする"""
+    figure_dict = figure.to_plotly_json() if hasattr(figure, 'to_plotly_json') else dict(figure)
+    precision = precision or {}
+    data = []
+    for trace in figure_dict.get('data', []):
+        trace = dict(trace)
+        for key in ENCODED_KEYS:
+            if key in trace:
+                trace[key] = encode_array(trace[key], precision.get(key), dtype)
+        data.append(trace)
+    figure_dict['data'] = data
+    return json.dumps(figure_dict, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def decode_array(value):
+    """符号化した配列を ndarray に戻す（確認用。ブラウザでは decodeFigure が同じことをする）"""
+    if not (isinstance(value, dict) and 'bdata' in value):
+        return value
+    array = _as_array(value)
+    return array * value['scale'] + value['offset'] if 'scale' in value else array
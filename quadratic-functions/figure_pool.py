@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+グラフ作成のプロセスプール
+create_comparison_plot の図の組み立てと JSON 化は GIL を持ったままの純 Python の処理なので、
+同時に多くの /update_plot が来るとスレッドでは1コアに詰まる。
+起動済みのワーカープロセスで作成し、そのまま送れるバイト列で受け取る
+"""
+
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from comparison_plot import create_comparison_plot
+
+
+def _warm_up():
+    """ワーカーの初期化：Plotly を読み込み、一度図を作っておく
+
+    読み込むのは副作用の無い comparison_plot だけで、app（AI の設定・レーン・キャッシュの
+    ディレクトリなど）はワーカーでは読み込まない。
+    """
+    create_comparison_plot()
+
+
+def render_plot_literal(linear_a, quadratic_a, encoding=None):
+    """ワーカーで図を作り、/update_plot の plot_json 欄に埋め込める JSON 文字列のバイト列を返す"""
+    return json.dumps(create_comparison_plot(linear_a, quadratic_a, encoding=encoding)).encode('utf-8')
+
+
+def update_plot_body(plot_literal, explanation):
+    """ワーカーが返したバイト列と解説から /update_plot の応答本体を組み立てる
+
+    図の JSON をもう一度解析・整形せずに、そのまま連結する。
+    """
+    return (b'{"plot_json": ' + plot_literal
+            + b', "explanation": ' + json.dumps(explanation, ensure_ascii=False).encode('utf-8') + b'}')
+
+
+class WarmProcessPool:
+    """起動済みのワーカープロセスのプール（admission.Lane の executor として使う）
+
+    spawn のワーカーはプールを作ったモジュールを読み込み直さないが、読み込み時に起動すると
+    app を読み込むだけのスクリプトでもプロセスが立ち上がるので、最初の submit か start() で起動する。
+    Flask のスレッドを fork で引き継がないよう spawn で起動する。
+
+    spawn のワーカーは起動スクリプト（__main__）を __mp_main__ として読み込み直すので、
+    読み込んでも何もしない serve.py から起動する（python app.py だと app の処理がワーカーごとに走る）。
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """プールを起動し、最初のリクエストを待たずに全ワーカーを初期化しておく"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_warm_up)
+                # spawn のワーカーは最初の submit でまとめて起動する
+                for _ in range(self.workers):
+                    self._executor.submit(int)
+        return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        return (self._executor or self.start()).submit(fn, *args, **kwargs)
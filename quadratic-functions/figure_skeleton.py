@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+make_subplots の図の骨組みのキャッシュ
+2x2 のグリッド・secondary_y の指定・小見出し・軸ラベル・レイアウトの組み立て（と検証）は
+トレースの計算よりずっと重く、同じ構成の図を作るたびに繰り返していた。
+構成ごとに一度だけ組み立てた骨組みのレイアウトから、トレースの無い図を作る
+
+    fig = subplot_figure(rows=2, cols=2, subplot_titles=(...), specs=[[{}, {}], [{}, {}]],
+                         axis_titles=[('時間 (秒)', '距離 (m)'), ...], height=800)
+    fig.add_trace(go.Scatter(...), row=1, col=1)    # make_subplots の図と同じように使える
+"""
+
+import json
+from functools import lru_cache
+
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# キャッシュする骨組みの数（構成の数は図の種類×タイトルくらいなので小さくてよい）
+SKELETON_CACHE_SIZE = 32
+
+
+def _build(spec):
+    """構成の dict から make_subplots で図を組み立てる（骨組みの作成と、非常時の作り方）"""
+    fig = make_subplots(rows=spec['rows'], cols=spec['cols'], specs=spec['specs'],
+                        subplot_titles=spec['subplot_titles'])
+    fig.update_layout(**spec['layout'])
+    for index, (x_title, y_title) in enumerate(spec['axis_titles']):
+        row, col = divmod(index, spec['cols'])
+        if x_title is not None:
+            fig.update_xaxes(title_text=x_title, row=row + 1, col=col + 1)
+        if y_title is not None:
+            fig.update_yaxes(title_text=y_title, row=row + 1, col=col + 1)
+    return fig
+
+
+def _from_skeleton(layout_json, grid_ref, grid_str):
+    """骨組みのレイアウトからトレースの無い図を作る
+
+    plotly の内部（作成時の _validate、make_subplots が持たせる _grid_ref / _grid_str）を使う。
+    骨組みは検証済みなので作るときだけ検証を省き、そのあとの変更は検証する。
+    """
+    fig = go.Figure(layout=layout_json, _validate=False)
+    fig._validate = True
+    fig.layout._validate = True
+    # make_subplots と同じく、row / col でトレースを置けるようグリッドを持たせる
+    fig.__dict__['_grid_ref'] = grid_ref
+    fig.__dict__['_grid_str'] = grid_str
+    return fig
+
+
+def _fast_path_works(layout_json, grid_ref, grid_str):
+    """_from_skeleton が今の plotly で make_subplots と同じ図を作れるか
+
+    レイアウトがそのまま入り、row / col の参照が効き、作成後の変更が検証されることを確かめる。
+    plotly の更新で内部が変わったときは False になり、make_subplots で作る。
+    """
+    try:
+        fig = _from_skeleton(layout_json, grid_ref, grid_str)
+        if fig.layout.to_plotly_json() != layout_json or fig.get_subplot(1, 1) is None:
+            return False
+    except Exception:
+        return False
+    try:
+        fig.update_layout(height='検証されない値')
+    except ValueError:
+        return True
+    return False
+
+
+@lru_cache(maxsize=SKELETON_CACHE_SIZE)
+def _skeleton(key):
+    """構成（JSON 文字列）の骨組み：(レイアウトの dict, grid_ref, grid_str, 速い作り方が使えるか)"""
+    fig = _build(json.loads(key))
+    layout_json = fig.layout.to_plotly_json()
+    return layout_json, fig._grid_ref, fig._grid_str, _fast_path_works(layout_json, fig._grid_ref, fig._grid_str)
+
+
+def subplot_figure(rows, cols, specs=None, subplot_titles=None, axis_titles=(), **layout):
+    """キャッシュした骨組みから、トレースの無い新しい図を作る
+
+    rows / cols / specs / subplot_titles は make_subplots と同じ。axis_titles は小図ごと
+    （行優先の順）の (x 軸ラベル, y 軸ラベル) で、None の軸はラベルを付けない。
+    残りのキーワードは update_layout に渡す値。図ごとに変わる小見出しなどは、
+    できた図の fig.layout.annotations を書き換える（骨組みは共有しない）。
+    骨組みから作れない plotly のバージョンでは、毎回 make_subplots で作る。
+    """
+    key = json.dumps({'rows': rows, 'cols': cols, 'specs': specs,
+                      'subplot_titles': list(subplot_titles) if subplot_titles else None,
+                      'axis_titles': [list(titles) for titles in axis_titles],
+                      'layout': layout}, sort_keys=True, ensure_ascii=False)
+    layout_json, grid_ref, grid_str, fast = _skeleton(key)
+    if not fast:
+        return _build(json.loads(key))
+    return _from_skeleton(layout_json, grid_ref, grid_str)
+
+
+def skeleton_cache_info():
+    """骨組みのキャッシュの利用状況（functools の CacheInfo）"""
+    return _skeleton.cache_info()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+関数族の一括評価コア
+任意次数の多項式を複数まとめて共通の x グリッド上で評価し、
+値・一階微分・二階微分をベクトル化したホーナー法で求める。
+一次関数 y = ax + b や二次関数 y = ax² + bx + c はその特別な場合として扱う
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from sampling import adaptive_sample
+
+
+def coefficient_matrix(polynomials):
+    """係数リスト（高次から順）を先頭ゼロ詰めで (k, 次数+1) の行列にそろえる
+
+    例: [[2, 0], [1, 0, 0]] → y = 2x と y = x² を同じ次数の行列で表す
+    """
+    if isinstance(polynomials, np.ndarray) and polynomials.ndim == 2:
+        return polynomials.astype(float, copy=False)
+
+    rows = [np.atleast_1d(np.asarray(p, dtype=float)) for p in polynomials]
+    width = max(len(row) for row in rows)
+    matrix = np.zeros((len(rows), width))
+    for i, row in enumerate(rows):
+        matrix[i, width - len(row):] = row
+    return matrix
+
+
+def derivative_coefficients(coefficients):
+    """係数行列 (k, d+1) の導関数の係数行列 (k, max(d, 1)) を解析的に求める"""
+    degree = coefficients.shape[1] - 1
+    if degree == 0:
+        return np.zeros_like(coefficients)
+    return coefficients[:, :-1] * np.arange(degree, 0, -1)
+
+
+def _horner(coefficients, x, out):
+    """ホーナー法で (k, n) の out に多項式の値を書き込む"""
+    out[...] = coefficients[:, :1]
+    for column in range(1, coefficients.shape[1]):
+        np.multiply(out, x, out=out)
+        np.add(out, coefficients[:, column:column + 1], out=out)
+    return out
+
+
+class FunctionFamilyEvaluator:
+    """多項式の関数族を一括評価する
+
+    出力バッファはスレッドごとに形状別に再利用する（最近使った buffer_count 個の形状だけ
+    残す）。戻り値はバッファのビューなので、次の呼び出し後も使う場合は呼び出し側で
+    コピーすること。
+    """
+
+    def __init__(self, buffer_count=4):
+        self.buffer_count = buffer_count
+        self._local = threading.local()
+
+    def _buffer(self, k, n):
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = OrderedDict()
+        buffer = buffers.get((k, n))
+        if buffer is None:
+            buffer = buffers[(k, n)] = np.empty((3, k, n))
+            while len(buffers) > self.buffer_count:
+                buffers.popitem(last=False)
+        else:
+            buffers.move_to_end((k, n))
+        return buffer
+
+    def evaluate(self, polynomials, x):
+        """多項式族を x (n,) 上で評価し、(3, k, n) の [値, 一階微分, 二階微分] を返す"""
+        coefficients = coefficient_matrix(polynomials)
+        first_coefficients = derivative_coefficients(coefficients)
+        second_coefficients = derivative_coefficients(first_coefficients)
+        x = np.asarray(x, dtype=float)
+
+        out = self._buffer(len(coefficients), len(x))
+        values, first, second = out
+        _horner(coefficients, x, values)
+        _horner(first_coefficients, x, first)
+        _horner(second_coefficients, x, second)
+        return out
+
+
+_default_evaluator = FunctionFamilyEvaluator()
+
+
+def evaluate_family(polynomials, x):
+    """既定の評価器で関数族を評価"""
+    return _default_evaluator.evaluate(polynomials, x)
+
+
+def sample_family(polynomials, x_min, x_max, **sampler_options):
+    """関数族を共通の適応サンプリンググリッド上で評価
+
+    値・微分のすべての系列が描画誤差の許容範囲に収まる x を選ぶ。
+    戻り値は (x, (3, k, n) の配列)。
+    """
+    coefficients = coefficient_matrix(polynomials)
+    k = len(coefficients)
+
+    def stacked(x):
+        return evaluate_family(coefficients, x).reshape(3 * k, -1)
+
+    x, y = adaptive_sample(stacked, x_min, x_max, **sampler_options)
+    return x, y.reshape(3, k, -1)
+
+
+def format_polynomial(coefficients, variable='x'):
+    """係数（高次から順）を 'y = 2x³ - x + 1' のような式の文字列にする"""
+    superscripts = {2: '²', 3: '³', 4: '⁴', 5: '⁵', 6: '⁶', 7: '⁷', 8: '⁸', 9: '⁹'}
+    coefficients = list(np.atleast_1d(coefficients))
+    degree = len(coefficients) - 1
+    terms = []
+    for i, c in enumerate(coefficients):
+        power = degree - i
+        if c == 0:
+            continue
+        c = float(c)
+        magnitude = f'{abs(c):.10g}'
+        if power == 0:
+            body = magnitude
+        else:
+            body = ('' if abs(c) == 1 else magnitude) + variable
+            if power > 1:
+                body += superscripts.get(power, f'^{power}')
+        sign = '-' if c < 0 else '+'
+        terms.append(f'-{body}' if not terms and sign == '-' else
+                     body if not terms else f' {sign} {body}')
+    return 'y = ' + (''.join(terms) if terms else '0')
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+クラス単位の一括採点
+生成した問題セットに対する全生徒の解答（数値・4択）を行列にまとめ、
+許容誤差つきの比較で一度に採点する
+"""
+
+import numpy as np
+
+
+def submissions_to_matrices(submissions, question_count, option_counts=None):
+    """提出物を (生徒数, 問題数) の数値行列と選択肢行列に変換
+
+    submissions は {'student_id': ..., 'answers': [...]} のリスト。
+    各解答は数値（数値解答）、{'choice': 番号}（4択、0始まり）、または None（未解答）。
+    数値行列の未解答は NaN、選択肢行列の未解答は -1 になる。
+    option_counts（問題ごとの選択肢の数）を渡すと、範囲外の番号は ValueError にする。
+    """
+    student_count = len(submissions)
+    numeric = np.full((student_count, question_count), np.nan)
+    choices = np.full((student_count, question_count), -1, dtype=np.int16)
+    max_choice = np.iinfo(choices.dtype).max
+
+    for row, submission in enumerate(submissions):
+        if not isinstance(submission, dict) or not isinstance(submission['answers'], list):
+            raise TypeError('提出物は {"student_id": ..., "answers": [...]} の形式にしてください')
+        for column, answer in enumerate(submission['answers'][:question_count]):
+            if answer is None:
+                continue
+            if isinstance(answer, dict):
+                choice = int(answer['choice'])
+                limit = option_counts[column] if option_counts is not None else max_choice + 1
+                if not 0 <= choice < limit:
+                    raise ValueError(f'{column + 1}問目の選択肢の番号 {choice} は 0〜{limit - 1} の範囲外です')
+                choices[row, column] = choice
+            else:
+                numeric[row, column] = float(answer)
+
+    return numeric, choices
+
+
+def grade_matrices(answer_values, correct_choices, numeric, choices, rel_tol=1e-3, abs_tol=1e-6):
+    """採点の本体。すべて (生徒数, 問題数) の行列演算で行う
+
+    数値解答は |解答 - 正答| ≤ abs_tol + rel_tol·|正答| なら正解とする。
+    戻り値は (正誤行列, 解答済み行列)。
+    """
+    answer_values = np.asarray(answer_values, dtype=float)
+    correct_choices = np.asarray(correct_choices)
+
+    numeric_correct = np.isclose(numeric, answer_values[None, :], rtol=rel_tol, atol=abs_tol)
+    choice_correct = choices == correct_choices[None, :]
+    answered = ~np.isnan(numeric) | (choices >= 0)
+    return numeric_correct | choice_correct, answered
+
+
+def question_statistics(correct, answered):
+    """問題ごとの統計（正答率＝難易度、解答率、識別力）を計算
+
+    識別力は各問題の正誤と、その問題を除いた合計点との相関（点双列相関）。
+    """
+    student_count = correct.shape[0]
+    correct_float = correct.astype(float)
+    totals = correct_float.sum(axis=1)
+
+    p_correct = correct_float.mean(axis=0) if student_count else np.zeros(correct.shape[1])
+    answer_rate = answered.mean(axis=0) if student_count else np.zeros(correct.shape[1])
+
+    # その問題を除いた合計点との相関を全問題まとめて求める
+    rest = totals[:, None] - correct_float
+    item_centered = correct_float - p_correct
+    rest_centered = rest - rest.mean(axis=0) if student_count else rest
+    numerator = (item_centered * rest_centered).sum(axis=0)
+    denominator = np.sqrt((item_centered ** 2).sum(axis=0) * (rest_centered ** 2).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        discrimination = np.where(denominator > 0, numerator / denominator, 0.0)
+
+    return {
+        'p_correct': p_correct,
+        'answer_rate': answer_rate,
+        'discrimination': discrimination,
+    }
+
+
+def grade_submissions(problems, submissions, rel_tol=1e-3, abs_tol=1e-6):
+    """問題セットと提出物から、生徒ごとの得点と問題ごとの統計を返す
+
+    problems は problem_generator が生成した dict（answer_value, correct を持つ）のリスト。
+    """
+    answer_values = np.array([p['answer_value'] for p in problems], dtype=float)
+    correct_choices = np.array([p['correct'] for p in problems])
+    numeric, choices = submissions_to_matrices(submissions, len(problems),
+                                               [len(p['options']) for p in problems])
+
+    correct, answered = grade_matrices(answer_values, correct_choices, numeric, choices,
+                                       rel_tol=rel_tol, abs_tol=abs_tol)
+    counts = correct.sum(axis=1)
+    question_count = max(len(problems), 1)
+    stats = question_statistics(correct, answered)
+
+    students = [
+        {
+            'student_id': submission.get('student_id'),
+            'correct': int(counts[i]),
+            'answered': int(answered[i].sum()),
+            'percent': round(100.0 * counts[i] / question_count, 1),
+            # save_learning_progress と同じ10点満点
+            'score': round(10.0 * counts[i] / question_count, 1),
+        }
+        for i, submission in enumerate(submissions)
+    ]
+
+    questions = [
+        {
+            'id': problem.get('id'),
+            'p_correct': round(float(stats['p_correct'][j]), 3),
+            'answer_rate': round(float(stats['answer_rate'][j]), 3),
+            'discrimination': round(float(stats['discrimination'][j]), 3),
+        }
+        for j, problem in enumerate(problems)
+    ]
+
+    return {
+        'question_count': len(problems),
+        'students': students,
+        'questions': questions,
+        'mean_score': round(float(counts.mean()) * 10.0 / question_count, 2) if len(submissions) else 0.0,
+    }
+
+
+def progress_records(result, topic):
+    """採点結果を save_learning_progress_batch / ProgressStore.save_batch に渡す形式に変換"""
+    return [
+        {
+            'topic': topic,
+            'score': student['score'],
+            'notes': f"{student['correct']}/{result['question_count']}問正解",
+            'student_id': student['student_id'],
+        }
+        for student in result['students']
+    ]
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+生徒の実験データ（時間, 距離）への最小二乗フィット
+正規方程式の和を少しずつ足し込むので、どれだけ長い記録でも
+メモリ使用量は一定のまま一次・二次モデルを当てはめられる
+"""
+
+from math import comb
+
+import numpy as np
+from numpy.polynomial import polynomial as P
+
+
+class StreamingPolynomialFit:
+    """逐次正規方程式による多項式フィット
+
+    update() にデータをチャンクごとに渡し、fit(degree) で max_degree 以下の
+    任意の次数の当てはめ結果を得る。Σvᵏ と Σvᵏ(y - ȳ) だけを保持するため、
+    低い次数のモデルは同じ和の部分行列から求まる。
+    数値の安定のため、時間は最初のサンプルの時刻 t0 からの差 u = t - t0 で扱い、
+    和はこれまでの平均のまわり（v = u - ū、y - ȳ）で持つ。チャンクを足すたびに
+    平均のずれだけ二項展開で移すので、記録が長くても y² の和どうしの引き算で桁落ちしない。
+    """
+
+    def __init__(self, max_degree=2):
+        self.max_degree = max_degree
+        self.count = 0
+        self.origin = None
+        self.t_min = np.inf
+        self.t_max = -np.inf
+        self._u_mean = 0.0
+        self._y_mean = 0.0
+        self._power_sums = np.zeros(2 * max_degree + 1)   # Σvᵏ (k = 0..2d)
+        self._moments = np.zeros(max_degree + 1)          # Σvᵏ(y - ȳ) (k = 0..d)
+        self._y_square_sum = 0.0                          # Σ(y - ȳ)²
+
+    def update(self, t, y):
+        """1チャンク分のデータを足し込む"""
+        t = np.asarray(t, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        if len(t) != len(y):
+            raise ValueError('t と y の長さが一致しません')
+        if len(t) == 0:
+            return self
+
+        if self.origin is None:
+            self.origin = t[0]
+        u = t - self.origin
+
+        # チャンク自身の平均のまわりの和
+        u_mean, y_mean = u.mean(), y.mean()
+        y_centered = y - y_mean
+        powers = np.vander(u - u_mean, 2 * self.max_degree + 1, increasing=True)
+        power_sums = powers.sum(axis=0)
+        moments = powers[:, :self.max_degree + 1].T @ y_centered
+        y_square_sum = y_centered @ y_centered
+
+        # これまでの和とチャンクの和を、合わせた平均のまわりに移して足す
+        count = self.count + len(t)
+        new_u_mean = self._u_mean + (u_mean - self._u_mean) * len(t) / count
+        new_y_mean = self._y_mean + (y_mean - self._y_mean) * len(t) / count
+        old = _shift_sums(self._power_sums, self._moments, self._u_mean - new_u_mean, self._y_mean - new_y_mean)
+        new = _shift_sums(power_sums, moments, u_mean - new_u_mean, y_mean - new_y_mean)
+        self._power_sums = old[0] + new[0]
+        self._moments = old[1] + new[1]
+        self._y_square_sum += y_square_sum + (y_mean - self._y_mean) ** 2 * self.count * len(t) / count
+        self._u_mean, self._y_mean = new_u_mean, new_y_mean
+        self.count = count
+        self.t_min = min(self.t_min, t.min())
+        self.t_max = max(self.t_max, t.max())
+        return self
+
+    def fit(self, degree):
+        """degree 次の当てはめ結果（係数は高次から順、y = ... の t についての係数）を返す"""
+        if degree > self.max_degree:
+            raise ValueError(f'degree は {self.max_degree} 以下にしてください')
+        if self.count <= degree:
+            raise ValueError('データ点が足りません')
+
+        # 切片は平均で決まるので、列 vᵏ (k = 1..d) をそれぞれの平均のまわりにした正規方程式を解く
+        orders = np.arange(1, degree + 1)
+        column_means = self._power_sums[orders] / self.count
+        gram = self._power_sums[np.add.outer(orders, orders)] - self.count * np.outer(column_means, column_means)
+        moments = self._moments[orders]
+
+        # 対角スケーリングしてから解き、条件数の悪化を抑える
+        scale = 1.0 / np.sqrt(np.where(np.diag(gram) > 0, np.diag(gram), 1.0))
+        solution, *_ = np.linalg.lstsq(gram * np.outer(scale, scale), moments * scale, rcond=None)
+        slopes = solution * scale
+
+        # 残差平方和 = Σ(y - ȳ)² - bᵀ(中心化した Xᵀy)
+        total_sum = max(self._y_square_sum, 0.0)
+        residual_sum = min(max(total_sum - slopes @ moments, 0.0), total_sum)
+
+        # v = t - t0 - ū の多項式を t の多項式に戻す
+        beta = np.concatenate([[self._y_mean - slopes @ column_means], slopes])
+        t_coefficients = _shift_polynomial(beta, self.origin + self._u_mean)
+
+        return {
+            'degree': degree,
+            'coefficients': t_coefficients[::-1].tolist(),
+            'count': self.count,
+            'residual_sum_of_squares': float(residual_sum),
+            'rmse': float(np.sqrt(residual_sum / self.count)),
+            'r_squared': float(1 - residual_sum / total_sum) if total_sum > 0 else 1.0,
+            't_min': float(self.t_min),
+            't_max': float(self.t_max),
+        }
+
+    def fits(self):
+        """一次・二次（max_degree まで）のすべての当てはめ結果"""
+        return [self.fit(degree) for degree in range(1, self.max_degree + 1)
+                if self.count > degree]
+
+
+def _shift_sums(power_sums, moments, u_shift, y_shift):
+    """平均 a のまわりの Σ(u-a)ᵏ・Σ(u-a)ᵏ(y-b) を、a - u_shift・b - y_shift のまわりの和に移す"""
+    size = len(power_sums)
+    orders = np.arange(size)
+    binomial = np.array([[comb(k, j) for j in range(size)] for k in range(size)], dtype=float)
+    shift = binomial * np.power(u_shift, np.clip(orders[:, None] - orders, 0, None)) * (orders[:, None] >= orders)
+    shifted_powers = shift @ power_sums
+    shifted_moments = shift[:len(moments), :len(moments)] @ moments + y_shift * shifted_powers[:len(moments)]
+    return shifted_powers, shifted_moments
+
+
+def _shift_polynomial(beta, origin):
+    """p(u) = Σβₖuᵏ（u = t - origin）を t の係数（低次から順）に変換"""
+    result = np.zeros(1)
+    shift = np.array([-origin, 1.0])
+    # ホーナー法：p = (...(βd·(t-o) + βd-1)·(t-o) + ...) + β0
+    for coefficient in beta[::-1]:
+        result = P.polyadd(P.polymul(result, shift), [coefficient])
+    return np.pad(result, (0, len(beta) - len(result)))
+
+
+def fit_measurements(chunks, max_degree=2):
+    """(t, y) のチャンクの反復から当てはめ結果のリストを返す"""
+    fitter = StreamingPolynomialFit(max_degree)
+    for t, y in chunks:
+        fitter.update(t, y)
+    return fitter.fits()
+
+
+def residuals(fit, t, y):
+    """当てはめ結果に対する残差 y - ŷ（チャンク単位で確認する用）"""
+    return np.asarray(y, dtype=float) - np.polyval(fit['coefficients'], np.asarray(t, dtype=float))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+学習進捗の保存
+進捗の1件（QuadraticFunctionLearning.learning_data の understanding_scores と同じ形式）を
+JSON Lines のファイルに1行ずつ追記する。ノートブック用のモジュール（ipywidgets・IPython など）を
+読み込まないので、サーバーの /grade からも使える
+"""
+
+import json
+import threading
+from datetime import datetime
+
+# learning_progress.json の最上位のキー（QuadraticFunctionLearning.learning_data と同じ）
+LEARNING_DATA_KEYS = ('linear_experiments', 'quadratic_experiments', 'user_questions', 'understanding_scores')
+
+
+def progress_entry(topic, score, notes='', student_id=None):
+    """学習進捗の1件分を作成"""
+    entry = {
+        'timestamp': datetime.now().isoformat(),
+        'topic': topic,
+        'score': score,
+        'notes': notes
+    }
+    if student_id is not None:
+        entry['student_id'] = student_id
+    return entry
+
+
+class ProgressStore:
+    """学習進捗の追記専用の記録（JSON Lines、スレッドセーフ）
+
+    採点のたびにそのバッチの行だけを追記するので、1回の保存の手間は
+    これまでの記録の量によらない。load() で learning_data と同じ形の dict に読み戻せる。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def save_batch(self, records):
+        """{'topic', 'score', 'notes', 'student_id'} の dict のリストを追記し、件数を返す"""
+        entries = [progress_entry(r['topic'], r['score'], r.get('notes', ''), r.get('student_id'))
+                   for r in records]
+        if not entries:
+            return 0
+        lines = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries)
+        # 1回の write で書く（追記モードなので、ほかのプロセスの追記とも混ざらない）
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+        return len(entries)
+
+    def load(self):
+        """記録を learning_data と同じ形の dict で返す（進捗は understanding_scores）"""
+        data = {key: [] for key in LEARNING_DATA_KEYS}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data['understanding_scores'] = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            pass
+        return data
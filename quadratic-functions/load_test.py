@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+受付制御の負荷試験
+AI の応答を一定時間待つ処理に差し替え、AI への質問が殺到している間も
+グラフ更新 (/update_plot) の応答時間が変わらないことを確かめる。
+本番のサーバー（gunicorn --threads など）と同じく、すべてのリクエストは
+本数の決まったサーバースレッドで処理する
+
+    python load_test.py                # 受付制御あり
+    python load_test.py --unbounded    # 比較用：レーンの上限を事実上なくす
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import app as web
+from admission import Lane
+
+
+def _percentiles(latencies):
+    values = np.array(latencies) * 1000
+    if len(values) == 0:
+        return 'データなし'
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f'p50 {p50:6.1f}ms  p95 {p95:6.1f}ms  p99 {p99:6.1f}ms  max {values.max():6.1f}ms  ({len(values)}件)'
+
+
+def _plot_client(server, index, requests, latencies, statuses, lock):
+    client = web.app.test_client()
+    environ = {'REMOTE_ADDR': f'10.0.0.{index}'}
+    for i in range(requests):
+        start = time.perf_counter()
+        response = server.submit(client.post, '/update_plot', environ_base=environ,
+                                 json={'linear_a': 1 + i % 5, 'quadratic_a': 1 + index % 5}).result()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+def _llm_client(server, index, stop, statuses, lock):
+    client = web.app.test_client()
+    environ = {'REMOTE_ADDR': f'10.1.{index // 256}.{index % 256}'}
+    while not stop.is_set():
+        response = server.submit(client.post, '/ask_gemini', environ_base=environ,
+                                 json={'question': '放物線とは？'}).result()
+        with lock:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 429:
+            # 本物のクライアントと同様に少し待って再試行
+            time.sleep(0.2)
+
+
+def run_phase(server_threads, plot_clients, plot_requests, llm_clients):
+    """グラフ更新の応答時間と、各エンドポイントの応答コードの集計を返す"""
+    server = ThreadPoolExecutor(max_workers=server_threads)
+    lock = threading.Lock()
+    latencies, plot_statuses, llm_statuses = [], {}, {}
+    stop = threading.Event()
+
+    llm_threads = [threading.Thread(target=_llm_client, args=(server, i, stop, llm_statuses, lock), daemon=True)
+                   for i in range(llm_clients)]
+    for thread in llm_threads:
+        thread.start()
+    if llm_clients:
+        time.sleep(0.5)  # AI レーンが埋まってから計測を始める
+
+    plot_threads = [threading.Thread(target=_plot_client, args=(server, i, plot_requests, latencies, plot_statuses, lock))
+                    for i in range(plot_clients)]
+    for thread in plot_threads:
+        thread.start()
+    for thread in plot_threads:
+        thread.join()
+
+    stop.set()
+    for thread in llm_threads:
+        thread.join()
+    server.shutdown()
+    return latencies, plot_statuses, llm_statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description='グラフ更新と AI 質問の混在負荷試験')
+    parser.add_argument('--server-threads', type=int, default=16, help='サーバーのワーカースレッド数')
+    parser.add_argument('--plot-clients', type=int, default=8)
+    parser.add_argument('--plot-requests', type=int, default=25, help='クライアントあたりのグラフ更新回数')
+    parser.add_argument('--llm-clients', type=int, default=60)
+    parser.add_argument('--llm-latency', type=float, default=2.0, help='AI の応答にかかる秒数（模擬）')
+    parser.add_argument('--unbounded', action='store_true', help='受付制御なしと同等の設定で比較する')
+    args = parser.parse_args()
+
+    def slow_ai(question):
+        time.sleep(args.llm_latency)
+        return '（模擬応答）'
+
+    web.ask_gemini_ai = slow_ai
+    if args.unbounded:
+        web.plot_lane = Lane('plot', workers=256, queue_size=0, timeout=600)
+        web.llm_lane = Lane('llm', workers=256, queue_size=0, timeout=600)
+
+    print(f"🧪 受付制御の負荷試験（{'上限なし' if args.unbounded else '受付制御あり'}、AI 応答 {args.llm_latency}秒、サーバースレッド {args.server_threads}本）")
+    print('=' * 60)
+
+    latencies, plot_statuses, _ = run_phase(args.server_threads, args.plot_clients, args.plot_requests, 0)
+    print(f'グラフ更新のみ       : {_percentiles(latencies)}  応答コード {plot_statuses}')
+
+    latencies, plot_statuses, llm_statuses = run_phase(args.server_threads, args.plot_clients, args.plot_requests, args.llm_clients)
+    print(f'AI 質問が殺到中      : {_percentiles(latencies)}  応答コード {plot_statuses}')
+    print(f'AI 質問の応答コード  : {llm_statuses}')
+    print(f'レーンの状態         : plot {web.plot_lane.status()}')
+    print(f'                       llm  {web.llm_lane.status()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+実験データ（スマートフォンのセンサー記録など）の取り込みと保存
+CSV をチャンク単位で読み、時間 (float64) と距離 (float32) の生バイナリとして保存する。
+表示時はメモリマップで必要な範囲だけを読み、形を保ったまま間引く
+"""
+
+import io
+import json
+import os
+import uuid
+
+import numpy as np
+
+from lab_fitting import StreamingPolynomialFit
+from sampling import downsample
+
+
+# 列名の候補（ヘッダーがある場合に使う）
+TIME_COLUMN_NAMES = ('t', 'time', 'times', 'seconds', 'sec', '時間', '時刻')
+VALUE_COLUMN_NAMES = ('distance', 'position', 'y', 'x', 'd', '距離', '位置')
+
+TIME_DTYPE = np.float64
+VALUE_DTYPE = np.float32
+
+
+def _detect_delimiter(line):
+    """1行目から区切り文字を推定"""
+    for delimiter in (',', '\t', ';'):
+        if delimiter in line:
+            return delimiter
+    return None
+
+
+def _is_number(text):
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def _find_column(header, names, default):
+    """ヘッダーから列番号を探す（見つからなければ default）"""
+    normalized = [h.strip().lower().split('(')[0].split('[')[0].strip() for h in header]
+    for name in names:
+        if name in normalized:
+            return normalized.index(name)
+    return default
+
+
+def _parse_chunk(lines, delimiter, columns):
+    """CSV の行のチャンクを (t, y) の配列にする。読めない行と有限でない値の行は捨てる
+
+    nan・inf や、距離の型 (float32) に収まらない値は当てはめの係数を NaN にするので取り込まない。
+    """
+    try:
+        data = np.loadtxt(lines, delimiter=delimiter, usecols=columns, ndmin=2)
+    except ValueError:
+        data = np.genfromtxt(lines, delimiter=delimiter, usecols=columns,
+                             invalid_raise=False, ndmin=2)
+    t, y = data[:, 0], data[:, 1]
+    with np.errstate(over='ignore'):
+        finite = np.isfinite(t) & np.isfinite(y.astype(VALUE_DTYPE))
+    return t[finite], y[finite]
+
+
+class MeasurementStore:
+    """実験データの保存先
+
+    1件の記録は <id>.t (float64), <id>.y (float32), <id>.json (メタデータ) の3ファイル。
+    取り込み中は .part の付いた名前に書き、最後まで読めたときだけ正式な名前に変える。
+    """
+
+    def __init__(self, directory='measurements'):
+        self.directory = directory
+
+    def _path(self, measurement_id, suffix):
+        if not measurement_id.isalnum():
+            raise KeyError(measurement_id)
+        return os.path.join(self.directory, f'{measurement_id}{suffix}')
+
+    def _part_path(self, measurement_id, suffix):
+        return self._path(measurement_id, suffix) + '.part'
+
+    def ingest_csv(self, stream, chunk_rows=65536, t_column=None, value_column=None, name=''):
+        """バイナリストリームの CSV をチャンク単位で取り込み、メタデータを返す
+
+        ファイル全体をメモリに載せることはない。取り込みながら一次・二次の
+        当てはめ（lab_fitting）も行う。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        measurement_id = uuid.uuid4().hex
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+
+        first = text.readline()
+        delimiter = _detect_delimiter(first)
+        fields = first.strip().split(delimiter) if delimiter else first.split()
+        has_header = not all(_is_number(field) for field in fields if field.strip())
+        header = fields if has_header else []
+        columns = (
+            t_column if t_column is not None else _find_column(header, TIME_COLUMN_NAMES, 0),
+            value_column if value_column is not None else _find_column(header, VALUE_COLUMN_NAMES, 1),
+        )
+
+        try:
+            fitter = StreamingPolynomialFit(max_degree=2)
+            count = 0
+            last_t = -np.inf
+            sorted_by_time = True
+            value_min, value_max = np.inf, -np.inf
+
+            with open(self._part_path(measurement_id, '.t'), 'wb') as t_file, \
+                    open(self._part_path(measurement_id, '.y'), 'wb') as y_file:
+
+                def write(lines):
+                    nonlocal count, last_t, sorted_by_time, value_min, value_max
+                    t, y = _parse_chunk(lines, delimiter, columns)
+                    if len(t) == 0:
+                        return
+                    sorted_by_time &= bool(t[0] >= last_t and np.all(np.diff(t) >= 0))
+                    last_t = t[-1]
+                    value_min, value_max = min(value_min, y.min()), max(value_max, y.max())
+                    t.astype(TIME_DTYPE).tofile(t_file)
+                    y.astype(VALUE_DTYPE).tofile(y_file)
+                    fitter.update(t, y)
+                    count += len(t)
+
+                lines = [] if has_header else [first]
+                for line in text:
+                    if line.strip():
+                        lines.append(line)
+                    if len(lines) >= chunk_rows:
+                        write(lines)
+                        lines = []
+                if lines:
+                    write(lines)
+
+            if count == 0:
+                raise ValueError('数値データが見つかりません')
+
+            meta = {
+                'id': measurement_id,
+                'name': name,
+                'count': count,
+                'columns': [header[c] if c < len(header) else str(c) for c in columns],
+                't_min': fitter.t_min,
+                't_max': fitter.t_max,
+                'value_min': float(value_min),
+                'value_max': float(value_max),
+                'sorted_by_time': sorted_by_time,
+                'fits': fitter.fits(),
+            }
+            # 当てはめの係数が有限でない（値が大きすぎる）ときは JSON にできないので ValueError にする
+            with open(self._part_path(measurement_id, '.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, allow_nan=False)
+            # メタデータを最後に置くので、meta() で見える記録はすべて書き終わっている
+            for suffix in ('.t', '.y', '.json'):
+                os.replace(self._part_path(measurement_id, suffix), self._path(measurement_id, suffix))
+            return meta
+        except BaseException:
+            # 途中で失敗したら、書きかけのファイルを残さない
+            self.delete(measurement_id)
+            raise
+
+    def meta(self, measurement_id):
+        """メタデータを読み込む"""
+        try:
+            with open(self._path(measurement_id, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(measurement_id) from None
+
+    def arrays(self, measurement_id):
+        """(t, y) をメモリマップで返す（ファイル全体は読み込まない）"""
+        meta = self.meta(measurement_id)
+        t = np.memmap(self._path(measurement_id, '.t'), dtype=TIME_DTYPE, mode='r', shape=(meta['count'],))
+        y = np.memmap(self._path(measurement_id, '.y'), dtype=VALUE_DTYPE, mode='r', shape=(meta['count'],))
+        return t, y
+
+    def view(self, measurement_id, points=1000, t_min=None, t_max=None, method='lttb'):
+        """表示範囲を切り出し、points 点以下に間引いた (t, y) を返す"""
+        meta = self.meta(measurement_id)
+        t, y = self.arrays(measurement_id)
+
+        if meta['sorted_by_time']:
+            start = 0 if t_min is None else int(np.searchsorted(t, t_min, side='left'))
+            end = len(t) if t_max is None else int(np.searchsorted(t, t_max, side='right'))
+            t, y = t[start:end], y[start:end]
+        elif t_min is not None or t_max is not None:
+            mask = np.ones(len(t), dtype=bool)
+            if t_min is not None:
+                mask &= t >= t_min
+            if t_max is not None:
+                mask &= t <= t_max
+            t, y = t[mask], y[mask]
+
+        t_shown, y_shown = downsample(t, y, points, method=method)
+        return np.asarray(t_shown, dtype=float), np.asarray(y_shown, dtype=float), len(t)
+
+    def delete(self, measurement_id):
+        """記録を削除（取り込み途中の .part も消す）"""
+        for suffix in ('.t', '.y', '.json'):
+            for path in (self._path(measurement_id, suffix), self._part_path(measurement_id, suffix)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+メモリ割り当ての予算チェック
+図の作成関数とルートを tracemalloc で計測し、割り当てのピークが予算を超えていないか、
+/update_plot を何千回も呼んだあとにメモリが増え続けていないか（リーク）を確かめる。
+予算の検査は tests/test_memory_budget.py が回数を減らして pytest で行う。
+このスクリプトは回数を増やしてじっくり確かめるときのもので、予算を超えたら終了コード 1 で終わる
+
+    python -m pytest tests/test_memory_budget.py   # 普段の予算チェック（数秒〜十数秒）
+    python memory_budget.py                 # 回数を増やした予算チェック
+    python memory_budget.py --calls 5000    # リークチェックの呼び出し回数を増やす
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import sys
+import tracemalloc
+
+from memory_profile import MemoryProfiler, format_bytes
+from plot_images import render_comparison_image
+
+KB = 1024
+
+# 1回あたりの割り当てのピークの予算（計測値に余裕を持たせた値）
+BUDGETS = {
+    'create_comparison_plot': 512 * KB,
+    'create_curve_frame': 64 * KB,
+    'render_comparison_image': 256 * KB,
+    'create_interactive_plot': 768 * KB,
+    'motion_analysis': 768 * KB,
+    'create_advanced_visualization': 768 * KB,
+    '/update_plot': 512 * KB,
+}
+
+# リークチェック：ウォームアップ後の呼び出し1回あたりに残ってよい量
+LEAK_BUDGET_PER_CALL = 64
+
+
+def load_builders():
+    """計測する app と図の作成関数（名前, 呼び出し）"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+        from claude_code_demo import GeminiCodeInteractiveDemo
+        from quadratic_functions_interactive import QuadraticFunctionLearning
+        learner = QuadraticFunctionLearning()
+        demo = GeminiCodeInteractiveDemo()
+    # 受付制御の流量制限で 429 にならないようにする（計測するのは処理そのもの）
+    app.plot_lane.limiter = None
+    app.plot_lane.address_limiter = None
+    return app, [
+        ('create_comparison_plot', lambda i: app.create_comparison_plot(1 + i % 5, 0.5 + i % 4)),
+        ('create_curve_frame', lambda i: app.create_curve_frame(1 + i % 5, 0.5 + i % 4, i)),
+        ('render_comparison_image', lambda i: render_comparison_image(app.plot_figures, 1 + i % 5, 2, 'png')),
+        ('create_interactive_plot', lambda i: learner.create_interactive_plot(linear_a=1 + i % 5, quad_a=0.5 + i % 4)),
+        ('motion_analysis', lambda i: learner.motion_analysis(acceleration=1 + i % 5)),
+        ('create_advanced_visualization', lambda i: demo.create_advanced_visualization(1 + i % 5, 2)),
+    ]
+
+
+def check_budgets(profiler, app, builders, repeat):
+    """図の作成関数とルートのピークを計測する"""
+    for name, build in builders:
+        build(-1)  # 初回だけの読み込み・キャッシュは数えない
+        for i in range(repeat):
+            with profiler.measure(name):
+                build(i)
+
+    client = app.app.test_client()
+    for i in range(repeat + 1):
+        measurement = profiler.measure('/update_plot') if i else contextlib.nullcontext()
+        with measurement:
+            response = client.post('/update_plot', json={'linear_a': 1 + i % 5, 'quadratic_a': 2})
+            response.get_data()
+    return profiler.report()
+
+
+def check_leak(app, calls, cycle=50):
+    """/update_plot を calls 回呼び、ウォームアップ後に残ったメモリの1回あたりの量を返す
+
+    パラメータと送信元アドレスは cycle 通りを繰り返す
+    （キャッシュやアドレスごとの記録がいっぱいになってからの増加を見る）。
+    """
+    client = app.app.test_client()
+
+    def call(i):
+        response = client.post('/update_plot', json={'linear_a': 0.5 + (i % cycle) / 10, 'quadratic_a': 2},
+                               environ_base={'REMOTE_ADDR': f'10.9.{i % cycle}.1'})
+        response.get_data()
+
+    for i in range(cycle * 2):
+        call(i)
+    gc.collect()
+    before = tracemalloc.take_snapshot()
+    for i in range(calls):
+        call(i)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    growth = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    top = after.compare_to(before, 'lineno')[:3]
+    return growth / calls, top
+
+
+def main():
+    parser = argparse.ArgumentParser(description='メモリ割り当ての予算チェック')
+    parser.add_argument('--repeat', type=int, default=20, help='ピークを測る呼び出し回数')
+    parser.add_argument('--calls', type=int, default=2000, help='リークチェックの /update_plot の呼び出し回数')
+    args = parser.parse_args()
+
+    app, builders = load_builders()
+    profiler = MemoryProfiler()
+    profiler.start()
+
+    print('🧮 メモリ割り当ての予算チェック')
+    print('=' * 60)
+    failures = []
+    report = check_budgets(profiler, app, builders, args.repeat)
+    for name, stats in report.items():
+        budget = BUDGETS.get(name)
+        ok = budget is None or stats['peak_max'] <= budget
+        if not ok:
+            failures.append(name)
+        print(f"{'✅' if ok else '❌'} {name:30s} ピーク {format_bytes(stats['peak_max']):>9s}"
+              f"（平均 {format_bytes(stats['peak_mean']):>9s}） 残存 {format_bytes(stats['retained_mean']):>8s}"
+              f"  予算 {format_bytes(budget) if budget else '-'}")
+
+    per_call, top = check_leak(app, args.calls)
+    ok = per_call <= LEAK_BUDGET_PER_CALL
+    if not ok:
+        failures.append('leak')
+    print(f"{'✅' if ok else '❌'} /update_plot × {args.calls}回のあとの増加: 1回あたり {per_call:.1f}B"
+          f"（予算 {LEAK_BUDGET_PER_CALL}B）")
+    if not ok:
+        for stat in top:
+            print(f'     {stat}')
+
+    tracemalloc.stop()
+    if failures:
+        print(f'\n予算を超えました: {", ".join(failures)}')
+        sys.exit(1)
+    print('\nすべて予算内です')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+メモリ割り当ての計測
+tracemalloc で、処理（図の作成関数・ルート）ごとの割り当てのピークと、
+処理のあとに残った量（retained）を集計する。計測中は処理が遅くなるので、
+アプリでは MEMORY_PROFILE=1 のときだけ有効にする
+"""
+
+import functools
+import threading
+import tracemalloc
+from collections import defaultdict
+
+
+class _Frame:
+    def __init__(self, start):
+        self.start = start
+        self.peak = start
+
+
+class MemoryProfiler:
+    """処理ごとの割り当てを計測・集計する
+
+    tracemalloc のピークはプロセス全体で1つなので、ルートのような外側の計測は
+    exclusive=True で1つずつ実行する。内側の計測（図の作成）はレーンのスレッドで
+    動くこともあるので、計測中の処理の積み上げはスレッドをまたいで1つにしてある。
+    入れ子では、内側でピークをリセットする前に外側のピークを退避しておく。
+    """
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self._exclusive = threading.Lock()
+        self._lock = threading.Lock()
+        self._stack = []
+        self.stats = defaultdict(lambda: {'calls': 0, 'peak_max': 0, 'peak_total': 0,
+                                          'retained_total': 0, 'retained_last': 0})
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def measure(self, name, exclusive=False):
+        """with profiler.measure('名前'): で囲んだ処理を計測する"""
+        return _Measurement(self, name, exclusive)
+
+    def _enter(self, exclusive):
+        if exclusive:
+            self._exclusive.acquire()
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            frame = _Frame(current)
+            self._stack.append(frame)
+        return frame
+
+    def _exit(self, frame, name, exclusive):
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            frame.peak = max(frame.peak, peak)
+            self._stack.remove(frame)
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, frame.peak)
+            self._add(name, frame.peak - frame.start, current - frame.start)
+        if exclusive:
+            self._exclusive.release()
+        return frame.peak - frame.start, current - frame.start
+
+    def _add(self, name, peak, retained):
+        stats = self.stats[name]
+        stats['calls'] += 1
+        stats['peak_max'] = max(stats['peak_max'], peak)
+        stats['peak_total'] += peak
+        stats['retained_total'] += retained
+        stats['retained_last'] = retained
+
+    def wrap(self, fn, name=None):
+        """関数を計測付きにする（デコレーターとしても使える）"""
+        name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self.measure(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def report(self):
+        """処理ごとの集計（バイト単位）"""
+        with self._lock:
+            return {name: {'calls': s['calls'],
+                           'peak_max': s['peak_max'],
+                           'peak_mean': s['peak_total'] // max(s['calls'], 1),
+                           'retained_mean': s['retained_total'] // max(s['calls'], 1),
+                           'retained_last': s['retained_last']}
+                    for name, s in sorted(self.stats.items())}
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+
+class _Measurement:
+    def __init__(self, profiler, name, exclusive):
+        self.profiler = profiler
+        self.name = name
+        self.exclusive = exclusive
+        self.peak = self.retained = None
+
+    def __enter__(self):
+        self._frame = self.profiler._enter(self.exclusive)
+        return self
+
+    def __exit__(self, *exc):
+        self.peak, self.retained = self.profiler._exit(self._frame, self.name, self.exclusive)
+        return False
+
+
+def format_bytes(size):
+    """バイト数を読みやすい単位にする"""
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024 or unit == 'MB':
+            return f'{size:.0f}{unit}' if unit == 'B' else f'{size:.1f}{unit}'
+        size /= 1024
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+数値積分による運動のシミュレーション
+空気抵抗のある投げ上げや、摩擦で止まるブレーキのように公式で解けない運動を、
+多数の物体まとめて固定刻みの RK4 で積分する。
+配列はすべて (物体数, 時刻数) の形で、物体ごとにパラメータを変えられる
+"""
+
+import numpy as np
+
+
+def _acceleration_function(acceleration, drag, quadratic_drag, friction_acceleration):
+    """速度から加速度を求める関数を作る（係数がすべて 0 の項は計算しない）
+
+    一定の加速度 + 速度に比例する抵抗 + 速度の2乗に比例する抵抗 + 動摩擦。
+    """
+    terms = []
+    if np.any(drag):
+        terms.append(lambda v: drag * v)
+    if np.any(quadratic_drag):
+        terms.append(lambda v: quadratic_drag * v * np.abs(v))
+    if np.any(friction_acceleration):
+        terms.append(lambda v: friction_acceleration * np.sign(v))
+
+    def accel(v):
+        a = acceleration - terms[0](v) if terms else np.broadcast_to(acceleration, v.shape)
+        for term in terms[1:]:
+            a = a - term(v)
+        return a
+
+    return accel
+
+
+def simulate_motion(x0=0.0, v0=0.0, acceleration=0.0, drag=0.0, quadratic_drag=0.0, friction=0.0,
+                    time_max=6.0, steps=600, g=9.8):
+    """直線上の運動をまとめて積分する
+
+    パラメータはスカラーか物体ごとの配列（ブロードキャストできる形）:
+    - x0, v0: 初期位置・初速度
+    - acceleration: 一定の加速度（投げ上げなら -g）
+    - drag: 速度に比例する抵抗の係数 k/m [1/s]
+    - quadratic_drag: 速度の2乗に比例する抵抗の係数 c/m [1/m]
+    - friction: 動摩擦係数 μ（摩擦による減速は μg）
+
+    摩擦のある物体は、一定の加速度が μg 以下なら、その刻みのうちに止まる時点で
+    止まり（最後の刻みは等減速として停止距離を求める）、以後は静止摩擦で止まったままとする。
+
+    戻り値は {'t': (steps+1,), 'x', 'v', 'a': (物体数, steps+1)} の dict。
+    """
+    if steps < 1:
+        raise ValueError('steps は1以上にしてください')
+    x0, v0, acceleration, drag, quadratic_drag, friction = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(p, dtype=float)) for p in
+          (x0, v0, acceleration, drag, quadratic_drag, friction)))
+    h = time_max / steps
+    friction_acceleration = friction * g
+    accel = _acceleration_function(acceleration, drag, quadratic_drag, friction_acceleration)
+    can_stop = (friction_acceleration > 0) & (np.abs(acceleration) <= friction_acceleration)
+    any_stop = bool(can_stop.any())
+    stopped = can_stop & (v0 == 0)
+
+    # 時刻ごとの行を連続したメモリに書き、最後に (物体数, 時刻数) に並べ替える
+    t = np.linspace(0, time_max, steps + 1)
+    x = np.empty((steps + 1, len(x0)))
+    v = np.empty((steps + 1, len(x0)))
+    a = np.empty((steps + 1, len(x0)))
+    x[0], v[0] = x0, v0
+
+    for i in range(steps):
+        xi, vi = x[i], v[i]
+        k1 = accel(vi)
+        k2 = accel(vi + 0.5 * h * k1)
+        k3 = accel(vi + 0.5 * h * k2)
+        k4 = accel(vi + h * k3)
+        v_next = vi + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        # x' = v なので位置の RK4 は xi + h·vi + h²/6·(k1 + k2 + k3) にまとまる
+        x_next = xi + h * vi + h * h / 6 * (k1 + k2 + k3)
+
+        if any_stop:
+            # この刻みのうちに止まる物体は、停止距離 v²/2|a| の位置で静止させる
+            stopping = can_stop & ~stopped & ((v_next * vi <= 0) | (np.abs(vi) <= h * np.abs(k1)))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                stop_x = xi + np.where(k1 != 0, vi * np.abs(vi) / (2 * np.abs(k1)), 0.0)
+            x_next = np.where(stopping, stop_x, np.where(stopped, xi, x_next))
+            k1 = np.where(stopped, 0.0, k1)
+            stopped = stopped | stopping
+            v_next = np.where(stopped, 0.0, v_next)
+
+        a[i] = k1
+        x[i + 1], v[i + 1] = x_next, v_next
+
+    a[steps] = accel(v[steps])
+    if any_stop:
+        a[steps] = np.where(stopped, 0.0, a[steps])
+    return {'t': t, 'x': x.T.copy(), 'v': v.T.copy(), 'a': a.T.copy()}
+
+
+def terminal_velocity(acceleration, drag=0.0, quadratic_drag=0.0):
+    """終端速度（抵抗と一定の加速度がつり合う速度）。抵抗がなければ inf"""
+    acceleration, drag, quadratic_drag = np.broadcast_arrays(
+        *(np.asarray(p, dtype=float) for p in (acceleration, drag, quadratic_drag)))
+    g = np.abs(acceleration)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # c v² + k v - g = 0 の正の解（c = 0 なら g / k）
+        speed = np.where(quadratic_drag > 0,
+                         (-drag + np.sqrt(drag * drag + 4 * quadratic_drag * g)) / (2 * quadratic_drag),
+                         np.where(drag > 0, g / drag, np.inf))
+    speed = np.where(g == 0, 0.0, speed)
+    return np.sign(acceleration) * speed
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+比較グラフの静止画（PNG / SVG）
+plotly.js を動かすのが重い古いタブレット向けに、サーバー側で matplotlib で描いた画像を返す。
+Figure は作っておいて使い回し（pyplot の共有状態を使わないのでスレッドごとに別の Figure を描ける）、
+描いた画像はパラメータごとにディスクへキャッシュする
+"""
+
+import hashlib
+import io
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from matplotlib import font_manager, rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from function_core import format_polynomial, sample_family
+
+IMAGE_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+# 日本語フォントがあれば日本語のラベル、無ければ豆腐にならないよう英語のラベル
+_JAPANESE_FONTS = ['Hiragino Sans', 'Yu Gothic', 'Meiryo', 'Takao', 'IPAexGothic', 'IPAPGothic',
+                   'VL PGothic', 'Noto Sans CJK JP']
+_installed = {font.name for font in font_manager.fontManager.ttflist}
+FONT_FAMILY = [name for name in _JAPANESE_FONTS if name in _installed] + ['DejaVu Sans']
+HAS_JAPANESE_FONT = len(FONT_FAMILY) > 1
+if HAS_JAPANESE_FONT:
+    LABELS = {'title': '一次関数 vs 二次関数：鉄球の運動比較', 'x': '時間 (秒)', 'y': '距離 (m)',
+              'linear': '一次関数', 'quadratic': '二次関数',
+              'linear_points': '一次関数データ点', 'quadratic_points': '二次関数データ点'}
+else:
+    LABELS = {'title': 'Linear vs quadratic motion', 'x': 'time (s)', 'y': 'distance (m)',
+              'linear': 'linear', 'quadratic': 'quadratic',
+              'linear_points': 'linear data', 'quadratic_points': 'quadratic data'}
+
+# SVG の文字はパスにせずテキストのまま書く（ファイルが小さくなる）
+rcParams['svg.fonttype'] = 'none'
+
+# 教材の表のデータ点（create_comparison_plot と同じ）
+_DATA_T = np.arange(7)
+_LINEAR_POINTS = 2 * _DATA_T
+_QUADRATIC_POINTS = 2 * _DATA_T ** 2
+
+
+class ComparisonFigure:
+    """比較グラフを描いた matplotlib の Figure（create_comparison_plot の静止画版）
+
+    軸・目盛り・凡例・データ点は作成時に一度だけ用意し、
+    描画のたびには曲線のデータと凡例の式、縦軸の範囲だけを更新する。
+    曲線はインタラクティブなグラフ（comparison_plot）と同じ sample_family のグリッドで描く。
+    """
+
+    def __init__(self, width=8.0, height=4.5, x_max=6):
+        self.figure = Figure(figsize=(width, height))
+        FigureCanvasAgg(self.figure)
+        self.figure.subplots_adjust(left=0.09, right=0.98, top=0.9, bottom=0.13)
+        self.x_max = x_max
+        font = {'family': FONT_FAMILY}
+        ax = self.axes = self.figure.add_subplot()
+        self.linear_line, = ax.plot([], [], color='blue', linewidth=2.5, label=LABELS['linear'])
+        self.quadratic_line, = ax.plot([], [], color='red', linewidth=2.5, label=LABELS['quadratic'])
+        ax.plot(_DATA_T, _LINEAR_POINTS, 'o', color='blue', markersize=5,
+                label=LABELS['linear_points'])
+        ax.plot(_DATA_T, _QUADRATIC_POINTS, 'o', color='red', markersize=5,
+                label=LABELS['quadratic_points'])
+        ax.set_title(LABELS['title'], fontdict=font)
+        ax.set_xlabel(LABELS['x'], fontdict=font)
+        ax.set_ylabel(LABELS['y'], fontdict=font)
+        ax.set_xlim(-0.3, x_max + 0.3)
+        ax.grid(True, alpha=0.3)
+        self.legend = ax.legend(loc='upper left', prop=font)
+
+    def update(self, linear_a, quadratic_a):
+        """パラメータに合わせて曲線・凡例・縦軸を更新する"""
+        t, (values, _, _) = sample_family([[linear_a, 0], [quadratic_a, 0, 0]], 0, self.x_max)
+        y_linear, y_quad = values
+        self.linear_line.set_data(t, y_linear)
+        self.quadratic_line.set_data(t, y_quad)
+        texts = self.legend.get_texts()
+        texts[0].set_text(f"{LABELS['linear']}: {format_polynomial([linear_a, 0])}")
+        texts[1].set_text(f"{LABELS['quadratic']}: {format_polynomial([quadratic_a, 0, 0])}")
+        low = min(y_linear.min(), y_quad.min(), 0)
+        high = max(y_linear.max(), y_quad.max(), _QUADRATIC_POINTS.max())
+        margin = (high - low) * 0.05 or 1
+        self.axes.set_ylim(low - margin, high + margin)
+
+
+class FigurePool:
+    """使い回す ComparisonFigure のプール
+
+    Figure と軸の作成は描画より重いので、size 個を作っておき貸し出す。
+    1つの Figure を同時に描くのは1スレッドだけ。全部貸し出し中なら空くまで待つ。
+    """
+
+    def __init__(self, size=4):
+        self._figures = queue.LifoQueue()
+        for _ in range(size):
+            self._figures.put(ComparisonFigure())
+
+    @contextmanager
+    def figure(self):
+        figure = self._figures.get()
+        try:
+            yield figure
+        finally:
+            self._figures.put(figure)
+
+
+def render_comparison_image(pool, linear_a, quadratic_a, image_format='png', dpi=80):
+    """比較グラフを画像のバイト列にする"""
+    with pool.figure() as comparison:
+        comparison.update(linear_a, quadratic_a)
+        buffer = io.BytesIO()
+        comparison.figure.savefig(buffer, format=image_format, dpi=dpi)
+    return buffer.getvalue()
+
+
+class ImageCache:
+    """パラメータをキーにした画像のディスクキャッシュ
+
+    書き込みは一時ファイルから置き換えるので、読み込み中に壊れたファイルは見えない。
+    max_files を超えたら古いファイルから消す。
+    """
+
+    def __init__(self, directory, max_files=5000):
+        self.directory = directory
+        self.max_files = max_files
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        """キャッシュのキー（ETag にも使う）"""
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:20]
+
+    def _path(self, key, image_format):
+        return os.path.join(self.directory, f'{key}.{image_format}')
+
+    def get(self, key, image_format):
+        try:
+            with open(self._path(key, image_format), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, image_format, data):
+        path = self._path(key, image_format)
+        # ワーカープロセスどうしでもスレッドどうしでも重ならない一時ファイル名
+        temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """max_files を超えた分を更新の古い順に消す"""
+        entries = [entry for entry in os.scandir(self.directory)
+                   if entry.is_file() and not entry.name.endswith('.tmp')]
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def get_or_render(self, key, image_format, render):
+        """キャッシュにあればそれを、無ければ render() で作って保存して返す"""
+        data = self.get(key, image_format)
+        if data is None:
+            data = render()
+            self.put(key, image_format, data)
+        return data
+
+
+_resources = {}
+_resources_lock = threading.Lock()
+
+
+def image_resources(directory, figures=1):
+    """このプロセスの (FigurePool, ImageCache)。キャッシュのディレクトリごとに初回だけ作る
+
+    アプリは同時に描くスレッドの数だけ Figure を先に用意しておく。グラフ作成の
+    ワーカープロセスは1つずつしか描かないので、初回の呼び出しで1つだけ作る。
+    """
+    with _resources_lock:
+        if directory not in _resources:
+            _resources[directory] = (FigurePool(size=figures), ImageCache(directory))
+        return _resources[directory]
+
+
+def render_cached_image(directory, key, linear_a, quadratic_a, image_format='png', width=640):
+    """静止画を描いて directory のキャッシュに保存し、バイト列を返す
+
+    app の /plot.<形式> がレーンで呼ぶ。ワーカープロセスでも動くよう、引数はすべて
+    pickle できる値にしてある。
+    """
+    figures, cache = image_resources(directory)
+    return cache.get_or_render(key, image_format, lambda: render_comparison_image(
+        figures, linear_a, quadratic_a, image_format, dpi=width / 8))
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+パラメータ型の問題生成器
+一次関数・二次関数・運動・利益最大化の問題を大量に生成する。
+パラメータの抽選・解答の計算・検算はすべて NumPy で一括して行い、
+ハッシュ索引で同じ問題が二度出題されないようにする（使い切った種類は重複を許して出題する）
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from function_core import format_polynomial
+from quadratic_analysis import analyze_quadratics
+
+
+# 問題の種類ごとのパラメータ（名前, 最小値, 最大値, 刻み）。刻みの整数倍で抽選する
+# motion は初速度 5〜50 m/s・高さ 0〜100 m、profit は価格 10h 円（50〜500円）と
+# 固定費（最大売上 p(10h)² の r %。r ≦ 90 なので最大利益は常に正）。
+# ask は問い方（motion は 0: 最高到達点の高さ / 1: 最高点に達する時刻、
+# profit は 0: 最大利益 / 1: 利益が最大になる価格）。種類ごとに十数万〜数十万通り
+PROBLEM_KINDS = {
+    'linear': [('a', -10, 10, 0.5), ('b', -50, 50, 1), ('x', -10, 10, 0.5)],
+    'quadratic': [('a', -5, 5, 0.5), ('h', -10, 10, 0.25), ('k', -50, 50, 1)],
+    'motion': [('v0', 5, 50, 0.5), ('h0', 0, 100, 0.1), ('ask', 0, 1, 1)],
+    'profit': [('p', 1, 20, 1), ('h', 5, 50, 1), ('r', 0, 90, 1), ('ask', 0, 1, 1)],
+}
+
+
+def problem_space(kind):
+    """種類ごとの問題の通り数（パラメータの組の数の上限）"""
+    return int(np.prod([round((high - low) / step) + 1 for _, low, high, step in PROBLEM_KINDS[kind]]))
+
+# 選択肢の誤答に使う、正答からのずれ（step の倍数）
+_DISTRACTOR_OFFSETS = np.array([-2, -1, 1, 2])
+
+
+class ProblemIndex:
+    """出題済み問題のハッシュ索引
+
+    問題はパラメータから一意に決まる整数キーで表し、集合で管理する。
+    """
+
+    def __init__(self):
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def __contains__(self, key):
+        return key in self._seen
+
+    def claim(self, keys, limit=None):
+        """未出題のキーを最大 limit 個登録し、登録できた位置のマスクを返す
+
+        同じバッチ内で重複するキーは最初の1つだけを対象にする。
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        unique_keys, first_positions = np.unique(keys, return_index=True)
+        order = np.argsort(first_positions)
+        unique_keys, first_positions = unique_keys[order], first_positions[order]
+
+        with self._lock:
+            fresh = np.fromiter((k not in self._seen for k in unique_keys.tolist()),
+                                dtype=bool, count=len(unique_keys))
+            positions = first_positions[fresh][:limit]
+            self._seen.update(keys[positions].tolist())
+
+        mask = np.zeros(len(keys), dtype=bool)
+        mask[positions] = True
+        return mask
+
+    def save(self, path):
+        """索引を .npy ファイルに保存"""
+        with self._lock:
+            np.save(path, np.fromiter(self._seen, dtype=np.int64, count=len(self._seen)))
+
+    def load(self, path):
+        """保存した索引を読み込んで追加"""
+        keys = np.load(path)
+        with self._lock:
+            self._seen.update(keys.tolist())
+
+
+def _fmt(value):
+    """数値を余計な小数点なしで表示（整数値は整数、それ以外は有効数字10桁）"""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else f'{value:.10g}'
+
+
+class ParametricProblemGenerator:
+    """重複なしの問題を一括生成する"""
+
+    def __init__(self, seed=None, index=None):
+        self.rng = np.random.default_rng(seed)
+        self.index = index if index is not None else ProblemIndex()
+
+    def generate(self, count, kinds=None):
+        """count 問を生成して問題の dict のリストを返す（種類は均等に割り当てる）"""
+        kinds = list(kinds or PROBLEM_KINDS)
+        unknown = set(kinds) - set(PROBLEM_KINDS)
+        if unknown:
+            raise ValueError(f'未対応の問題の種類です: {sorted(unknown)}')
+
+        problems = []
+        per_kind = np.full(len(kinds), count // len(kinds))
+        per_kind[:count % len(kinds)] += 1
+        for kind, n in zip(kinds, per_kind):
+            problems.extend(self._generate_kind(kind, int(n)))
+
+        # 種類が偏らないよう並べ替える
+        order = self.rng.permutation(len(problems))
+        return [problems[i] for i in order]
+
+    def _generate_kind(self, kind, count, max_rounds=20):
+        """1種類の問題を count 問生成
+
+        まず索引で重複なしに選び、索引の問題を使い切って足りなければ、
+        出題済みの問題も（このセットの中ではなるべく重ならないように）使う。
+        """
+        batches = []
+        remaining = count
+        for _ in range(max_rounds):
+            if remaining <= 0:
+                break
+            params, answers, valid = self._draw_valid(kind, remaining)
+            fresh = np.zeros(len(valid), dtype=bool)
+            fresh[valid] = self.index.claim(params['key'][valid], limit=remaining)
+            remaining -= self._take(kind, params, answers, fresh, batches)
+
+        # 索引の問題を使い切った：出題済みの問題で埋める（セット内の重複は最後の手段）
+        chosen = set()
+        for batch in batches:
+            chosen.update(problem['key'] for problem in batch)
+        for round_ in range(max_rounds + 1):
+            if remaining <= 0:
+                break
+            params, answers, valid = self._draw_valid(kind, remaining)
+            if round_ < max_rounds:
+                keys = params['key'].tolist()
+                _, first = np.unique(params['key'], return_index=True)
+                unique = np.zeros(len(keys), dtype=bool)
+                unique[first] = True
+                valid &= unique & np.array([key not in chosen for key in keys], dtype=bool)
+            selected = valid & (np.cumsum(valid) <= remaining)
+            chosen.update(params['key'][selected].tolist())
+            remaining -= self._take(kind, params, answers, selected, batches)
+
+        problems = [problem for batch in batches for problem in batch]
+        for problem in problems:
+            del problem['key']
+        return problems
+
+    def _draw_valid(self, kind, remaining):
+        """少し多めに抽選し、(パラメータ, 解答, 検算に通った行のマスク) を返す"""
+        params = self._draw(kind, int(remaining * 1.2) + 8)
+        answers = self._solve(kind, params)
+        return params, answers, self._verify(kind, params, answers)
+
+    def _take(self, kind, params, answers, mask, batches):
+        """マスクの行を問題にして batches に加え、問題数を返す"""
+        selected = np.flatnonzero(mask)
+        batches.append(self._render(kind, {k: v[selected] for k, v in params.items()},
+                                    {k: v[selected] for k, v in answers.items()}))
+        return len(selected)
+
+    def _draw(self, kind, n):
+        """パラメータを刻みの整数倍で一括抽選し、問題キー（刻みの番号の組）を付ける"""
+        spec = PROBLEM_KINDS[kind]
+        params = {}
+        key = np.full(n, list(PROBLEM_KINDS).index(kind), dtype=np.int64)
+        for name, low, high, step in spec:
+            levels = round((high - low) / step) + 1
+            if kind == 'quadratic' and name == 'a':
+                # a = 0 は二次関数にならないので ±step〜±high から選ぶ
+                magnitude = self.rng.integers(1, round(high / step) + 1, size=n)
+                index = np.where(self.rng.random(n) < 0.5, round(-low / step) - magnitude,
+                                 round(-low / step) + magnitude)
+            else:
+                index = self.rng.integers(0, levels, size=n)
+            # 小数の刻みは 0.1 × 3 = 0.30000000000000004 のような誤差を丸める
+            params[name] = low + index * step if float(step).is_integer() else np.round(low + index * step, 10)
+            key = key * levels + index
+        params['key'] = key
+        return params
+
+    def _solve(self, kind, params):
+        """解答を一括計算（二次式は y = ax² + bx + c の係数も返す）"""
+        if kind == 'linear':
+            return {'value': (params['a'] * params['x'] + params['b']).astype(float)}
+
+        if kind == 'quadratic':
+            a, h, k = params['a'], params['h'], params['k']
+            return {'coef_a': a.astype(float), 'coef_b': -2.0 * a * h,
+                    'coef_c': a * h * h + k.astype(float),
+                    'arg': h.astype(float), 'value': k.astype(float)}
+
+        if kind == 'motion':
+            # y = -5t² + v0 t + h0（g = 10 m/s²）
+            v0, h0 = params['v0'], params['h0']
+            return {'coef_a': np.full(len(v0), -5.0), 'coef_b': v0.astype(float),
+                    'coef_c': h0.astype(float),
+                    'arg': v0 / 10.0, 'value': h0 + v0 * v0 / 20.0}
+
+        # profit: y = -px² + 2pHx - c（価格 H = 10h 円のとき最大、固定費 c = pH² × r/100）
+        p, price = params['p'], params['h'] * 10
+        cost = p * params['h'] * params['h'] * params['r']
+        return {'coef_a': -p.astype(float), 'coef_b': 2.0 * p * price,
+                'coef_c': -cost.astype(float),
+                'arg': price.astype(float), 'value': (p * price * price - cost).astype(float)}
+
+    def _verify(self, kind, params, answers):
+        """解答を別の方法で一括検算し、正しい行のマスクを返す"""
+        if kind == 'linear':
+            a, b, x = params['a'], params['b'], params['x']
+            # a = 0 は一次関数にならない
+            return (a != 0) & np.isclose(answers['value'] - b, a * x)
+
+        analysis = analyze_quadratics(answers['coef_a'], answers['coef_b'], answers['coef_c'])
+        return (np.isclose(analysis['vertex_x'], answers['arg'])
+                & np.isclose(analysis['vertex_y'], answers['value']))
+
+    def _options(self, values):
+        """4択の選択肢（正答＋誤答3つ）と正答の位置を一括作成"""
+        n = len(values)
+        magnitude = np.abs(values)
+        step = np.where(magnitude >= 10, np.round(magnitude * 0.1), np.where(magnitude >= 2, 1.0, 0.25))
+        picks = np.argsort(self.rng.random((n, len(_DISTRACTOR_OFFSETS))), axis=1)[:, :3]
+        distractors = values[:, None] + step[:, None] * _DISTRACTOR_OFFSETS[picks]
+        options = np.hstack([values[:, None], distractors])
+        order = np.argsort(self.rng.random((n, 4)), axis=1)
+        return np.take_along_axis(options, order, axis=1), np.argmax(order == 0, axis=1)
+
+    def _render(self, kind, params, answers):
+        """問題文・解答・解説の dict を作成（'key' は生成中の重複判定用で、最後に外す）"""
+        # 問い方が頂点の座標（時刻・価格）の問題は、その値を答えにする
+        asked = np.where(params['ask'] == 1, answers['arg'], answers['value']) if 'ask' in params else answers['value']
+        options, correct = self._options(asked)
+        problems = []
+        for i in range(len(params['key'])):
+            problem = {
+                'id': f"{kind}-{params['key'][i]}",
+                'key': int(params['key'][i]),
+                'kind': kind,
+                'answer_value': float(asked[i]),
+                'options': [_fmt(v) for v in options[i]],
+                'correct': int(correct[i]),
+            }
+            problem.update(self._texts(kind, {k: v[i] for k, v in params.items()},
+                                       {k: v[i] for k, v in answers.items()}))
+            problems.append(problem)
+        return problems
+
+    def _texts(self, kind, p, answer):
+        """1問分の文章を作成"""
+        if kind == 'linear':
+            function = format_polynomial([p['a'], p['b']])
+            return {
+                'title': '📏 一次関数の値',
+                'description': f"一次関数 {function} において、x = {_fmt(p['x'])} のときの y の値は？",
+                'function': function,
+                'answer': _fmt(answer['value']),
+                'explanation': f"{function} に x = {_fmt(p['x'])} を代入すると y = {_fmt(answer['value'])}",
+            }
+
+        function = format_polynomial([answer['coef_a'], answer['coef_b'], answer['coef_c']])
+        if kind == 'quadratic':
+            word = '最小値' if p['a'] > 0 else '最大値'
+            return {
+                'title': '📐 二次関数の最大・最小',
+                'description': f"二次関数 {function} の{word}は？",
+                'function': function,
+                'answer': f"{word}：{_fmt(answer['value'])}（x = {_fmt(answer['arg'])}）",
+                'explanation': (f"頂点のx座標は -b/2a = {_fmt(-answer['coef_b'])}/({_fmt(2 * answer['coef_a'])})"
+                                f" = {_fmt(answer['arg'])}、代入して y = {_fmt(answer['value'])}"),
+            }
+
+        if kind == 'motion':
+            function = format_polynomial([answer['coef_a'], answer['coef_b'], answer['coef_c']], 't')
+            throw = f"高さ{_fmt(p['h0'])}mの地点から初速度{_fmt(p['v0'])}m/sで真上に投げたボール"
+            vertex = (f"二次関数の頂点公式を使用。頂点のt座標は -b/2a = {_fmt(p['v0'])}/10 = "
+                      f"{_fmt(answer['arg'])}、高さは {_fmt(answer['value'])}m")
+            if p['ask'] == 1:
+                return {
+                    'title': '🏀 ボールの放物運動（時刻）',
+                    'description': f"{throw}が最高点に達するのは何秒後？（重力加速度g=10m/s²）",
+                    'function': function,
+                    'answer': f"{_fmt(answer['arg'])}秒後（最高到達点：{_fmt(answer['value'])}m）",
+                    'explanation': vertex,
+                }
+            return {
+                'title': '🏀 ボールの放物運動',
+                'description': f"{throw}の最高到達点の高さは？（重力加速度g=10m/s²）",
+                'function': function,
+                'answer': f"最高到達点：{_fmt(answer['value'])}m（t={_fmt(answer['arg'])}秒）",
+                'explanation': vertex,
+            }
+
+        vertex = (f"頂点のx座標：{_fmt(answer['coef_b'])}/({_fmt(-2 * answer['coef_a'])}) = {_fmt(answer['arg'])}、"
+                  f"y座標：{_fmt(answer['value'])}")
+        if p['ask'] == 1:
+            return {
+                'title': '💰 利益最大化問題（価格）',
+                'description': f"商品価格をx円とすると、利益が{function}円。利益が最大になる価格は？",
+                'function': function,
+                'answer': f"価格{_fmt(answer['arg'])}円（最大利益：{_fmt(answer['value'])}円）",
+                'explanation': vertex,
+            }
+        return {
+            'title': '💰 利益最大化問題',
+            'description': f"商品価格をx円とすると、利益が{function}円。最大利益は？",
+            'function': function,
+            'answer': f"最大利益：{_fmt(answer['value'])}円（価格{_fmt(answer['arg'])}円）",
+            'explanation': vertex,
+        }
+
+
+class ProblemSetStore:
+    """生成した問題セットと、先生ごとの出題済み索引（LRU）
+
+    どちらも上限を超えたら最も長く使われていないものから捨て、
+    idle_seconds 以上使われていないものも捨てる。先生の指定が無いセットは
+    そのセットだけの索引で重複を防ぐ。
+    """
+
+    def __init__(self, max_sets=200, max_teachers=200, idle_seconds=24 * 60 * 60):
+        self.max_sets = max_sets
+        self.max_teachers = max_teachers
+        self.idle_seconds = idle_seconds
+        self._sets = OrderedDict()
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sets)
+
+    def index_for(self, teacher_id=None):
+        """先生ごとの出題済み索引（指定が無ければ新しい索引）"""
+        if not teacher_id:
+            return ProblemIndex()
+        with self._lock:
+            entry = self._touch(self._indexes, teacher_id)
+            index = entry[0] if entry else ProblemIndex()
+            self._put(self._indexes, teacher_id, index, self.max_teachers)
+            return index
+
+    def add(self, problems):
+        """問題セットを登録して set_id を返す"""
+        set_id = uuid.uuid4().hex
+        with self._lock:
+            self._put(self._sets, set_id, problems, self.max_sets)
+        return set_id
+
+    def get(self, set_id):
+        """問題セットを取得（無い・期限切れなら None）"""
+        with self._lock:
+            entry = self._touch(self._sets, set_id)
+            return entry[0] if entry else None
+
+    def _touch(self, entries, key):
+        """期限切れを捨ててから取り出し、最終利用時刻を更新"""
+        self._evict(entries)
+        entry = entries.get(key)
+        if entry is not None:
+            entry[1] = time.time()
+            entries.move_to_end(key)
+        return entry
+
+    def _put(self, entries, key, value, limit):
+        self._evict(entries)
+        entries[key] = [value, time.time()]
+        entries.move_to_end(key)
+        while len(entries) > limit:
+            entries.popitem(last=False)
+
+    def _evict(self, entries):
+        """期限切れのものを古い順に捨てる（並びは最終利用順）"""
+        limit = time.time() - self.idle_seconds
+        while entries and next(iter(entries.values()))[1] < limit:
+            entries.popitem(last=False)
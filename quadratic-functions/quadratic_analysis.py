@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+二次関数 y = ax² + bx + c の一括解析
+頂点・判別式・実数解・切片・増減の区間を NumPy で一度に計算する。
+a = 0 の行は一次関数（b = 0 なら定数関数）として扱う
+"""
+
+from fractions import Fraction
+import math
+
+import numpy as np
+
+
+def analyze_quadratics(a, b, c, exact=False):
+    """係数の配列をまとめて解析し、列ごとの配列の dict を返す
+
+    - vertex_x, vertex_y: 頂点（a = 0 のとき NaN）
+    - discriminant: 判別式 b² - 4ac（a = 0 のとき NaN）
+    - root_count: 実数解の個数（0, 1, 2。恒等的に 0 の関数は -1）
+    - root1 ≤ root2: 実数解 = x 切片（ない場合 NaN。重解・一次関数は root1 = root2）
+    - y_intercept: y 切片 c
+    - extremum: 'min' / 'max' / ''（頂点が最小値か最大値か）
+    - decreasing_from/to, increasing_from/to: 減少・増加する区間（±inf は非有界、NaN は区間なし）
+
+    exact=True のときは Fraction を使った厳密値（文字列）の列を追加で返す。
+    """
+    a, b, c = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (a, b, c)))
+    a, b, c = a.ravel(), b.ravel(), c.ravel()
+    n = len(a)
+
+    quadratic = a != 0
+    linear = ~quadratic & (b != 0)
+    constant = ~quadratic & ~linear
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 頂点と判別式
+        vertex_x = np.where(quadratic, -b / (2 * a), np.nan) + 0.0  # -0.0 を 0.0 にそろえる
+        vertex_y = np.where(quadratic, c - b * b / (4 * a), np.nan)
+        discriminant = np.where(quadratic, b * b - 4 * a * c, np.nan)
+
+        # 実数解：桁落ちを避けるため q = -(b + sign(b)√D)/2 を使う
+        sqrt_d = np.sqrt(np.where(discriminant >= 0, discriminant, np.nan))
+        q = -0.5 * (b + np.copysign(sqrt_d, b))
+        r1 = q / a
+        r2 = np.where(q != 0, c / q, r1)
+        root1 = np.where(quadratic, np.fmin(r1, r2), np.where(linear, -c / b, np.nan))
+        root2 = np.where(quadratic, np.fmax(r1, r2), root1)
+
+    root_count = np.zeros(n, dtype=np.int8)
+    root_count[quadratic & (discriminant > 0)] = 2
+    root_count[quadratic & (discriminant == 0)] = 1
+    root_count[linear] = 1
+    root_count[constant & (c == 0)] = -1
+
+    # 増減の区間
+    opens_up = a > 0
+    opens_down = a < 0
+    decreasing_from = np.full(n, np.nan)
+    decreasing_to = np.full(n, np.nan)
+    increasing_from = np.full(n, np.nan)
+    increasing_to = np.full(n, np.nan)
+
+    decreasing_from[opens_up] = -np.inf
+    decreasing_to[opens_up] = vertex_x[opens_up]
+    increasing_from[opens_up] = vertex_x[opens_up]
+    increasing_to[opens_up] = np.inf
+
+    increasing_from[opens_down] = -np.inf
+    increasing_to[opens_down] = vertex_x[opens_down]
+    decreasing_from[opens_down] = vertex_x[opens_down]
+    decreasing_to[opens_down] = np.inf
+
+    rising = linear & (b > 0)
+    falling = linear & (b < 0)
+    increasing_from[rising], increasing_to[rising] = -np.inf, np.inf
+    decreasing_from[falling], decreasing_to[falling] = -np.inf, np.inf
+
+    result = {
+        'vertex_x': vertex_x,
+        'vertex_y': vertex_y,
+        'discriminant': discriminant,
+        'root_count': root_count,
+        'root1': root1,
+        'root2': root2,
+        'y_intercept': c.copy(),
+        'extremum': np.where(opens_up, 'min', np.where(opens_down, 'max', '')),
+        'decreasing_from': decreasing_from,
+        'decreasing_to': decreasing_to,
+        'increasing_from': increasing_from,
+        'increasing_to': increasing_to,
+    }
+
+    if exact:
+        result.update(_exact_columns(a, b, c))
+
+    return result
+
+
+def _to_fraction(value):
+    """浮動小数点数を見た目どおりの分数に変換（0.1 → 1/10）"""
+    return Fraction(repr(float(value)))
+
+
+def _square_split(n, trial_limit=1000):
+    """正の整数 n を k²·m に分解して (k, m) を返す
+
+    小さい素因数の平方だけを取り除き、残りが平方数ならそれもまとめる。
+    大きな n で時間がかからないよう、試し割りは trial_limit までに限る。
+    """
+    k, m = 1, n
+    factor = 2
+    while factor <= trial_limit and factor * factor <= m:
+        while m % (factor * factor) == 0:
+            m //= factor * factor
+            k *= factor
+        factor += 1
+    root = math.isqrt(m)
+    if root * root == m:
+        k, m = k * root, 1
+    return k, m
+
+
+def _exact_roots(a, b, discriminant):
+    """厳密な解を文字列で返す（無理数解は 'p ± q√m' の形）"""
+    if discriminant < 0:
+        return '', ''
+    center = -b / (2 * a)
+    if discriminant == 0:
+        return str(center), str(center)
+
+    # √(n/d) = √(n·d)/d = k√m/d
+    k, m = _square_split(discriminant.numerator * discriminant.denominator)
+    half_width = Fraction(k, discriminant.denominator) / (2 * abs(a))
+    if m == 1:
+        return str(center - half_width), str(center + half_width)
+
+    coefficient = '' if half_width == 1 else str(half_width)
+    if center == 0:
+        return f'-{coefficient}√{m}', f'{coefficient}√{m}'
+    return f'{center} - {coefficient}√{m}', f'{center} + {coefficient}√{m}'
+
+
+def _exact_columns(a, b, c):
+    """厳密値（分数の文字列）の列を1行ずつ計算"""
+    columns = {name: [] for name in ('exact_vertex_x', 'exact_vertex_y',
+                                      'exact_discriminant', 'exact_root1', 'exact_root2')}
+    for a_i, b_i, c_i in zip(a, b, c):
+        fa, fb, fc = _to_fraction(a_i), _to_fraction(b_i), _to_fraction(c_i)
+        if fa != 0:
+            discriminant = fb * fb - 4 * fa * fc
+            root1, root2 = _exact_roots(fa, fb, discriminant)
+            row = (str(-fb / (2 * fa)), str(fc - fb * fb / (4 * fa)),
+                   str(discriminant), root1, root2)
+        elif fb != 0:
+            root = str(-fc / fb)
+            row = ('', '', '', root, root)
+        else:
+            row = ('', '', '', '', '')
+        for name, value in zip(columns, row):
+            columns[name].append(value)
+    return {name: np.array(values, dtype=object) for name, values in columns.items()}
+
+
+def columns_to_json(result):
+    """解析結果を JSON 化できる列のリストに変換
+
+    NaN は null、±inf は文字列 'inf' / '-inf' にする。
+    """
+    converted = {}
+    for name, column in result.items():
+        if column.dtype.kind == 'f':
+            values = column.astype(object)
+            values[np.isnan(column)] = None
+            values[column == np.inf] = 'inf'
+            values[column == -np.inf] = '-inf'
+            converted[name] = values.tolist()
+        else:
+            converted[name] = column.tolist()
+    return converted
+
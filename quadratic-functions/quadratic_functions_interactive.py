@@ -8,18 +8,27 @@ import numpy as np
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import plotly.express as px
-from plotly.subplots import make_subplots
 import pandas as pd
 from ipywidgets import interact, interactive, fixed, interact_manual
 import ipywidgets as widgets
 from IPython.display import display, HTML, Markdown
 import seaborn as sns
 from datetime import datetime
+import asyncio
 import json
 import os
+import time
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from curated_content import PHYSICS_PROBLEMS, QUIZ_QUESTIONS
+from figure_skeleton import subplot_figure
+from function_core import format_polynomial, sample_family
+from learning_progress import progress_entry
+from motion_simulation import simulate_motion
+from problem_generator import ParametricProblemGenerator, ProblemIndex
+from sampling import minmax_decimate, minmax_indices
+
 # 環境変数読み込み
 load_dotenv()
 
@@ -34,6 +43,40 @@ if GEMINI_API_KEY:
 else:
     model = None
 
+class _Throttle:
+    """連続イベントを間引くスロットル（先頭で即時実行し、末尾で最新値を反映）
+
+    末尾の実行は作成時に動いているカーネルのイベントループ（asyncio）に予約するので、
+    ウィジェットの更新はいつもカーネルのスレッドで行われる。
+    イベントループの外（スクリプトなど）では間引かずに毎回実行する。
+    """
+    
+    def __init__(self, func, interval):
+        self.func = func
+        self.interval = interval
+        self._last_run = 0.0
+        self._pending = None
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+    
+    def __call__(self):
+        if self._loop is None:
+            self.func()
+            return
+        wait = self.interval - (time.monotonic() - self._last_run)
+        if wait <= 0:
+            self._last_run = time.monotonic()
+            self.func()
+        elif self._pending is None:
+            self._pending = self._loop.call_later(wait, self._run_trailing)
+    
+    def _run_trailing(self):
+        self._pending = None
+        self._last_run = time.monotonic()
+        self.func()
+
 class QuadraticFunctionLearning:
     """一次関数・二次関数の包括的学習システム"""
     
@@ -44,6 +87,8 @@ class QuadraticFunctionLearning:
             'user_questions': [],
             'understanding_scores': []
         }
+        # 出題済み問題の索引（同じ学習者に同じ問題を出さない）
+        self.problem_index = ProblemIndex()
         self.setup_learning_environment()
     
     def setup_learning_environment(self):
@@ -93,105 +138,140 @@ class QuadraticFunctionLearning:
         - 📈 利益の最大化問題
         """))
     
-    def create_interactive_plot(self, linear_a=2, linear_b=0, quad_a=1, quad_b=0, quad_c=0, x_range=10):
-        """インタラクティブなグラフ作成"""
+    def _polynomial_plot_series(self, polynomials, x_range):
+        """多項式ごとの値・速度・加速度トレースの (x, y) を計算
         
-        # データ生成
-        x = np.linspace(-x_range/2, x_range/2, 1000)
-        y_linear = linear_a * x + linear_b
-        y_quad = quad_a * x**2 + quad_b * x + quad_c
+        全系列を共通の適応サンプリンググリッド上でホーナー法により一括評価する。
+        戻り値の並びは [全関数の値, 全関数の速度, 全関数の加速度]。
+        """
         
-        # Plotlyサブプロット
-        fig = make_subplots(
+        x, evaluated = sample_family(polynomials, -x_range/2, x_range/2)
+        return [(x, series) for derivative in evaluated for series in derivative]
+    
+    def _interactive_plot_series(self, linear_a, linear_b, quad_a, quad_b, quad_c, x_range):
+        """create_interactive_plot の関数トレース（0〜5番）の (x, y) を計算"""
+        
+        return self._polynomial_plot_series(
+            [[linear_a, linear_b], [quad_a, quad_b, quad_c]], x_range
+        )
+    
+    # create_polynomial_plot の既定の配色（値, 速度, 加速度）
+    _POLYNOMIAL_COLORS = [
+        ('blue', 'lightblue', 'lightgreen'),
+        ('red', 'orange', 'purple'),
+        ('green', 'olive', 'teal'),
+        ('black', 'gray', 'brown'),
+    ]
+    
+    def create_polynomial_plot(self, polynomials, x_range=10, styles=None, data_points=(),
+                               title="📊 多項式関数：包括的分析"):
+        """任意次数の多項式を比較するグラフ作成
+        
+        polynomials は係数リスト（高次から順）のリスト。例: [[2, 0], [1, 0, 0], [1, 0, -3, 0]]
+        styles は多項式ごとの {'name', 'velocity_name', 'acceleration_name', 'colors'}、
+        data_points は (名前, x, y, 色) の組で、右下のデータ点プロットに描く。
+        """
+        
+        series = self._polynomial_plot_series(polynomials, x_range)
+        count = len(series) // 3
+        if styles is None:
+            styles = [
+                {
+                    'name': format_polynomial(p),
+                    'velocity_name': f'{format_polynomial(p)} の速度',
+                    'acceleration_name': f'{format_polynomial(p)} の加速度',
+                    'colors': self._POLYNOMIAL_COLORS[i % len(self._POLYNOMIAL_COLORS)],
+                }
+                for i, p in enumerate(polynomials)
+            ]
+        
+        # Plotlyサブプロット（レイアウトと軸ラベルはキャッシュした骨組みから）
+        fig = subplot_figure(
             rows=2, cols=2,
             subplot_titles=('関数比較', '速度比較', '加速度比較', 'データ点プロット'),
             specs=[[{"secondary_y": True}, {"secondary_y": True}],
-                   [{"secondary_y": True}, {"secondary_y": True}]]
+                   [{"secondary_y": True}, {"secondary_y": True}]],
+            axis_titles=[("時間 (秒)", "距離 (m)"), ("時間 (秒)", "速度 (m/s)"),
+                         ("時間 (秒)", "加速度 (m/s²)"), ("時間 (秒)", "距離 (m)")],
+            height=800,
+            title_text=title,
+            showlegend=True
         )
         
         # メインプロット：関数比較
-        fig.add_trace(
-            go.Scatter(x=x, y=y_linear, name=f'一次関数: y = {linear_a}x + {linear_b}',
-                      line=dict(color='blue', width=3)),
-            row=1, col=1
-        )
-        
-        fig.add_trace(
-            go.Scatter(x=x, y=y_quad, name=f'二次関数: y = {quad_a}x² + {quad_b}x + {quad_c}',
-                      line=dict(color='red', width=3)),
-            row=1, col=1
-        )
+        for i, style in enumerate(styles):
+            x, y = series[i]
+            fig.add_trace(
+                go.Scatter(x=x, y=y, name=style['name'],
+                          line=dict(color=style['colors'][0], width=3)),
+                row=1, col=1
+            )
         
         # 速度比較（一階微分）
-        v_linear = np.full_like(x, linear_a)  # 一次関数の微分は定数
-        v_quad = 2 * quad_a * x + quad_b      # 二次関数の微分
-        
-        fig.add_trace(
-            go.Scatter(x=x, y=v_linear, name='一次関数の速度（一定）',
-                      line=dict(color='lightblue', dash='dash')),
-            row=1, col=2
-        )
-        
-        fig.add_trace(
-            go.Scatter(x=x, y=v_quad, name='二次関数の速度（変化）',
-                      line=dict(color='orange', dash='dash')),
-            row=1, col=2
-        )
+        for i, style in enumerate(styles):
+            x, y = series[count + i]
+            fig.add_trace(
+                go.Scatter(x=x, y=y, name=style['velocity_name'],
+                          line=dict(color=style['colors'][1], dash='dash')),
+                row=1, col=2
+            )
         
         # 加速度比較（二階微分）
-        a_linear = np.zeros_like(x)           # 一次関数の二階微分は0
-        a_quad = np.full_like(x, 2 * quad_a)  # 二次関数の二階微分は定数
+        for i, style in enumerate(styles):
+            x, y = series[2 * count + i]
+            fig.add_trace(
+                go.Scatter(x=x, y=y, name=style['acceleration_name'],
+                          line=dict(color=style['colors'][2])),
+                row=2, col=1
+            )
+        
+        # データ点
+        for name, data_x, data_y, color in data_points:
+            fig.add_trace(
+                go.Scatter(x=data_x, y=data_y, mode='markers',
+                          name=name, marker=dict(size=10, color=color)),
+                row=2, col=2
+            )
         
-        fig.add_trace(
-            go.Scatter(x=x, y=a_linear, name='一次関数の加速度（0）',
-                      line=dict(color='lightgreen')),
-            row=2, col=1
-        )
+        return fig
+    
+    def create_interactive_plot(self, linear_a=2, linear_b=0, quad_a=1, quad_b=0, quad_c=0, x_range=10):
+        """インタラクティブなグラフ作成（一次・二次関数を多項式グラフの特別な場合として描く）"""
         
-        fig.add_trace(
-            go.Scatter(x=x, y=a_quad, name='二次関数の加速度（一定）',
-                      line=dict(color='purple')),
-            row=2, col=1
-        )
+        styles = [
+            {
+                'name': f'一次関数: y = {linear_a}x + {linear_b}',
+                'velocity_name': '一次関数の速度（一定）',
+                'acceleration_name': '一次関数の加速度（0）',
+                'colors': ('blue', 'lightblue', 'lightgreen'),
+            },
+            {
+                'name': f'二次関数: y = {quad_a}x² + {quad_b}x + {quad_c}',
+                'velocity_name': '二次関数の速度（変化）',
+                'acceleration_name': '二次関数の加速度（一定）',
+                'colors': ('red', 'orange', 'purple'),
+            },
+        ]
         
         # データ点（教材の表データ）
         data_x = np.array([0, 1, 2, 3, 4, 5, 6])
-        data_y_linear = np.array([0, 2, 4, 6, 8, 10, 12])
-        data_y_quad = np.array([0, 2, 8, 18, 32, 50, 72])
-        
-        fig.add_trace(
-            go.Scatter(x=data_x, y=data_y_linear, mode='markers',
-                      name='一次関数データ点', marker=dict(size=10, color='blue')),
-            row=2, col=2
-        )
-        
-        fig.add_trace(
-            go.Scatter(x=data_x, y=data_y_quad, mode='markers',
-                      name='二次関数データ点', marker=dict(size=10, color='red')),
-            row=2, col=2
-        )
+        data_points = [
+            ('一次関数データ点', data_x, np.array([0, 2, 4, 6, 8, 10, 12]), 'blue'),
+            ('二次関数データ点', data_x, np.array([0, 2, 8, 18, 32, 50, 72]), 'red'),
+        ]
         
-        # レイアウト設定
-        fig.update_layout(
-            height=800,
-            title_text="📊 一次関数 vs 二次関数：包括的分析",
-            showlegend=True
+        return self.create_polynomial_plot(
+            [[linear_a, linear_b], [quad_a, quad_b, quad_c]], x_range,
+            styles=styles, data_points=data_points,
+            title="📊 一次関数 vs 二次関数：包括的分析"
         )
-        
-        # 軸ラベル
-        fig.update_xaxes(title_text="時間 (秒)", row=1, col=1)
-        fig.update_yaxes(title_text="距離 (m)", row=1, col=1)
-        fig.update_xaxes(title_text="時間 (秒)", row=1, col=2)
-        fig.update_yaxes(title_text="速度 (m/s)", row=1, col=2)
-        fig.update_xaxes(title_text="時間 (秒)", row=2, col=1)
-        fig.update_yaxes(title_text="加速度 (m/s²)", row=2, col=1)
-        fig.update_xaxes(title_text="時間 (秒)", row=2, col=2)
-        fig.update_yaxes(title_text="距離 (m)", row=2, col=2)
-        
-        return fig
     
-    def interactive_widget(self):
-        """インタラクティブウィジェット"""
+    def interactive_widget(self, live=True, throttle_ms=80):
+        """インタラクティブウィジェット
+        
+        live=True では FigureWidget を使い回し、変化したトレースの配列だけを
+        まとめて差し替える。False の場合は従来どおり毎回グラフを作り直す。
+        """
         
         # パラメータスライダー
         linear_a_slider = widgets.FloatSlider(
@@ -224,6 +304,19 @@ class QuadraticFunctionLearning:
             description='x範囲:', style={'description_width': 'initial'}
         )
         
+        if live:
+            return self._live_widget(
+                {
+                    'linear_a': linear_a_slider,
+                    'linear_b': linear_b_slider,
+                    'quad_a': quad_a_slider,
+                    'quad_b': quad_b_slider,
+                    'quad_c': quad_c_slider,
+                    'x_range': x_range_slider,
+                },
+                throttle_ms
+            )
+        
         # インタラクティブ表示
         interactive_plot = interactive(
             self.create_interactive_plot,
@@ -237,10 +330,70 @@ class QuadraticFunctionLearning:
         
         return interactive_plot
     
-    def motion_analysis(self, initial_velocity=0, acceleration=2, time_max=6):
-        """運動解析シミュレーション"""
+    # トレース番号ごとに、値が依存するパラメータ（x_range は全トレース共通）
+    _LIVE_TRACE_DEPENDENCIES = {
+        0: ('linear_a', 'linear_b'),
+        1: ('quad_a', 'quad_b', 'quad_c'),
+        2: ('linear_a',),
+        3: ('quad_a', 'quad_b'),
+        4: (),
+        5: ('quad_a',),
+    }
+    
+    def _live_widget(self, sliders, throttle_ms):
+        """FigureWidget ベースの差分更新ウィジェット"""
+        
+        params = {name: slider.value for name, slider in sliders.items()}
+        fig = go.FigureWidget(self.create_interactive_plot(**params))
+        shown = dict(params)
+        
+        def apply_update():
+            current = {name: slider.value for name, slider in sliders.items()}
+            changed = {name for name in current if current[name] != shown[name]}
+            if not changed:
+                return
+            
+            series = self._interactive_plot_series(**current)
+            x_changed = 'x_range' in changed
+            
+            # 変更の影響を受けるトレースだけを1回のメッセージで更新
+            # （適応サンプリングで点数が変わるため x と y は組で差し替える）
+            with fig.batch_update():
+                for index, dependencies in self._LIVE_TRACE_DEPENDENCIES.items():
+                    if x_changed or changed.intersection(dependencies):
+                        fig.data[index].x, fig.data[index].y = series[index]
+                
+                if changed & {'linear_a', 'linear_b'}:
+                    fig.data[0].name = f"一次関数: y = {current['linear_a']}x + {current['linear_b']}"
+                if changed & {'quad_a', 'quad_b', 'quad_c'}:
+                    fig.data[1].name = (f"二次関数: y = {current['quad_a']}x² + "
+                                        f"{current['quad_b']}x + {current['quad_c']}")
+            
+            shown.update(current)
         
-        t = np.linspace(0, time_max, 100)
+        throttle = _Throttle(apply_update, throttle_ms / 1000)
+        for slider in sliders.values():
+            slider.observe(lambda change: throttle(), names='value')
+        
+        controls = widgets.VBox(list(sliders.values()))
+        return widgets.VBox([controls, fig])
+    
+    def motion_analysis(self, initial_velocity=0, acceleration=2, time_max=6,
+                        resolution=100, max_display_points=2000, webgl_threshold=1000,
+                        drag=0.0, quadratic_drag=0.0, friction=0.0):
+        """運動解析シミュレーション
+        
+        resolution はサンプル数。全解像度の配列は self.motion_data に保存し、
+        グラフには min/max 保存型で max_display_points 点まで間引いて表示する。
+        表示点数が webgl_threshold を超えるトレースは WebGL (Scattergl) で描画する。
+        drag（速度に比例する抵抗）・quadratic_drag（速度の2乗に比例する抵抗）・
+        friction（動摩擦係数）のどれかを指定すると、同じ初速度・加速度で抵抗のある運動を
+        数値積分（motion_simulation）して重ねて表示する。
+        """
+        if resolution < 2:
+            raise ValueError('resolution は2以上にしてください')
+        
+        t = np.linspace(0, time_max, resolution)
         
         # 等速運動（一次関数）
         v_constant = 2  # 一定速度
@@ -251,74 +404,107 @@ class QuadraticFunctionLearning:
         v_quad = initial_velocity + acceleration * t
         a_quad = np.full_like(t, acceleration)
         
+        # 解析用に全解像度データを保持
+        self.motion_data = {
+            't': t,
+            'x_linear': x_linear,
+            'v_linear': np.full_like(t, v_constant),
+            'a_linear': np.zeros_like(t),
+            'x_quad': x_quad,
+            'v_quad': v_quad,
+            'a_quad': a_quad,
+        }
+        resisted = bool(drag or quadratic_drag or friction)
+        if resisted:
+            simulation = simulate_motion(v0=initial_velocity, acceleration=acceleration, drag=drag,
+                                         quadratic_drag=quadratic_drag, friction=friction,
+                                         time_max=time_max, steps=resolution - 1)
+            self.motion_data.update({
+                'x_resisted': simulation['x'][0],
+                'v_resisted': simulation['v'][0],
+                'a_resisted': simulation['a'][0],
+            })
+        data = self.motion_data
+        
+        def line_trace(y, **kwargs):
+            t_shown, y_shown = minmax_decimate(t, y, max_display_points)
+            trace_type = go.Scattergl if len(t_shown) > webgl_threshold else go.Scatter
+            return trace_type(x=t_shown, y=y_shown, **kwargs)
+        
+        def trajectory_trace(y, z, **kwargs):
+            # 3D軌跡は位置の形を優先して間引く
+            indices = minmax_indices(y, max_display_points)
+            return go.Scatter3d(x=t[indices], y=y[indices], z=z[indices], **kwargs)
+        
         # 3Dプロット
-        fig = make_subplots(
+        fig = subplot_figure(
             rows=2, cols=2,
             subplot_titles=('位置-時間グラフ', '速度-時間グラフ', 
                           '加速度-時間グラフ', '3D軌跡'),
-            specs=[[{}, {}], [{}, {"type": "scene"}]]
+            specs=[[{}, {}], [{}, {"type": "scene"}]],
+            height=800, title_text="🚀 運動解析シミュレーション"
         )
         
         # 位置
-        fig.add_trace(go.Scatter(x=t, y=x_linear, name='等速運動', 
+        fig.add_trace(line_trace(x_linear, name='等速運動', 
                                 line=dict(color='blue')), row=1, col=1)
-        fig.add_trace(go.Scatter(x=t, y=x_quad, name='等加速度運動', 
+        fig.add_trace(line_trace(x_quad, name='等加速度運動', 
                                 line=dict(color='red')), row=1, col=1)
         
         # 速度
-        fig.add_trace(go.Scatter(x=t, y=np.full_like(t, v_constant), 
+        fig.add_trace(line_trace(data['v_linear'], 
                                 name='等速運動の速度', line=dict(color='blue')), 
                      row=1, col=2)
-        fig.add_trace(go.Scatter(x=t, y=v_quad, name='等加速度運動の速度', 
+        fig.add_trace(line_trace(v_quad, name='等加速度運動の速度', 
                                 line=dict(color='red')), row=1, col=2)
         
         # 加速度
-        fig.add_trace(go.Scatter(x=t, y=np.zeros_like(t), 
+        fig.add_trace(line_trace(data['a_linear'], 
                                 name='等速運動の加速度', line=dict(color='blue')), 
                      row=2, col=1)
-        fig.add_trace(go.Scatter(x=t, y=a_quad, name='等加速度運動の加速度', 
+        fig.add_trace(line_trace(a_quad, name='等加速度運動の加速度', 
                                 line=dict(color='red')), row=2, col=1)
         
+        # 抵抗のある運動（数値積分）
+        if resisted:
+            for (row, col), key, name in (((1, 1), 'x_resisted', '抵抗あり'),
+                                          ((1, 2), 'v_resisted', '抵抗ありの速度'),
+                                          ((2, 1), 'a_resisted', '抵抗ありの加速度')):
+                fig.add_trace(line_trace(data[key], name=name,
+                                         line=dict(color='green', dash='dash')), row=row, col=col)
+        
         # 3D軌跡
-        fig.add_trace(go.Scatter3d(x=t, y=x_linear, z=np.full_like(t, v_constant),
+        fig.add_trace(trajectory_trace(x_linear, data['v_linear'],
                                   mode='lines', name='等速運動3D',
                                   line=dict(color='blue', width=6)), 
                      row=2, col=2)
-        fig.add_trace(go.Scatter3d(x=t, y=x_quad, z=v_quad,
+        fig.add_trace(trajectory_trace(x_quad, v_quad,
                                   mode='lines', name='等加速度運動3D',
                                   line=dict(color='red', width=6)), 
                      row=2, col=2)
-        
-        fig.update_layout(height=800, title_text="🚀 運動解析シミュレーション")
+        if resisted:
+            fig.add_trace(trajectory_trace(data['x_resisted'], data['v_resisted'],
+                                           mode='lines', name='抵抗あり3D',
+                                           line=dict(color='green', width=6)),
+                          row=2, col=2)
         
         return fig
     
-    def physics_problem_generator(self):
-        """物理問題生成器"""
+    def _fixed_physics_problems(self):
+        """教材の固定問題"""
         
-        problems = [
-            {
-                "title": "🚗 自動車の等速運動",
-                "description": "自動車が時速60kmで走行している。3時間後の移動距離は？",
-                "function": "y = 60x",
-                "answer": "180km",
-                "explanation": "一次関数 y = 60x で、x=3を代入すると y = 180"
-            },
-            {
-                "title": "🏀 ボールの放物運動",
-                "description": "初速度20m/sで上向きに投げたボールの高さ（重力加速度g=10m/s²）",
-                "function": "y = 20t - 5t²",
-                "answer": "最高到達点：20m（t=2秒）",
-                "explanation": "二次関数の頂点公式を使用。頂点のt座標は -b/2a = -20/(-10) = 2"
-            },
-            {
-                "title": "💰 利益最大化問題",
-                "description": "商品価格をx円とすると、利益がy = -2x² + 400x - 10000円。最大利益は？",
-                "function": "y = -2x² + 400x - 10000",
-                "answer": "最大利益：10000円（価格100円）",
-                "explanation": "頂点のx座標：-400/(-4) = 100、y座標：-2(100)² + 400(100) - 10000 = 10000"
-            }
-        ]
+        return [dict(problem) for problem in PHYSICS_PROBLEMS]
+    
+    def physics_problem_generator(self, count=0, kinds=('linear', 'motion', 'profit')):
+        """物理問題生成器
+        
+        count > 0 のときは固定の3問の代わりに、パラメータ型の問題を count 問生成する。
+        """
+        
+        if count:
+            problems = ParametricProblemGenerator(index=self.problem_index).generate(count, kinds)
+        else:
+            problems = self._fixed_physics_problems()
         
         for i, problem in enumerate(problems, 1):
             display(Markdown(f"""
@@ -337,6 +523,8 @@ class QuadraticFunctionLearning:
             
             </details>
             """))
+        
+        return problems
     
     def comparative_analysis(self):
         """比較分析"""
@@ -399,47 +587,65 @@ class QuadraticFunctionLearning:
         
         return data
     
-    def save_learning_progress(self, topic, score, notes=""):
+    def save_learning_progress(self, topic, score, notes="", student_id=None):
         """学習進捗の保存"""
         
-        progress_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'topic': topic,
-            'score': score,
-            'notes': notes
-        }
+        self.learning_data['understanding_scores'].append(
+            self._progress_entry(topic, score, notes, student_id)
+        )
+        self._write_learning_data()
+        
+        print(f"✅ 学習進捗を保存しました: {topic} (スコア: {score}/10)")
+    
+    def save_learning_progress_batch(self, records):
+        """複数の学習進捗をまとめて保存（ファイルへの書き込みは1回）
+        
+        records は {'topic', 'score', 'notes', 'student_id'} の dict のリスト。
+        """
         
-        self.learning_data['understanding_scores'].append(progress_entry)
+        self.learning_data['understanding_scores'].extend(
+            self._progress_entry(r['topic'], r['score'], r.get('notes', ''), r.get('student_id'))
+            for r in records
+        )
+        self._write_learning_data()
+        
+        print(f"✅ 学習進捗を保存しました: {len(records)}件")
+    
+    def _progress_entry(self, topic, score, notes, student_id):
+        """学習進捗の1件分を作成（サーバーの保存と同じ形式）"""
+        
+        return progress_entry(topic, score, notes, student_id)
+    
+    def _write_learning_data(self):
+        """学習データをJSONファイルに保存"""
         
-        # JSONファイルに保存
         with open('learning_progress.json', 'w', encoding='utf-8') as f:
             json.dump(self.learning_data, f, ensure_ascii=False, indent=2)
-        
-        print(f"✅ 学習進捗を保存しました: {topic} (スコア: {score}/10)")
     
-    def generate_quiz(self):
-        """クイズ生成"""
+    def _fixed_quiz_questions(self):
+        """教材の固定クイズ"""
         
-        questions = [
-            {
-                "question": "一次関数 y = 3x において、x = 4 のときの y の値は？",
-                "options": ["10", "12", "15", "16"],
-                "correct": 1,
-                "explanation": "y = 3 × 4 = 12"
-            },
-            {
-                "question": "二次関数 y = x² - 4x + 3 の頂点のx座標は？",
-                "options": ["1", "2", "3", "4"],
-                "correct": 1,
-                "explanation": "頂点のx座標は -b/2a = -(-4)/(2×1) = 2"
-            },
-            {
-                "question": "等速運動を表すグラフはどれか？",
-                "options": ["直線", "放物線", "指数曲線", "正弦波"],
-                "correct": 0,
-                "explanation": "等速運動は一定の速度なので、位置-時間グラフは直線になる"
-            }
-        ]
+        return [dict(question) for question in QUIZ_QUESTIONS]
+    
+    def generate_quiz(self, count=0, kinds=None):
+        """クイズ生成
+        
+        count > 0 のときは固定の3問の代わりに、パラメータ型の4択問題を count 問生成する。
+        """
+        
+        if count:
+            generated = ParametricProblemGenerator(index=self.problem_index).generate(count, kinds)
+            questions = [
+                {
+                    "question": p['description'],
+                    "options": p['options'],
+                    "correct": p['correct'],
+                    "explanation": p['explanation']
+                }
+                for p in generated
+            ]
+        else:
+            questions = self._fixed_quiz_questions()
         
         for i, q in enumerate(questions, 1):
             print(f"\n問題 {i}: {q['question']}")
@@ -449,6 +655,8 @@ class QuadraticFunctionLearning:
             # 回答入力（実際の実装では対話的にする）
             print(f"\n💡 正解: {q['options'][q['correct']]}")
             print(f"📝 解説: {q['explanation']}")
+        
+        return questions
     
     def gemini_integration_demo(self):
         """Gemini統合デモ"""
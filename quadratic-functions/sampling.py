@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+表示用データ間引きユーティリティ
+高解像度の配列を、グラフの形を保ったまま描画可能な点数に減らす
+"""
+
+import numpy as np
+
+
+def minmax_indices(y, max_points):
+    """min/max 保存型の間引きで残すインデックスを返す
+
+    配列をバケットに分け、各バケットの最小値・最大値の位置を残す。
+    ピークや急な変化が表示から消えないのが単純な間引きとの違い。
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    if y.min() == y.max():
+        # 一定値の系列は両端だけで形が決まる
+        return np.array([0, n - 1])
+
+    # 各バケットから2点（最小・最大）を取る
+    n_buckets = max(1, (max_points - 2) // 2)
+    bucket_size = -(-n // n_buckets)
+    padded = np.pad(y, (0, n_buckets * bucket_size - n), mode='edge')
+    buckets = padded.reshape(n_buckets, bucket_size)
+
+    offsets = np.arange(n_buckets) * bucket_size
+    indices = np.concatenate([
+        [0, n - 1],
+        offsets + np.argmin(buckets, axis=1),
+        offsets + np.argmax(buckets, axis=1),
+    ])
+    return np.unique(np.minimum(indices, n - 1))
+
+
+def minmax_decimate(x, y, max_points):
+    """min/max 保存型の間引きを (x, y) に適用"""
+    indices = minmax_indices(y, max_points)
+    return np.asarray(x)[indices], np.asarray(y)[indices]
+
+
+# 区間内で直線補間との誤差を調べる位置（区間の 1/4, 1/2, 3/4）
+_PROBES = np.array([0.25, 0.5, 0.75])
+
+
+def adaptive_sample(func, x_min, x_max, tol_px=0.5, height_px=500,
+                    min_points=2, max_points=1000):
+    """誤差保証つき適応サンプリング
+
+    func(x) は (n,) または (k, n) の配列を返すベクトル化関数。
+    各区間を直線で結んだときの誤差が、縦 height_px ピクセルに描いた場合に
+    tol_px ピクセル以内になるまで区間を二分し続ける。
+    直線なら両端の2点、緩やかな曲線なら数十点で済む。
+
+    戻り値は (x, y)。y の形は func の戻り値に合わせる。
+    """
+    x = np.linspace(x_min, x_max, max(2, min_points))
+    y = np.array(func(x), dtype=float)  # func が内部バッファを返しても安全なようにコピー
+    single = y.ndim == 1
+    y = np.atleast_2d(y)
+
+    while len(x) < max_points:
+        left, width = x[:-1], np.diff(x)
+        probe_x = left[None, :] + _PROBES[:, None] * width[None, :]
+        probe_y = np.atleast_2d(np.asarray(func(probe_x.ravel()), dtype=float))
+        probe_y = probe_y.reshape(len(y), len(_PROBES), len(left))
+        chord_y = (y[:, None, :-1] * (1 - _PROBES[None, :, None])
+                   + y[:, None, 1:] * _PROBES[None, :, None])
+
+        # 系列ごとの値域をピクセルに換算（値域0の系列は絶対値で評価）
+        span = np.ptp(np.concatenate([y, probe_y.reshape(len(y), -1)], axis=1), axis=1)
+        scale = height_px / np.maximum(span, 1e-12)
+        error_px = (np.abs(probe_y - chord_y) * scale[:, None, None]).max(axis=(0, 1))
+
+        bad = np.flatnonzero(error_px > tol_px)
+        if len(bad) == 0:
+            break
+        # 点数の上限を超える場合は誤差の大きい区間から分割する
+        budget = max_points - len(x)
+        if len(bad) > budget:
+            bad = np.sort(bad[np.argsort(error_px[bad])[::-1][:budget]])
+
+        # 中点（プローブ 1/2）を挿入
+        x = np.insert(x, bad + 1, probe_x[1, bad])
+        y = np.insert(y, bad + 1, probe_y[:, 1, bad], axis=1)
+
+    return x, (y[0] if single else y)
+
+
+def lttb_indices(x, y, threshold):
+    """LTTB (Largest-Triangle-Three-Buckets) 法で残すインデックスを返す
+
+    両端を残し、間をバケットに分けて、前に選んだ点と次のバケットの平均点で
+    作る三角形の面積が最大になる点を各バケットから1つずつ選ぶ。
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    # 次のバケットの平均点はまとめて計算しておく
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        cx, cy = mean_x[bucket + 1], mean_y[bucket + 1]
+        area = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        previous = start + int(np.argmax(area))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def downsample(x, y, max_points, method='lttb'):
+    """形を保ったまま max_points 点以下に間引く（method: 'lttb' または 'minmax'）"""
+    if method == 'minmax':
+        indices = minmax_indices(y, max_points)
+    elif method == 'lttb':
+        indices = lttb_indices(x, y, max_points)
+    else:
+        raise ValueError(f'未対応の間引き方法です: {method}')
+    return np.asarray(x)[indices], np.asarray(y)[indices]
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+教材サーバーの起動スクリプト（PLOT_PROCESSES でグラフ作成のワーカープロセスを使うとき）
+spawn のワーカーは起動スクリプトを __mp_main__ として読み込み直す。このファイルは読み込んでも
+何もしないので、app の処理（AI の設定・レーン・キャッシュのディレクトリなど）はワーカーでは走らない
+
+    PLOT_PROCESSES=4 python serve.py
+"""
+
+if __name__ == '__main__':
+    import app
+    app.main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 教材のモジュールは quadratic-functions 直下に平置きなので、そこから読み込めるようにする
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,39 @@
+"""厳選コンテンツの検索索引が、答えるべき質問にだけ答えるか"""
+
+import pytest
+
+from answer_index import default_index
+from curated_content import GEMINI_PROMPTS, PHYSICS_PROBLEMS, QUIZ_QUESTIONS
+
+# 教材に載せている質問の例（ノートブックのサンプル質問・ページの入力例・負荷試験の質問）。
+# どれも厳選コンテンツでは答えられないので、AI に回す
+SHIPPED_SAMPLE_QUESTIONS = [
+    'なぜ二次関数のグラフは曲線になるのですか？',
+    '一次関数と二次関数の実生活での使い分けは？',
+    '加速度と二次関数の関係を詳しく教えて',
+    'この問題の解き方が分からないので段階的に教えて',
+    'なぜ二次関数は曲線になるのですか？',
+    '放物線とは？',
+]
+
+
+@pytest.mark.parametrize('question', SHIPPED_SAMPLE_QUESTIONS)
+def test_sample_questions_go_to_the_model(question):
+    assert default_index().answer(question) is None
+
+
+@pytest.mark.parametrize('question, expected', [
+    ('一次関数と二次関数の実世界での応用例を教えてください', 'guide-real_world_applications'),
+    ('一次関数と二次関数を効果的に学習するコツは？', 'guide-learning_tips'),
+    ('一次関数と二次関数の根本的な違いは？', 'guide-explain_difference'),
+    *[(quiz['question'], f'quiz-{i}') for i, quiz in enumerate(QUIZ_QUESTIONS)],
+    *[(problem['description'], f'problem-{i}') for i, problem in enumerate(PHYSICS_PROBLEMS)],
+])
+def test_curated_questions_hit_their_entry(question, expected):
+    match = default_index().answer(question)
+    assert match is not None and match['id'] == expected
+
+
+def test_guides_cover_every_prompt():
+    ids = {document['id'] for document in default_index().documents}
+    assert {f'guide-{key}' for key in GEMINI_PROMPTS} <= ids
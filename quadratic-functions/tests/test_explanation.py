@@ -0,0 +1,24 @@
+"""AI の解説が使えないときのテンプレートへの切り替え"""
+
+import contextlib
+import io
+
+import pytest
+
+from explanation_templates import compose_explanation
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+
+
+class FailingModel:
+    def generate_content(self, prompt):
+        raise RuntimeError('quota exceeded')
+
+
+@pytest.mark.parametrize('model', [None, FailingModel()])
+def test_ai_explanation_falls_back_to_template(monkeypatch, model):
+    monkeypatch.setattr(app, 'model', model)
+    response = app.app.test_client().post('/update_plot', json={
+        'linear_a': 3, 'quadratic_a': 1.5, 'plot': False, 'ai_explanation': True})
+    assert response.get_json()['explanation'] == compose_explanation(3, 1.5)
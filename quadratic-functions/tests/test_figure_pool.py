@@ -0,0 +1,18 @@
+"""グラフ作成のワーカープロセス（app を読み込まずに図を作れるか）"""
+
+import json
+
+from figure_pool import WarmProcessPool, render_plot_literal, update_plot_body
+
+
+def test_workers_render_without_app():
+    pool = WarmProcessPool(1)
+    executor = pool.start()
+    try:
+        loaded = pool.submit(eval, "[m for m in ('app', 'flask') if m in __import__('sys').modules]").result()
+        literal = pool.submit(render_plot_literal, 2, 3).result()
+    finally:
+        executor.shutdown()
+    assert loaded == []
+    body = json.loads(update_plot_body(literal, '解説'))
+    assert body['explanation'] == '解説' and json.loads(body['plot_json'])['data']
@@ -0,0 +1,36 @@
+"""一括採点の入力検証と、学習進捗の追記"""
+
+import pytest
+
+from grading import grade_submissions
+from learning_progress import ProgressStore
+
+PROBLEMS = [
+    {'id': 'p1', 'answer_value': 12.0, 'options': ['10', '12', '15', '16'], 'correct': 1},
+    {'id': 'p2', 'answer_value': 2.0, 'options': ['1', '2', '3', '4'], 'correct': 1},
+]
+
+
+def test_numeric_and_choice_answers():
+    result = grade_submissions(PROBLEMS, [{'student_id': 's1', 'answers': [12.001, {'choice': 1}]},
+                                          {'student_id': 's2', 'answers': [None, {'choice': 3}]}])
+    assert [student['correct'] for student in result['students']] == [2, 0]
+
+
+@pytest.mark.parametrize('choice', [-1, 4, 40000])
+def test_out_of_range_choice_is_rejected(choice):
+    with pytest.raises(ValueError):
+        grade_submissions(PROBLEMS, [{'student_id': 's1', 'answers': [{'choice': choice}]}])
+
+
+def test_malformed_submission_is_rejected():
+    with pytest.raises(TypeError):
+        grade_submissions(PROBLEMS, ['s1'])
+
+
+def test_progress_is_appended(tmp_path):
+    store = ProgressStore(str(tmp_path / 'progress.jsonl'))
+    store.save_batch([{'topic': '関数基礎', 'score': 8, 'student_id': 's1'}])
+    store.save_batch([{'topic': '関数基礎', 'score': 6, 'student_id': 's2'}])
+    scores = store.load()['understanding_scores']
+    assert [(entry['student_id'], entry['score']) for entry in scores] == [('s1', 8), ('s2', 6)]
@@ -0,0 +1,50 @@
+"""実験データの取り込み（有限でない値の行と、途中で失敗したときの後始末）"""
+
+import io
+import json
+import math
+
+import pytest
+
+from measurements import MeasurementStore
+
+ROWS = ''.join(f'{t / 10},{4.9 * (t / 10) ** 2}\n' for t in range(200))
+
+
+class BrokenStream(io.BytesIO):
+    """limit バイト読んだところで接続が切れたように失敗する"""
+
+    def __init__(self, data, limit):
+        super().__init__(data)
+        self.limit = limit
+
+    def read1(self, size=-1):
+        if self.tell() >= self.limit:
+            raise OSError('connection reset')
+        return super().read1(min(size if size > 0 else self.limit, 64))
+
+    read = read1
+
+
+def test_non_finite_rows_are_dropped(tmp_path):
+    store = MeasurementStore(str(tmp_path))
+    csv = 't,distance\n' + ROWS + '20,nan\ninf,3\n21,1e300\n'
+    meta = store.ingest_csv(io.BytesIO(csv.encode()), chunk_rows=50)
+    assert meta['count'] == 200
+    json.dumps(meta, allow_nan=False)
+    assert all(math.isfinite(c) for fit in meta['fits'] for c in fit['coefficients'])
+
+
+def test_failed_ingest_leaves_no_files(tmp_path):
+    store = MeasurementStore(str(tmp_path))
+    data = ('t,distance\n' + ROWS).encode()
+    with pytest.raises(OSError):
+        store.ingest_csv(BrokenStream(data, len(data) // 2), chunk_rows=20)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_no_numeric_rows_leaves_no_files(tmp_path):
+    store = MeasurementStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.ingest_csv(io.BytesIO(b't,distance\nnan,nan\n'))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,36 @@
+"""図の作成関数とルートのメモリ割り当ての予算（回数を減らした memory_budget.py）"""
+
+import tracemalloc
+
+import pytest
+
+from memory_budget import BUDGETS, LEAK_BUDGET_PER_CALL, check_budgets, check_leak, load_builders
+from memory_profile import MemoryProfiler
+
+REPEAT = 3
+LEAK_CALLS = 40
+LEAK_CYCLE = 5
+
+
+@pytest.fixture(scope='module')
+def loaded():
+    app, builders = load_builders()
+    profiler = MemoryProfiler()
+    profiler.start()
+    yield app, builders, profiler
+    tracemalloc.stop()
+
+
+@pytest.fixture(scope='module')
+def report(loaded):
+    return check_budgets(loaded[2], loaded[0], loaded[1], REPEAT)
+
+
+@pytest.mark.parametrize('name', sorted(BUDGETS))
+def test_peak_within_budget(report, name):
+    assert report[name]['peak_max'] <= BUDGETS[name]
+
+
+def test_update_plot_does_not_leak(loaded):
+    per_call, top = check_leak(loaded[0], LEAK_CALLS, cycle=LEAK_CYCLE)
+    assert per_call <= LEAK_BUDGET_PER_CALL, '\n'.join(str(stat) for stat in top)
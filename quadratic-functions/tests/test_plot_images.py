@@ -0,0 +1,22 @@
+"""静止画の比較グラフ（インタラクティブなグラフと同じ曲線になるか）"""
+
+import numpy as np
+import pytest
+
+from comparison_plot import generate_comparison_data
+from plot_images import ComparisonFigure, FigurePool, render_comparison_image
+
+
+@pytest.mark.parametrize('linear_a, quadratic_a', [(2, 2), (0.5, 4.5), (-3, 0.1)])
+def test_curves_use_the_interactive_grid(linear_a, quadratic_a):
+    comparison = ComparisonFigure()
+    comparison.update(linear_a, quadratic_a)
+    x, y_linear, y_quad = generate_comparison_data(linear_a, quadratic_a)
+    np.testing.assert_array_equal(comparison.linear_line.get_xdata(), x)
+    np.testing.assert_array_equal(comparison.linear_line.get_ydata(), y_linear)
+    np.testing.assert_array_equal(comparison.quadratic_line.get_xdata(), x)
+    np.testing.assert_array_equal(comparison.quadratic_line.get_ydata(), y_quad)
+
+
+def test_render_png():
+    assert render_comparison_image(FigurePool(size=1), 2, 2, 'png').startswith(b'\x89PNG')
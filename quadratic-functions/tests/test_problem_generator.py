@@ -0,0 +1,37 @@
+"""パラメータ型の問題生成器：問題の通り数と、使い切ったときの振る舞い"""
+
+import pytest
+
+import problem_generator
+from problem_generator import PROBLEM_KINDS, ParametricProblemGenerator, ProblemIndex, problem_space
+
+
+def test_each_kind_has_over_a_hundred_thousand_problems():
+    assert all(problem_space(kind) > 100_000 for kind in PROBLEM_KINDS)
+
+
+def test_hundred_thousand_unique_problems():
+    problems = ParametricProblemGenerator(seed=0).generate(100_000)
+    assert len({problem['id'] for problem in problems}) == 100_000
+
+
+def test_profit_is_always_positive():
+    problems = ParametricProblemGenerator(seed=1).generate(2_000, ['profit'])
+    assert all('最大利益：-' not in problem['answer'] for problem in problems)
+
+
+def test_exhausted_kind_repeats_instead_of_failing(monkeypatch):
+    # 2 × 2 × 2 = 8 通りしかない運動の問題
+    monkeypatch.setitem(problem_generator.PROBLEM_KINDS, 'motion',
+                        [('v0', 5, 6, 1), ('h0', 0, 1, 1), ('ask', 0, 1, 1)])
+    generator = ParametricProblemGenerator(seed=2, index=ProblemIndex())
+    first = generator.generate(6, ['motion'])
+    second = generator.generate(6, ['motion'])
+    assert len({problem['id'] for problem in first + second}) == 8
+    assert len({problem['id'] for problem in second}) == 6      # セットの中では重ならない
+    assert len(generator.generate(20, ['motion'])) == 20
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        ParametricProblemGenerator().generate(4, ['geometry'])
@@ -0,0 +1,42 @@
+"""PDF ワークシートの見出し・軸のラベル（日本語フォントが無いときは英語）"""
+
+import re
+
+import pytest
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.text import Text
+
+import plot_images
+from worksheet_export import PDF_LABELS, PDF_LABELS_EN, _pdf_worksheet
+
+STUDENT = {'student_id': 's1', 'name': '', 'linear_a': 2, 'quadratic_a': 2,
+           'acceleration': 9.8, 'initial_velocity': 0}
+PROBLEMS = [{'description': 'x', 'options': ['1', '2'], 'answer': '1'}]
+
+
+def pdf_texts(monkeypatch, tmp_path, japanese_font):
+    """PDF の各ページに描かれた文字列"""
+    monkeypatch.setattr(plot_images, 'HAS_JAPANESE_FONT', japanese_font)
+    texts = []
+    savefig = PdfPages.savefig
+
+    def collect(self, figure=None, **kwargs):
+        texts.extend(text.get_text() for text in figure.findobj(Text) if text.get_text())
+        return savefig(self, figure, **kwargs)
+
+    monkeypatch.setattr(PdfPages, 'savefig', collect)
+    _pdf_worksheet(str(tmp_path / 's1.pdf'), STUDENT, 'explanation', PROBLEMS)
+    return texts
+
+
+def test_label_sets_match():
+    assert PDF_LABELS.keys() == PDF_LABELS_EN.keys()
+
+
+@pytest.mark.filterwarnings('ignore:Glyph')  # この環境に日本語フォントが無いときの豆腐の警告
+@pytest.mark.parametrize('japanese_font, labels', [(True, PDF_LABELS), (False, PDF_LABELS_EN)])
+def test_labels_follow_font_check(monkeypatch, tmp_path, japanese_font, labels):
+    texts = pdf_texts(monkeypatch, tmp_path, japanese_font)
+    assert labels['motion'] in texts and labels['time'] in texts
+    if not japanese_font:
+        assert not [text for text in texts if re.search('[぀-ヿ一-鿿]', text)]
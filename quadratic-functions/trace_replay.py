@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+実際の授業のリクエストの記録と再生
+アプリに TRACE_FILE=trace.jsonl.gz を設定すると、リクエストごとのパラメータと
+処理時間をコンパクトな形式で記録する。記録（またはデモのセッションレポートの
+interactions）を、ローカルのアプリに等倍または早送りで、生徒数を増やして再生し、
+エンドポイントごとの応答時間の分布を表示する
+
+    TRACE_FILE=trace.jsonl.gz python app.py                    # 記録
+    python trace_replay.py trace.jsonl.gz --speed 10 --students 5
+    python trace_replay.py gemini_code_session_report.json --url http://127.0.0.1:5000
+
+記録の形式（1行1 JSON、.gz なら gzip 圧縮）:
+    1行目   {"version": 1, "start": 開始時刻(ISO)}
+    2行目〜 [開始からのミリ秒, 生徒, メソッド, パス, 応答コード, 処理ミリ秒, パラメータ]
+生徒はクライアントのアドレスに記録ごとのランダムな塩を付けたハッシュ。塩はどこにも
+残さないので、記録からアドレスを総当たりで割り出すことはできない
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+TRACE_VERSION = 1
+# 記録するパラメータの最大長（JSON の文字数）。長いものは記録しない
+MAX_PARAMS_CHARS = 2000
+
+
+def _open(path, mode):
+    """mode は 'r'・'w'・'x'（'x' は既にあるファイルを上書きしない）"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class TraceRecorder:
+    """リクエストの記録（スレッドセーフ、flush_every 件ごとにまとめて書き込む）
+
+    既にあるファイルには書かない（FileExistsError）。salt を省略すると記録ごとに
+    ランダムな塩を作る。
+    """
+
+    def __init__(self, path, flush_every=100, salt=None):
+        self.path = path
+        self.flush_every = flush_every
+        self.salt = secrets.token_hex(16) if salt is None else salt
+        self.start = time.monotonic()
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._file = _open(path, 'x')
+        self._file.write(json.dumps({'version': TRACE_VERSION, 'start': datetime.now().isoformat()}) + '\n')
+        self._file.flush()
+
+    def client_id(self, address):
+        """クライアントのアドレスを短いハッシュにする"""
+        return hashlib.sha1(f'{self.salt}{address}'.encode('utf-8')).hexdigest()[:10]
+
+    def record(self, started, address, method, path, status, duration, params=None):
+        """1件記録する（started は time.monotonic() の値、duration は秒）"""
+        if params is not None and len(json.dumps(params, ensure_ascii=False)) > MAX_PARAMS_CHARS:
+            params = None
+        event = [round((started - self.start) * 1000), self.client_id(address), method, path,
+                 status, round(duration * 1000, 2), params]
+        line = json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.flush_every:
+                self._flush()
+
+    def _flush(self):
+        if self._file.closed:
+            return
+        self._file.write(''.join(self._buffer))
+        self._file.flush()
+        self._buffer.clear()
+
+    def close(self):
+        """残りを書き込んで閉じる（何度呼んでもよい）"""
+        with self._lock:
+            self._flush()
+            self._file.close()
+
+
+def load_trace(path):
+    """記録を読み込み、イベントの dict のリスト（時刻順）を返す
+
+    .json はデモのセッションレポート（interactions を持つ JSON）として読み込む。
+    """
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            return interactions_to_trace(json.load(f))
+
+    with _open(path, 'r') as f:
+        header = json.loads(f.readline() or '{}')
+        if header.get('version') != TRACE_VERSION:
+            raise ValueError(f'対応していない記録の形式です: {path}')
+        events = []
+        for line in f:
+            if line.strip():
+                t, client, method, path_, status, duration, params = json.loads(line)
+                events.append({'t': t / 1000, 'client': client, 'method': method, 'path': path_,
+                               'status': status, 'duration': duration / 1000, 'params': params})
+    events.sort(key=lambda event: event['t'])
+    return events
+
+
+def interactions_to_trace(report, client='demo'):
+    """デモのセッションレポートの interactions をグラフ更新のイベントにする"""
+    events = []
+    start = None
+    for interaction in report.get('interactions', []):
+        parameters = interaction.get('parameters', {})
+        timestamp = datetime.fromisoformat(interaction['timestamp']).timestamp()
+        start = timestamp if start is None else start
+        events.append({'t': timestamp - start, 'client': client, 'method': 'POST', 'path': '/update_plot',
+                       'status': None, 'duration': None,
+                       'params': {'linear_a': parameters.get('linear_a', 2),
+                                  'quadratic_a': parameters.get('quad_a', parameters.get('quadratic_a', 2))}})
+    return events
+
+
+def expand_students(events, students, spread=1.0):
+    """記録の生徒それぞれを students 人に増やす（開始を 0〜spread 秒ずらす）"""
+    if students <= 1:
+        return events
+    rng = np.random.default_rng(0)
+    clients = sorted({event['client'] for event in events})
+    offsets = {(client, k): (0.0 if k == 0 else float(rng.uniform(0, spread)))
+               for client in clients for k in range(students)}
+    expanded = [dict(event, client=f"{event['client']}-{k}", t=event['t'] + offsets[event['client'], k])
+                for event in events for k in range(students)]
+    expanded.sort(key=lambda event: event['t'])
+    return expanded
+
+
+class _InProcessTarget:
+    """アプリをこのプロセスで動かして送る（生徒ごとに別のアドレスとして扱う）"""
+
+    def __init__(self):
+        import app as web
+        self.web = web
+        self._local = threading.local()
+
+    def send(self, event, address):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.web.app.test_client()
+        environ = {'REMOTE_ADDR': address}
+        if event['method'] == 'GET':
+            response = client.get(event['path'], query_string=event['params'] or {}, environ_base=environ)
+        else:
+            response = client.post(event['path'], json=event['params'] or {}, environ_base=environ)
+        body = response.get_json(silent=True) if response.is_json else None
+        return response.status_code, body
+
+
+class _HttpTarget:
+    """起動済みのサーバーに HTTP で送る（すべての生徒が同じアドレスになる点に注意）"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def send(self, event, address):
+        url = self.url + event['path']
+        data = None
+        headers = {}
+        if event['method'] == 'GET':
+            if event['params']:
+                url += '?' + urllib.parse.urlencode(event['params'])
+        else:
+            data = json.dumps(event['params'] or {}).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(url, data=data, headers=headers, method=event['method'])
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                raw = response.read()
+                status = response.status
+                content_type = response.headers.get('Content-Type', '')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+        body = json.loads(raw) if content_type.startswith('application/json') else None
+        return status, body
+
+
+def replay(events, target, speed=1.0, concurrency=64):
+    """イベントを記録の時刻どおり（speed 倍速）に送り、結果のリストを返す
+
+    応答時間は送信からの時間（latency）と、本来送るはずだった時刻からの時間
+    （delay、送信が遅れた分も含む）の両方を測る。
+    """
+    results = []
+    lock = threading.Lock()
+    conversations = {}   # 生徒 -> 再生中の会話ID
+
+    def send(event, scheduled):
+        params = event['params']
+        if isinstance(params, dict) and 'conversation_id' in params:
+            params = dict(params, conversation_id=conversations.get(event['client']))
+        started = time.perf_counter()
+        try:
+            status, body = target.send(dict(event, params=params), _address(event['client']))
+        except Exception:
+            status, body = 'error', None
+        finished = time.perf_counter()
+        if isinstance(body, dict) and body.get('conversation_id'):
+            conversations[event['client']] = body['conversation_id']
+        with lock:
+            results.append({'path': event['path'], 'status': status,
+                            'latency': finished - started, 'delay': finished - scheduled,
+                            'recorded': event['duration']})
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        origin = time.perf_counter()
+        for event in events:
+            scheduled = origin + event['t'] / speed
+            wait = scheduled - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            executor.submit(send, event, scheduled)
+    return results
+
+
+def _address(client):
+    """生徒ごとの仮のアドレス（受付制御の流量制限は生徒ごとに効く）"""
+    digest = hashlib.sha1(client.encode('utf-8')).digest()
+    return f'10.{digest[0]}.{digest[1]}.{digest[2]}'
+
+
+def latency_summary(seconds):
+    values = np.array([s for s in seconds if s is not None]) * 1000
+    if len(values) == 0:
+        return 'データなし'
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f'p50 {p50:7.1f}ms  p95 {p95:7.1f}ms  p99 {p99:7.1f}ms  max {values.max():7.1f}ms  ({len(values)}件)'
+
+
+def report(results):
+    """エンドポイントごとの応答時間の分布と応答コードを表示する"""
+    by_path = defaultdict(list)
+    for result in results:
+        by_path[result['path']].append(result)
+    for path, items in sorted(by_path.items()):
+        statuses = defaultdict(int)
+        for item in items:
+            statuses[item['status']] += 1
+        print(f'{path}')
+        print(f'  応答時間       : {latency_summary([item["latency"] for item in items])}')
+        print(f'  予定時刻から   : {latency_summary([item["delay"] for item in items])}')
+        recorded = [item['recorded'] for item in items if item['recorded'] is not None]
+        if recorded:
+            print(f'  記録時の処理   : {latency_summary(recorded)}')
+        print(f'  応答コード     : {dict(statuses)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='記録したリクエストの再生による負荷試験')
+    parser.add_argument('trace', help='記録（.jsonl / .jsonl.gz）またはデモのセッションレポート（.json）')
+    parser.add_argument('--url', help='再生先のサーバー（省略時はこのプロセスでアプリを動かす）')
+    parser.add_argument('--speed', type=float, default=1.0, help='再生速度の倍率（10 なら10倍速）')
+    parser.add_argument('--students', type=int, default=1, help='記録の生徒1人あたりの模擬生徒数')
+    parser.add_argument('--spread', type=float, default=1.0, help='模擬生徒の開始をずらす最大秒数')
+    parser.add_argument('--concurrency', type=int, default=64, help='同時に送るリクエスト数の上限')
+    parser.add_argument('--llm-latency', type=float, default=None,
+                        help='AI の応答をこの秒数の待ちに差し替える（このプロセスで動かす場合のみ）')
+    args = parser.parse_args()
+
+    events = expand_students(load_trace(args.trace), args.students, args.spread)
+    if args.url:
+        target = _HttpTarget(args.url)
+    else:
+        target = _InProcessTarget()
+        if args.llm_latency is not None:
+            def slow_ai(question):
+                time.sleep(args.llm_latency)
+                return '（模擬応答）'
+            target.web.ask_gemini_ai = slow_ai
+
+    duration = events[-1]['t'] / args.speed if events else 0
+    clients = len({event['client'] for event in events})
+    print(f'▶️  {len(events)}件のリクエスト（{clients}人）を {args.speed:g}倍速で再生します（約{duration:.1f}秒）')
+    print('=' * 60)
+    results = replay(events, target, args.speed, args.concurrency)
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
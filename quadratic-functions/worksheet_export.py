@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+個別ワークシートの一括出力
+名簿（生徒ごとのパラメータ）から、比較グラフ・運動解析・4分割分析の図と
+生成した問題をまとめたワークシートを、プロセスプールで並列に作る。
+HTML は出力先に1つだけ置いた plotly.min.js を共有し、ファイルごとに埋め込まない。
+PDF は matplotlib で描く（追加の依存なし）
+
+使い方:
+    python worksheet_export.py roster.csv -o worksheets
+    python worksheet_export.py roster.json -o worksheets --format pdf --jobs 8
+
+名簿の列（CSV の見出し行、または JSON の dict のリスト）:
+    student_id（必須）, name, linear_a, quadratic_a, initial_velocity, acceleration, problems
+"""
+
+import argparse
+import contextlib
+import csv
+import html
+import io
+import json
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from figure_encoding import encode_figure
+
+ROSTER_DEFAULTS = {'name': '', 'linear_a': 2.0, 'quadratic_a': 2.0,
+                   'initial_velocity': 0.0, 'acceleration': 2.0, 'problems': 6}
+PLOTLY_BUNDLE = 'plotly.min.js'
+
+# 教材の表のデータ点（create_advanced_visualization と同じ）
+DATA_T = [0, 1, 2, 3, 4, 5, 6]
+LINEAR_POINTS = [0, 2, 4, 6, 8, 10, 12]
+QUADRATIC_POINTS = [0, 2, 8, 18, 32, 50, 72]
+
+# ワーカーごとに一度だけ読み込む教材のモジュール
+_comparison_plot = None
+_learner = None
+_demo = None
+
+
+def load_roster(path):
+    """名簿を読み込み、数値の列を変換した dict のリストを返す"""
+    with open(path, encoding='utf-8-sig') as f:
+        if path.endswith('.json'):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+
+    roster = []
+    seen = set()
+    for line, row in enumerate(rows, start=1):
+        student_id = str(row.get('student_id') or '').strip()
+        if not student_id:
+            raise ValueError(f'{line}件目: student_id がありません')
+        if student_id in seen:
+            raise ValueError(f'{line}件目: student_id が重複しています: {student_id}')
+        seen.add(student_id)
+        student = {'student_id': student_id}
+        for key, default in ROSTER_DEFAULTS.items():
+            value = row.get(key)
+            if value is None or value == '':
+                value = default
+            try:
+                student[key] = type(default)(value)
+            except ValueError:
+                raise ValueError(f'{line}件目: {key} が数値ではありません: {value}') from None
+        roster.append(student)
+    return roster
+
+
+def worksheet_filename(student_id, extension):
+    """生徒IDからファイル名を作る（パスに使えない文字は _ に置き換える）"""
+    return f"worksheet_{re.sub(r'[^0-9A-Za-z_.-]', '_', student_id)}.{extension}"
+
+
+def worksheet_filenames(roster, extension):
+    """生徒ID -> ファイル名。置き換えで同じ名前になる生徒（大文字・小文字の違いも含む）には
+    _2, _3 ... を付けて、別の生徒のワークシートを上書きしないようにする"""
+    filenames = {}
+    used = set()
+    for student in roster:
+        filename = worksheet_filename(student['student_id'], extension)
+        stem = filename[:-len(extension) - 1]
+        number = 1
+        while filename.lower() in used:
+            number += 1
+            filename = f'{stem}_{number}.{extension}'
+        used.add(filename.lower())
+        filenames[student['student_id']] = filename
+    return filenames
+
+
+def _init_worker():
+    """ワーカーの初期化：教材のモジュールを読み込む（起動時の表示は捨てる）"""
+    global _comparison_plot, _learner, _demo
+    with contextlib.redirect_stdout(io.StringIO()):
+        import comparison_plot
+        from claude_code_demo import GeminiCodeInteractiveDemo
+        from quadratic_functions_interactive import QuadraticFunctionLearning
+        _comparison_plot = comparison_plot
+        _learner = QuadraticFunctionLearning()
+        _demo = GeminiCodeInteractiveDemo()
+
+
+@lru_cache(maxsize=256)
+def _figure_json(linear_a, quadratic_a, initial_velocity, acceleration):
+    """3つの図の JSON（同じパラメータの生徒どうしで使い回す）
+
+    同梱の plotly.js は float32 の型付き配列をそのまま読めるので、配列は f4 で埋め込む。
+    """
+    encoding = {'dtype': 'f4'}
+    return {
+        'comparison': _comparison_plot.create_comparison_plot(linear_a, quadratic_a, encoding=encoding),
+        'motion': encode_figure(_learner.motion_analysis(initial_velocity=initial_velocity,
+                                                         acceleration=acceleration), **encoding),
+        'analysis': encode_figure(_demo.create_advanced_visualization(linear_a, quadratic_a), **encoding),
+    }
+
+
+def _problems(student):
+    """生徒ごとの問題（生徒IDから決まる乱数の種で、出力し直しても同じ問題になる）"""
+    from problem_generator import ParametricProblemGenerator
+    if student['problems'] <= 0:
+        return []
+    generator = ParametricProblemGenerator(seed=zlib.crc32(student['student_id'].encode('utf-8')))
+    return generator.generate(student['problems'])
+
+
+def _html_worksheet(student, figures, explanation, problems):
+    """1人分の HTML ワークシート"""
+    e = html.escape
+    title = f"{labels['worksheet']}{student['name'] or student['student_id']}"
+    parts = [
+        '<!DOCTYPE html>\n<html lang="ja">\n<head>\n<meta charset="UTF-8">\n',
+        f'<title>{e(title)}</title>\n<script src="{PLOTLY_BUNDLE}"></script>\n',
+        '<style>body{font-family:sans-serif;max-width:960px;margin:auto;padding:1em}'
+        '.plot{height:520px}li{margin:.6em 0}@media print{.plot{page-break-inside:avoid}}</style>\n',
+        '</head>\n<body>\n',
+        f'<h1>{e(title)}</h1>\n',
+        f"<p>生徒ID：{e(student['student_id'])}　一次関数 y = {student['linear_a']:g}x、"
+        f"二次関数 y = {student['quadratic_a']:g}x²、初速度 {student['initial_velocity']:g} m/s、"
+        f"加速度 {student['acceleration']:g} m/s²</p>\n",
+        '<h2>1. 比較グラフ</h2>\n<div id="comparison" class="plot"></div>\n',
+        f'<p>{e(explanation)}</p>\n',
+        '<h2>2. 運動解析</h2>\n<div id="motion" class="plot" style="height:800px"></div>\n',
+        '<h2>3. 速度・加速度の分析</h2>\n<div id="analysis" class="plot" style="height:700px"></div>\n',
+    ]
+    if problems:
+        parts.append('<h2>4. 問題</h2>\n<ol>\n')
+        for problem in problems:
+            options = '　'.join(f'({chr(0x61 + i)}) {e(option)}' for i, option in enumerate(problem['options']))
+            parts.append(f"<li><b>{e(problem['title'])}</b><br>{e(problem['description'])}<br>{options}</li>\n")
+        parts.append('</ol>\n<details><summary>解答</summary>\n<ol>\n')
+        for problem in problems:
+            parts.append(f"<li>{e(problem['answer'])}（{e(problem['explanation'])}）</li>\n")
+        parts.append('</ol>\n</details>\n')
+    parts.append('<script>\n')
+    for name, figure in figures.items():
+        figure = figure.replace('</', '<\\/')  # 文字列中の </script> でスクリプトが終わらないように
+        parts.append(f'(function(f){{Plotly.newPlot("{name}",f.data,f.layout,{{responsive:true}});}})({figure});\n')
+    parts.append('</script>\n</body>\n</html>\n')
+    return ''.join(parts)
+
+
+# PDF の見出し・軸のラベル（日本語フォントが無いときは plot_images と同じく英語にする）
+PDF_LABELS = {
+    'worksheet': 'ワークシート：', 'distance': '距離 (m)', 'velocity': '速度 (m/s)',
+    'acceleration': '加速度 (m/s²)', 'time': '時間 (秒)',
+    'accelerated': '等加速度運動', 'uniform': '等速運動', 'motion': '運動解析',
+    'comparison': '関数比較 (線形a={linear_a:g}, 二次a={quadratic_a:g})',
+    'velocity_analysis': '速度分析 (一階微分)', 'acceleration_analysis': '加速度分析 (二階微分)',
+    'linear': '一次関数', 'quadratic': '二次関数',
+    'linear_points': '一次関数実データ', 'quadratic_points': '二次関数実データ',
+    'data_vs_theory': '実データ vs 理論値', 'analysis': '速度・加速度の分析', 'answers': '解答',
+}
+PDF_LABELS_EN = {
+    'worksheet': 'Worksheet: ', 'distance': 'distance (m)', 'velocity': 'velocity (m/s)',
+    'acceleration': 'acceleration (m/s²)', 'time': 'time (s)',
+    'accelerated': 'uniform acceleration', 'uniform': 'uniform motion', 'motion': 'Motion analysis',
+    'comparison': 'Comparison (linear a={linear_a:g}, quadratic a={quadratic_a:g})',
+    'velocity_analysis': 'Velocity (1st derivative)', 'acceleration_analysis': 'Acceleration (2nd derivative)',
+    'linear': 'linear', 'quadratic': 'quadratic',
+    'linear_points': 'linear data', 'quadratic_points': 'quadratic data',
+    'data_vs_theory': 'Data vs theory', 'analysis': 'Velocity and acceleration', 'answers': 'Answers',
+}
+
+
+def _pdf_worksheet(path, student, explanation, problems):
+    """1人分の PDF ワークシート（比較グラフ・運動解析・速度と加速度の分析・問題の4ページ）"""
+    import textwrap
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+    from function_core import sample_family
+    from plot_images import FONT_FAMILY, HAS_JAPANESE_FONT, ComparisonFigure
+
+    font = {'family': FONT_FAMILY}
+    labels = PDF_LABELS if HAS_JAPANESE_FONT else PDF_LABELS_EN
+    with PdfPages(path) as pdf:
+        comparison = ComparisonFigure(width=8.27, height=11.69)
+        comparison.figure.subplots_adjust(top=0.55, bottom=0.06)
+        comparison.update(student['linear_a'], student['quadratic_a'])
+        comparison.figure.text(0.08, 0.95, f"{labels['worksheet']}{student['name'] or student['student_id']}",
+                               fontsize=16, fontdict=font)
+        comparison.figure.text(0.08, 0.62, '\n'.join(textwrap.wrap(explanation, 42)),
+                               fontsize=10, fontdict=font, va='bottom')
+        pdf.savefig(comparison.figure)
+
+        t, (values, first, second) = sample_family(
+            [[student['acceleration'] / 2, student['initial_velocity'], 0], [student['linear_a'], 0]], 0, 6)
+        motion = Figure(figsize=(8.27, 11.69))
+        rows = ((values, labels['distance']), (first, labels['velocity']), (second, labels['acceleration']))
+        for i, (series, label) in enumerate(rows):
+            ax = motion.add_subplot(3, 1, i + 1)
+            ax.plot(t, series[0], color='red', label=labels['accelerated'])
+            ax.plot(t, series[1], color='blue', label=labels['uniform'])
+            ax.set_ylabel(label, fontdict=font)
+            ax.grid(True, alpha=0.3)
+        ax.set_xlabel(labels['time'], fontdict=font)
+        motion.axes[0].legend(prop=font)
+        motion.suptitle(labels['motion'], fontproperties=font)
+        pdf.savefig(motion)
+
+        # HTML の「速度・加速度の分析」（create_advanced_visualization）と同じ4分割
+        linear_a, quadratic_a = student['linear_a'], student['quadratic_a']
+        x, (values, first, second) = sample_family([[linear_a, 0], [quadratic_a, 0, 0]], 0, 6)
+        analysis = Figure(figsize=(8.27, 11.69))
+        title = labels['comparison'].format(linear_a=linear_a, quadratic_a=quadratic_a)
+        panels = ((title, values, labels['distance']),
+                  (labels['velocity_analysis'], first, labels['velocity']),
+                  (labels['acceleration_analysis'], second, labels['acceleration']))
+        for i, (title, series, label) in enumerate(panels):
+            ax = analysis.add_subplot(2, 2, i + 1)
+            ax.plot(x, series[0], color='#2E86AB', label=labels['linear'])
+            ax.plot(x, series[1], color='#A23B72', label=labels['quadratic'])
+            ax.set_title(title, fontdict=font, fontsize=10)
+            ax.set_xlabel(labels['time'], fontdict=font)
+            ax.set_ylabel(label, fontdict=font)
+            ax.grid(True, alpha=0.3)
+        ax = analysis.add_subplot(2, 2, 4)
+        ax.plot(DATA_T, LINEAR_POINTS, 'o', color='#2E86AB', label=labels['linear_points'])
+        ax.plot(DATA_T, QUADRATIC_POINTS, 's', color='#A23B72', label=labels['quadratic_points'])
+        ax.plot(x, values[0], ':', color='#2E86AB')
+        ax.plot(x, values[1], ':', color='#A23B72')
+        ax.set_title(labels['data_vs_theory'], fontdict=font, fontsize=10)
+        ax.set_xlabel(labels['time'], fontdict=font)
+        ax.set_ylabel(labels['distance'], fontdict=font)
+        ax.grid(True, alpha=0.3)
+        ax.legend(prop=font, fontsize=8)
+        analysis.axes[0].legend(prop=font, fontsize=8)
+        analysis.suptitle(labels['analysis'], fontproperties=font)
+        analysis.subplots_adjust(hspace=0.3, wspace=0.3)
+        pdf.savefig(analysis)
+
+        if problems:
+            page = Figure(figsize=(8.27, 11.69))
+            lines = []
+            for i, problem in enumerate(problems, start=1):
+                lines.extend(textwrap.wrap(f"{i}. {problem['description']}", 46))
+                lines.append('    ' + '  '.join(f'({chr(0x61 + j)}) {o}' for j, o in enumerate(problem['options'])))
+                lines.append('')
+            lines.append(labels['answers'])
+            lines.extend(f"{i}. {problem['answer']}" for i, problem in enumerate(problems, start=1))
+            page.text(0.08, 0.95, '\n'.join(lines), fontsize=10, fontdict=font, va='top', linespacing=1.6)
+            pdf.savefig(page)
+
+
+def export_worksheet(student, output_dir, export_format='html', filename=None):
+    """1人分のワークシートを書き出し、(生徒ID, ファイル名, 秒数) を返す（ワーカーで実行）
+
+    filename は worksheet_filenames で決めた名前（省略時は生徒IDから作る）。
+    """
+    if _comparison_plot is None:
+        _init_worker()
+    from explanation_templates import compose_explanation
+
+    start = time.perf_counter()
+    filename = filename or worksheet_filename(student['student_id'], export_format)
+    path = os.path.join(output_dir, filename)
+    explanation = compose_explanation(student['linear_a'], student['quadratic_a'])
+    problems = _problems(student)
+    if export_format == 'pdf':
+        _pdf_worksheet(path, student, explanation, problems)
+    else:
+        figures = _figure_json(student['linear_a'], student['quadratic_a'],
+                               student['initial_velocity'], student['acceleration'])
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(_html_worksheet(student, figures, explanation, problems))
+    return student['student_id'], filename, time.perf_counter() - start
+
+
+def _write_index(output_dir, results, roster):
+    """出力したワークシートの一覧ページ"""
+    names = {student['student_id']: student['name'] for student in roster}
+    items = ''.join(f'<li><a href="{html.escape(filename)}">{html.escape(student_id)}'
+                    f' {html.escape(names[student_id])}</a></li>\n' for student_id, filename, _ in results)
+    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html>\n<html lang="ja">\n<head><meta charset="UTF-8"><title>ワークシート一覧</title>'
+                f'</head>\n<body>\n<h1>ワークシート一覧（{len(results)}人）</h1>\n<ol>\n{items}</ol>\n</body>\n</html>\n')
+
+
+def export_worksheets(roster, output_dir, export_format='html', jobs=None, chunksize=8):
+    """名簿の全員分をプロセスプールで書き出す（jobs=1 ならこのプロセスで順に）"""
+    os.makedirs(output_dir, exist_ok=True)
+    if export_format == 'html':
+        # plotly.js は全ワークシートで共有する
+        from plotly.offline import get_plotlyjs
+        with open(os.path.join(output_dir, PLOTLY_BUNDLE), 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+
+    filenames = worksheet_filenames(roster, export_format)
+    arguments = [(student, output_dir, export_format, filenames[student['student_id']]) for student in roster]
+    if jobs == 1:
+        results = [export_worksheet(*args) for args in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as executor:
+            results = list(executor.map(export_worksheet, *zip(*arguments), chunksize=chunksize))
+    _write_index(output_dir, results, roster)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='名簿から個別ワークシートを一括出力')
+    parser.add_argument('roster', help='名簿（CSV または JSON）')
+    parser.add_argument('-o', '--output', default='worksheets', help='出力先のディレクトリ')
+    parser.add_argument('--format', choices=['html', 'pdf'], default='html')
+    parser.add_argument('--jobs', type=int, default=None, help='ワーカープロセス数（既定は CPU 数）')
+    args = parser.parse_args()
+
+    roster = load_roster(args.roster)
+    if args.format == 'pdf':
+        from plot_images import HAS_JAPANESE_FONT
+        if not HAS_JAPANESE_FONT:
+            # 見出し・軸は英語にするが、解説と問題の本文は日本語のままなので豆腐になる
+            print('日本語フォントが見つかりません。PDF の見出し・軸は英語にします'
+                  '（解説と問題の文を表示するには Noto Sans CJK JP などを入れてください）')
+    start = time.perf_counter()
+    results = export_worksheets(roster, args.output, args.format, args.jobs)
+    elapsed = time.perf_counter() - start
+    print(f'{len(results)}人分のワークシートを {args.output} に出力しました（{elapsed:.1f}秒、'
+          f'1人あたり平均 {sum(r[2] for r in results) / max(len(results), 1) * 1000:.0f}ms）')
+
+
+if __name__ == '__main__':
+    main()